@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+"""
+量化交易机器人核心包
+"""
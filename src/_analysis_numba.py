@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+绩效分析Numba内核
+回撤持续期与连续盈亏统计, 单次顺序扫描, 显式声明签名
+"""
+
+from ._njit import njit
+
+@njit('int64(float64[:])', cache=True)
+def drawdown_duration(drawdown):
+    """最长回撤持续笔数(只统计已恢复的回撤段)"""
+    best = 0
+    start = -1
+    for i in range(drawdown.shape[0]):
+        if drawdown[i] > 0.0:
+            if start < 0:
+                start = i
+        elif start >= 0:
+            if i - start > best:
+                best = i - start
+            start = -1
+    return best
+
+@njit('int64(float64[:], int64)', cache=True)
+def max_streak(pnl, sign):
+    """最长连续盈利(sign>0)或连续亏损(sign<0)笔数"""
+    best = 0
+    run = 0
+    for i in range(pnl.shape[0]):
+        if (sign > 0 and pnl[i] > 0.0) or (sign < 0 and pnl[i] < 0.0):
+            run += 1
+            if run > best:
+                best = run
+        else:
+            run = 0
+    return best
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+回测撮合Numba内核
+按K线顺序执行信号, 余额/权益/持仓和成交记录写入预分配数组; 口径与Backtester逐笔撮合一致
+"""
+
+import numpy as np
+from ._njit import njit
+from ._indicators_numba import SIG_BUY, SIG_LONG, SIG_SELL, SIG_SHORT, SIG_CLOSE_LONG, SIG_CLOSE_SHORT
+
+SIG_CLOSE_MASK = SIG_CLOSE_LONG | SIG_CLOSE_SHORT
+
+# 成交记录类型编码
+KIND_BUY, KIND_LONG, KIND_SHORT, KIND_SELL, KIND_CLOSE, KIND_FINAL = 0, 1, 2, 3, 4, 5
+
+# state数组顺序(输入为初始状态, 返回时为最终状态)
+ST_BALANCE, ST_POSITION, ST_ENTRY = 0, 1, 2
+
+@njit('int64(float64[::1], int8[::1], int64, float64, float64[::1], float64[::1], float64[::1], float64[::1], '
+      'int64[::1], int8[::1], float64[::1], float64[::1], float64[::1])', cache=True)
+def run_backtest(closes, signals, start, trade_amount, state,
+                 out_balance, out_equity, out_position,
+                 trade_bar, trade_kind, trade_price, trade_pnl, trade_balance):
+    """从start根K线起逐根撮合, 结束时仍有持仓则按最后收盘价平仓; 返回成交笔数(开仓记录的pnl为NaN)"""
+    balance = state[ST_BALANCE]
+    position = state[ST_POSITION]
+    entry_price = state[ST_ENTRY]
+    n = closes.shape[0]
+    k = 0
+    
+    for i in range(start, n + 1):
+        if i == n:
+            # 最终平仓, 不计入余额历史
+            if position == 0.0:
+                break
+            price = closes[n - 1]
+            kind = KIND_FINAL
+        else:
+            price = closes[i]
+            signal = signals[i]
+            kind = -1
+            
+            if signal == SIG_BUY and position <= 0.0:
+                cost = trade_amount * price
+                if balance >= cost:
+                    position += trade_amount
+                    balance -= cost
+                    entry_price = price
+                    kind = KIND_BUY
+            elif signal == SIG_SELL and position > 0.0:
+                kind = KIND_SELL
+            elif signal == SIG_LONG and position <= 0.0:
+                position = trade_amount
+                entry_price = price
+                kind = KIND_LONG
+            elif signal == SIG_SHORT and position >= 0.0:
+                position = -trade_amount
+                entry_price = price
+                kind = KIND_SHORT
+            elif (signal & SIG_CLOSE_MASK) != 0 and position != 0.0:
+                kind = KIND_CLOSE
+        
+        if kind >= 0:
+            pnl = np.nan
+            if kind >= KIND_SELL:
+                if position > 0.0:
+                    pnl = (price - entry_price) * position
+                    balance += position * price
+                else:
+                    pnl = (entry_price - price) * -position
+                    balance += pnl
+                position = 0.0
+                entry_price = 0.0
+            trade_bar[k] = min(i, n - 1)
+            trade_kind[k] = kind
+            trade_price[k] = price
+            trade_pnl[k] = pnl
+            trade_balance[k] = balance
+            k += 1
+        
+        if i < n:
+            if position == 0.0 or entry_price == 0.0:
+                unrealized = 0.0
+            elif position > 0.0:
+                unrealized = (price - entry_price) * position
+            else:
+                unrealized = (entry_price - price) * -position
+            out_balance[i] = balance
+            out_equity[i] = balance + unrealized
+            out_position[i] = position
+    
+    state[ST_BALANCE] = balance
+    state[ST_POSITION] = position
+    state[ST_ENTRY] = entry_price
+    return k
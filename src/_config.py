@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""
+配置文件读取
+优先使用libyaml的CSafeLoader, 解析结果按(绝对路径, 修改时间)缓存
+"""
+
+import copy
+import functools
+import os
+from typing import Dict
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+@functools.lru_cache(maxsize=8)
+def _parse_config(path: str, mtime_ns: int) -> Dict:
+    """解析YAML配置(mtime_ns只用作缓存键, 文件修改后自动重新解析)"""
+    with open(path, 'rb') as f:
+        return yaml.load(f, Loader=SafeLoader)
+
+def load_config(config_path) -> Dict:
+    """读取配置文件, 返回缓存结果的副本, 调用方修改不影响缓存"""
+    path = os.path.abspath(config_path)
+    return copy.deepcopy(_parse_config(path, os.stat(path).st_mtime_ns))
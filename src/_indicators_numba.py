@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+技术指标Numba内核
+输入为float64数组, 结果写入预分配的输出数组; 计算口径与ta库一致
+各内核显式声明签名, 导入时即编译并缓存到__pycache__, 数组参数须为C连续
+"""
+
+import numpy as np
+from ._njit import njit, prange
+
+@njit('void(float64[::1], float64, int64, float64[::1])', cache=True)
+def ewm_mean(x, alpha, min_periods, out):
+    """指数加权均值(等价pandas ewm(alpha, min_periods, adjust=False).mean())"""
+    n = x.shape[0]
+    old_wt_factor = 1.0 - alpha
+    weighted = np.nan
+    old_wt = 1.0
+    nobs = 0
+    
+    for i in range(n):
+        cur = x[i]
+        is_obs = cur == cur
+        if is_obs:
+            nobs += 1
+        
+        if weighted == weighted:
+            # 缺失值期间权重继续衰减, 与pandas(ignore_na=False)一致
+            old_wt *= old_wt_factor
+            if is_obs:
+                if weighted != cur:
+                    weighted = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+                old_wt = 1.0
+        elif is_obs:
+            weighted = cur
+        
+        out[i] = weighted if nobs >= min_periods else np.nan
+
+@njit('void(float64[::1], int64, float64[::1])', cache=True)
+def ema(close, window, out):
+    """EMA, span=window"""
+    ewm_mean(close, 2.0 / (window + 1.0), window, out)
+
+@njit('void(float64[::1], int64, int64, int64, float64[::1], float64[::1], float64[::1])', cache=True)
+def macd(close, window_fast, window_slow, window_sign, out_macd, out_signal, out_hist):
+    """MACD线/信号线/柱状图"""
+    n = close.shape[0]
+    ema_slow = np.empty(n)
+    ema(close, window_fast, out_macd)
+    ema(close, window_slow, ema_slow)
+    for i in range(n):
+        out_macd[i] -= ema_slow[i]
+    
+    ema(out_macd, window_sign, out_signal)
+    for i in range(n):
+        out_hist[i] = out_macd[i] - out_signal[i]
+
+@njit('void(float64[::1], int64, float64[::1])', cache=True)
+def rsi(close, window, out):
+    """RSI, Wilder平滑(alpha=1/window)"""
+    n = close.shape[0]
+    alpha = 1.0 / window
+    old_wt_factor = 1.0 - alpha
+    avg_up = 0.0
+    avg_down = 0.0
+    
+    for i in range(n):
+        # 首个差分为NaN, 与ta一致按0计入
+        diff = close[i] - close[i - 1] if i > 0 else np.nan
+        up = diff if diff > 0 else 0.0
+        down = -diff if diff < 0 else 0.0
+        
+        if i == 0:
+            avg_up = up
+            avg_down = down
+        else:
+            if avg_up != up:
+                avg_up = (old_wt_factor * avg_up + alpha * up) / (old_wt_factor + alpha)
+            if avg_down != down:
+                avg_down = (old_wt_factor * avg_down + alpha * down) / (old_wt_factor + alpha)
+        
+        if i + 1 < window:
+            out[i] = np.nan
+        elif avg_down == 0:
+            out[i] = 100.0
+        else:
+            out[i] = 100.0 - 100.0 / (1.0 + avg_up / avg_down)
+
+@njit('void(float64[::1], int64, float64, float64[::1], float64[::1], float64[::1])', cache=True)
+def bbands(close, window, window_dev, out_upper, out_middle, out_lower):
+    """布林带(总体标准差ddof=0)"""
+    n = close.shape[0]
+    
+    for i in range(n):
+        if i + 1 < window:
+            out_upper[i] = out_middle[i] = out_lower[i] = np.nan
+            continue
+        
+        # 窗口很短, 逐窗口两遍求和避免累加平方和的精度损失
+        total = 0.0
+        for j in range(i + 1 - window, i + 1):
+            total += close[j]
+        mean = total / window
+        
+        sq = 0.0
+        for j in range(i + 1 - window, i + 1):
+            sq += (close[j] - mean) ** 2
+        std = np.sqrt(sq / window)
+        
+        out_middle[i] = mean
+        out_upper[i] = mean + window_dev * std
+        out_lower[i] = mean - window_dev * std
+
+@njit('float64(float64, float64)', cache=True)
+def _nan_max(a, b):
+    """含NaN时返回NaN的max(等价np.amax)"""
+    if a != a or b != b:
+        return np.nan
+    return a if a > b else b
+
+@njit('float64(float64, float64)', cache=True)
+def _nan_min(a, b):
+    """含NaN时返回NaN的min(等价np.amin)"""
+    if a != a or b != b:
+        return np.nan
+    return a if a < b else b
+
+@njit('float64(float64, float64)', cache=True)
+def _directional_move(diff, other):
+    """方向变动: diff占优且为正时取diff, 否则为0; diff为NaN时为NaN"""
+    if diff != diff:
+        return np.nan
+    return diff if (diff > other and diff > 0) else 0.0
+
+@njit('UniTuple(float64, 3)(float64[::1], float64[::1], float64[::1], int64)', cache=True)
+def _bar_moves(high, low, close, j):
+    """第j根K线的真实波幅、+DM、-DM"""
+    tr = _nan_max(high[j], close[j - 1]) - _nan_min(low[j], close[j - 1])
+    up = high[j] - high[j - 1]
+    down = low[j - 1] - low[j]
+    return tr, _directional_move(up, down), _directional_move(down, up)
+
+@njit('void(float64[::1], float64[::1], float64[::1], int64, float64[::1], float64[::1], float64[::1])', cache=True)
+def adx(high, low, close, window, out_adx, out_pos, out_neg):
+    """ADX/+DI/-DI, Wilder平滑; 预热期为0, 下标对齐方式与ta.trend.ADXIndicator一致"""
+    n = close.shape[0]
+    # ta中平滑序列长度, 平滑值s[i]对应第window+i根K线
+    m = n - (window - 1)
+    for j in range(n):
+        out_adx[j] = out_pos[j] = out_neg[j] = 0.0
+    if m < 2:
+        return
+    
+    tr_s = 0.0
+    pos_s = 0.0
+    neg_s = 0.0
+    for j in range(1, window + 1):
+        tr, pos, neg = _bar_moves(high, low, close, j)
+        tr_s += tr
+        pos_s += pos
+        neg_s += neg
+    
+    dx_sum = 0.0
+    adx_s = 0.0
+    for i in range(m):
+        if i == m - 1:
+            # ta的平滑循环不覆盖最后一个元素, 保持为0
+            tr_s = pos_s = neg_s = 0.0
+        elif i > 0:
+            tr, pos, neg = _bar_moves(high, low, close, window + i)
+            tr_s = tr_s - tr_s / window + tr
+            pos_s = pos_s - pos_s / window + pos
+            neg_s = neg_s - neg_s / window + neg
+        
+        if tr_s != 0:
+            di_pos = 100 * (pos_s / tr_s)
+            di_neg = 100 * (neg_s / tr_s)
+        else:
+            di_pos = di_neg = 0.0
+        
+        if 0 < i < m - 1:
+            out_pos[i + window] = di_pos
+            out_neg[i + window] = di_neg
+        
+        di_sum = di_pos + di_neg
+        dx = 100 * np.abs((di_pos - di_neg) / di_sum) if di_sum != 0 else 0.0
+        
+        # ADX首值为前window个DX均值(写在第2*window-1根), 之后按Wilder方式平滑
+        if i < window:
+            dx_sum += dx
+            if i == window - 1 and m > window:
+                adx_s = dx_sum / window
+                out_adx[2 * window - 1] = adx_s
+        elif i + 1 < m:
+            adx_s = (adx_s * (window - 1) + dx) / window
+            out_adx[i + window] = adx_s
+
+# evaluate_signal输入行的列顺序
+SIGNAL_COLUMNS = ('close', 'ema_fast', 'ema_slow', 'macd', 'macd_signal', 'macd_histogram',
+                  'adx', 'adx_pos', 'adx_neg', 'bb_middle', 'rsi', 'volume_ratio')
+COL_CLOSE, COL_EMA_FAST, COL_EMA_SLOW, COL_MACD, COL_MACD_SIGNAL, COL_MACD_HIST = 0, 1, 2, 3, 4, 5
+COL_ADX, COL_ADX_POS, COL_ADX_NEG, COL_BB_MIDDLE, COL_RSI, COL_VOLUME_RATIO = 6, 7, 8, 9, 10, 11
+
+# thresholds数组顺序
+TH_ADX, TH_RSI_OVERBOUGHT, TH_RSI_OVERSOLD, TH_VOLUME = 0, 1, 2, 3
+
+# 趋势/信号/交易类型编码
+TREND_SIDEWAYS, TREND_UP, TREND_DOWN = 0, 1, 2
+# 信号编码与strategy.SignalType的位标志取值一致
+SIG_HOLD, SIG_BUY, SIG_LONG, SIG_SELL, SIG_SHORT, SIG_CLOSE_LONG, SIG_CLOSE_SHORT = 0, 1, 2, 4, 8, 16, 32
+TRADE_SPOT, TRADE_FUTURES = 0, 1
+
+@njit('UniTuple(int64, 4)(float64[::1], float64[::1], float64[::1], int64, float64)', cache=True)
+def evaluate_signal(last, prev, thresholds, trade_type, position):
+    """趋势打分与信号判断, 返回(趋势编码, 上涨得分, 下跌得分, 信号编码)"""
+    # 与NaN比较结果为False, 取反条件写成not(...)以保持和原逻辑一致
+    ema_trend = last[COL_EMA_FAST] > last[COL_EMA_SLOW]
+    macd_trend = last[COL_MACD] > last[COL_MACD_SIGNAL]
+    adx_strong = last[COL_ADX] > thresholds[TH_ADX]
+    above_bb_mid = last[COL_CLOSE] > last[COL_BB_MIDDLE]
+    adx_direction = last[COL_ADX_POS] > last[COL_ADX_NEG]
+    
+    up_score = (int(ema_trend) + int(macd_trend) + int(adx_strong and adx_direction)
+                + int(above_bb_mid) + int(last[COL_CLOSE] > prev[COL_CLOSE]))
+    down_score = (int(not ema_trend) + int(not macd_trend) + int(adx_strong and not adx_direction)
+                  + int(not above_bb_mid) + int(last[COL_CLOSE] < prev[COL_CLOSE]))
+    
+    if up_score >= 3:
+        trend = TREND_UP
+    elif down_score >= 3:
+        trend = TREND_DOWN
+    else:
+        trend = TREND_SIDEWAYS
+    
+    # 绝大多数K线为HOLD: 开仓信号都要求趋势明确且放量, 先做廉价的整体拒绝
+    can_open = trend != TREND_SIDEWAYS and last[COL_VOLUME_RATIO] > thresholds[TH_VOLUME]
+    signal = SIG_HOLD
+    
+    if trade_type == TRADE_SPOT:
+        if not can_open:
+            return trend, up_score, down_score, signal
+        if (position <= 0 and trend == TREND_UP and ema_trend and macd_trend and
+                last[COL_MACD_HIST] > prev[COL_MACD_HIST] and
+                last[COL_RSI] < thresholds[TH_RSI_OVERBOUGHT]):
+            signal = SIG_BUY
+        elif (position > 0 and trend == TREND_DOWN and
+                last[COL_EMA_FAST] < last[COL_EMA_SLOW] and
+                last[COL_MACD] < last[COL_MACD_SIGNAL] and
+                last[COL_MACD_HIST] < prev[COL_MACD_HIST] and
+                last[COL_RSI] > thresholds[TH_RSI_OVERSOLD]):
+            signal = SIG_SELL
+    
+    elif trade_type == TRADE_FUTURES:
+        ema_down = last[COL_EMA_FAST] < last[COL_EMA_SLOW]
+        macd_down = last[COL_MACD] < last[COL_MACD_SIGNAL]
+        # 平仓信号不要求放量, 开仓分支不满足时仍需继续判断
+        if (can_open and position <= 0 and trend == TREND_UP and ema_trend and macd_trend and
+                above_bb_mid):
+            signal = SIG_LONG
+        elif (can_open and position >= 0 and trend == TREND_DOWN and ema_down and macd_down and
+                last[COL_CLOSE] < last[COL_BB_MIDDLE]):
+            signal = SIG_SHORT
+        elif position > 0 and (trend == TREND_DOWN or ema_down or macd_down):
+            signal = SIG_CLOSE_LONG
+        elif position < 0 and (trend == TREND_UP or ema_trend or macd_trend):
+            signal = SIG_CLOSE_SHORT
+    
+    return trend, up_score, down_score, signal
+
+@njit('void(float64[:, ::1], float64[:, ::1], float64[::1], int64, float64[::1], int8[::1], int8[::1])', cache=True)
+def evaluate_batch_serial(last, prev, thresholds, trade_type, positions, out_trend, out_signal):
+    """逐个交易对评估信号(串行版本)"""
+    for i in range(last.shape[0]):
+        trend, _, _, signal = evaluate_signal(last[i], prev[i], thresholds, trade_type, positions[i])
+        out_trend[i] = trend
+        out_signal[i] = signal
+
+@njit('void(float64[:, ::1], float64[:, ::1], float64[::1], int64, float64[::1], int8[::1], int8[::1])', parallel=True, cache=True)
+def evaluate_batch(last, prev, thresholds, trade_type, positions, out_trend, out_signal):
+    """多个交易对并行评估信号, last/prev形状为(N, len(SIGNAL_COLUMNS))"""
+    for i in prange(last.shape[0]):
+        trend, _, _, signal = evaluate_signal(last[i], prev[i], thresholds, trade_type, positions[i])
+        out_trend[i] = trend
+        out_signal[i] = signal
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+"""
+Numba可选依赖封装
+未安装numba时njit退化为原函数, prange退化为range
+"""
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+    prange = range
+    
+    def njit(*args, **kwargs):
+        """兼容@njit与@njit(...)两种写法的空装饰器"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Numba内核预编译
+安装后执行一次 python -m src._precompile, 把编译结果写入__pycache__, 之后启动直接加载缓存
+"""
+
+import numpy as np
+from loguru import logger
+
+from ._njit import HAS_NUMBA
+from . import _indicators_numba as nbi
+from ._risk_numba import position_pnl
+from ._analysis_numba import drawdown_duration, max_streak
+from . import _backtest_numba as nbb
+
+def warmup(n: int = 32):
+    """导入即按签名编译, 这里用假数据把每个内核调用一遍做校验"""
+    close = np.linspace(100.0, 101.0, n)
+    high = close + 0.5
+    low = close - 0.5
+    out = [np.empty(n) for _ in range(3)]
+    
+    nbi.ema(close, 12, out[0])
+    nbi.macd(close, 12, 26, 9, out[0], out[1], out[2])
+    nbi.rsi(close, 14, out[0])
+    nbi.bbands(close, 20, 2.0, out[0], out[1], out[2])
+    nbi.adx(high, low, close, 14, out[0], out[1], out[2])
+    
+    rows = np.zeros((2, len(nbi.SIGNAL_COLUMNS)))
+    thresholds = np.zeros(4)
+    nbi.evaluate_signal(rows[0], rows[1], thresholds, nbi.TRADE_SPOT, 0.0)
+    
+    positions = np.zeros(2)
+    out_trend = np.empty(2, dtype=np.int8)
+    out_signal = np.empty(2, dtype=np.int8)
+    nbi.evaluate_batch_serial(rows, rows, thresholds, nbi.TRADE_FUTURES, positions, out_trend, out_signal)
+    nbi.evaluate_batch(rows, rows, thresholds, nbi.TRADE_FUTURES, positions, out_trend, out_signal)
+    
+    position_pnl(1.0, 100.0, 101.0)
+    
+    drawdown_duration(close)
+    max_streak(close, 1)
+    
+    signals = np.zeros(n, dtype=np.int8)
+    state = np.array([1000.0, 0.0, 0.0])
+    trade_i = np.empty(n + 1, dtype=np.int64)
+    trade_k = np.empty(n + 1, dtype=np.int8)
+    trade_f = [np.empty(n + 1) for _ in range(3)]
+    nbb.run_backtest(close, signals, 0, 1.0, state, out[0], out[1], out[2],
+                     trade_i, trade_k, trade_f[0], trade_f[1], trade_f[2])
+
+def main():
+    """预编译入口"""
+    if not HAS_NUMBA:
+        logger.warning("未安装numba, 指标计算将使用ta库")
+        return
+    
+    warmup()
+    logger.info("Numba内核预编译完成")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+"""
+盈亏计算Numba内核
+显式声明签名, 导入时即编译并缓存到__pycache__
+"""
+
+from ._njit import njit
+
+@njit('float64(float64, float64, float64)', cache=True)
+def position_pnl(position, entry_price, current_price):
+    """持仓未实现盈亏, position为带符号持仓量(多头为正, 空头为负)"""
+    if position == 0.0 or entry_price == 0.0:
+        return 0.0
+    return (current_price - entry_price) * position
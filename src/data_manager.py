@@ -9,11 +9,301 @@ import pandas as pd
 import numpy as np
 import os
 import json
-from typing import Dict, List, Optional
+import itertools
+import csv
+import functools
+from typing import Dict, List, Optional, Tuple
+from collections import defaultdict
 from datetime import datetime, timedelta
+from dateutil import tz
 from loguru import logger
 import sqlite3
+import threading
+import atexit
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from urllib.parse import quote
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# SQLite连接参数(WAL模式 + 内存临时表 + 64MB页缓存)
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA busy_timeout=5000",
+)
+
+# 数据库结构版本(PRAGMA user_version), 1: timestamp改为INTEGER epoch毫秒, 2: 新增daily_stats日汇总表
+SCHEMA_VERSION = 2
+
+# 旧版TEXT时间戳 -> epoch毫秒; 交易/信号按本地时间写入, K线为交易所UTC时间
+LEGACY_TIMESTAMP_SQL = {
+    'trades': "CAST(ROUND((julianday(timestamp, 'utc') - 2440587.5) * 86400000) AS INTEGER)",
+    'signals': "CAST(ROUND((julianday(timestamp, 'utc') - 2440587.5) * 86400000) AS INTEGER)",
+    'klines': "CAST(ROUND((julianday(timestamp) - 2440587.5) * 86400000) AS INTEGER)",
+}
+
+def to_epoch_ms(value=None) -> int:
+    """转换为epoch毫秒; None表示当前时间, 无时区的时间按本地时间处理"""
+    if value is None:
+        return time.time_ns() // 1_000_000
+    if isinstance(value, (int, float, np.number)):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    elif isinstance(value, pd.Timestamp):
+        value = value.to_pydatetime()
+    return int(value.timestamp() * 1000)
+
+def format_epoch_ms(ms: int) -> str:
+    """epoch毫秒格式化为本地时间ISO字符串(仅用于展示/CSV)"""
+    return datetime.fromtimestamp(ms / 1000).isoformat(timespec='milliseconds')
+
+# K线周期单位(秒), 与ccxt的timeframe写法一致
+TIMEFRAME_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800, 'M': 2592000}
+
+def timeframe_seconds(timeframe: str) -> int:
+    """K线周期转换为秒数, 如'15m' -> 900"""
+    return int(timeframe[:-1]) * TIMEFRAME_UNITS[timeframe[-1]]
+
+def _today() -> str:
+    """本地日期字符串YYYY-MM-DD"""
+    return time.strftime('%Y-%m-%d')
+
+def from_epoch_ms(values: pd.Series, local: bool = True) -> pd.Series:
+    """epoch毫秒转为无时区时间(默认本地时间, 按各时间点自身的夏令时偏移, 与datetime.fromtimestamp一致)"""
+    ts = pd.to_datetime(values, unit='ms', utc=True)
+    if local:
+        # gettz()返回本地时区文件(含夏令时切换表), 可向量化转换; tzlocal()会逐元素计算
+        ts = ts.dt.tz_convert(tz.gettz())
+    return ts.dt.tz_localize(None)
+
+MS_PER_DAY = 86_400_000
+
+# K线写入合并: 累计达到行数或距首条入队超过秒数时批量落盘
+KLINES_FLUSH_ROWS = 500
+KLINES_FLUSH_INTERVAL = 5.0
+KLINES_COLUMNS = ('timestamp', 'symbol', 'timeframe', 'open', 'high', 'low', 'close', 'volume')
+
+# 清理旧数据时每批删除的行数(批间释放写锁)
+CLEANUP_BATCH_SIZE = 10000
+
+# 交易/信号记录的列顺序与缺省值, timestamp固定在首列, 信号的indicators固定在末列(JSON)
+TRADE_FIELDS = (
+    ('timestamp', None), ('symbol', ''), ('side', ''), ('amount', 0), ('price', 0),
+    ('value', 0), ('fee', 0), ('pnl', 0), ('signal_type', ''), ('order_id', ''),
+    ('status', 'completed'),
+)
+SIGNAL_FIELDS = (
+    ('timestamp', None), ('symbol', ''), ('signal_type', ''), ('price', 0),
+    ('confidence', 0), ('executed', False), ('indicators', None),
+)
+
+def _insert_sql(table: str, fields: Tuple) -> str:
+    return (f"INSERT INTO {table} ({', '.join(name for name, _ in fields)}) "
+            f"VALUES ({', '.join('?' * len(fields))})")
+
+TRADE_INSERT_SQL = _insert_sql('trades', TRADE_FIELDS)
+SIGNAL_INSERT_SQL = _insert_sql('signals', SIGNAL_FIELDS)
+
+def _atomic_write(path: Path, payload: bytes):
+    """先写临时文件再原子替换, 读取方不会看到半截文件"""
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+def write_csv(df: pd.DataFrame, path: Path):
+    """用pyarrow的原生CSV写出器导出DataFrame"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    pacsv.write_csv(table, path, write_options=pacsv.WriteOptions(batch_size=65536))
+
+# K线批量写入语句(按主键去重覆盖)
+KLINES_UPSERT_SQL = (
+    "INSERT OR REPLACE INTO klines "
+    "(timestamp, symbol, timeframe, open, high, low, close, volume) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+# 交易日汇总表(按本地日期), 由trades表触发器增量维护, 监控工具直接读取汇总行
+TRADE_DATE_SQL = "date({}.timestamp / 1000, 'unixepoch', 'localtime')"
+DAILY_STATS_COLUMNS = "date, trades, total_pnl, pnl_sq, win_count, loss_count, win_pnl, loss_pnl"
+
+def _daily_stats_values(row: str) -> str:
+    """单笔交易对日汇总各列的贡献(pnl为NULL按0计)"""
+    pnl = f"COALESCE({row}.pnl, 0)"
+    return (f"{TRADE_DATE_SQL.format(row)}, 1, {pnl}, {pnl} * {pnl}, {pnl} > 0, {pnl} < 0, "
+            f"max({pnl}, 0), min({pnl}, 0)")
+
+DAILY_STATS_SQL = (
+    '''
+    CREATE TABLE IF NOT EXISTS daily_stats (
+        date TEXT PRIMARY KEY,
+        trades INTEGER NOT NULL DEFAULT 0,
+        total_pnl REAL NOT NULL DEFAULT 0,
+        pnl_sq REAL NOT NULL DEFAULT 0,
+        win_count INTEGER NOT NULL DEFAULT 0,
+        loss_count INTEGER NOT NULL DEFAULT 0,
+        win_pnl REAL NOT NULL DEFAULT 0,
+        loss_pnl REAL NOT NULL DEFAULT 0
+    )
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trades_daily_stats_insert AFTER INSERT ON trades BEGIN
+        INSERT INTO daily_stats ({DAILY_STATS_COLUMNS}) VALUES ({_daily_stats_values('NEW')})
+        ON CONFLICT(date) DO UPDATE SET
+            trades = trades + excluded.trades,
+            total_pnl = total_pnl + excluded.total_pnl,
+            pnl_sq = pnl_sq + excluded.pnl_sq,
+            win_count = win_count + excluded.win_count,
+            loss_count = loss_count + excluded.loss_count,
+            win_pnl = win_pnl + excluded.win_pnl,
+            loss_pnl = loss_pnl + excluded.loss_pnl;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trades_daily_stats_delete AFTER DELETE ON trades BEGIN
+        UPDATE daily_stats SET
+            trades = trades - 1,
+            total_pnl = total_pnl - COALESCE(OLD.pnl, 0),
+            pnl_sq = pnl_sq - COALESCE(OLD.pnl, 0) * COALESCE(OLD.pnl, 0),
+            win_count = win_count - (COALESCE(OLD.pnl, 0) > 0),
+            loss_count = loss_count - (COALESCE(OLD.pnl, 0) < 0),
+            win_pnl = win_pnl - max(COALESCE(OLD.pnl, 0), 0),
+            loss_pnl = loss_pnl - min(COALESCE(OLD.pnl, 0), 0)
+        WHERE date = {TRADE_DATE_SQL.format('OLD')};
+    END
+    ''',
+)
+
+# 由trades全量重建日汇总(升级到结构版本2时执行一次)
+DAILY_STATS_REBUILD_SQL = f'''
+    INSERT INTO daily_stats ({DAILY_STATS_COLUMNS})
+    SELECT {TRADE_DATE_SQL.format('trades')} AS day, COUNT(*),
+           SUM(COALESCE(pnl, 0)), SUM(COALESCE(pnl, 0) * COALESCE(pnl, 0)),
+           SUM(COALESCE(pnl, 0) > 0), SUM(COALESCE(pnl, 0) < 0),
+           SUM(max(COALESCE(pnl, 0), 0)), SUM(min(COALESCE(pnl, 0), 0))
+    FROM trades GROUP BY day
+'''
+
+class PerformanceStats:
+    """增量性能统计(每笔交易O(1)更新, 按写入顺序累计, 与按时间正序的全量计算一致)"""
+    
+    FIELDS = ('n', 'w', 'l', 'sum', 'sumsq', 'sum_win', 'sum_loss',
+              'max', 'min', 'cum', 'run_max', 'max_dd')
+    
+    def __init__(self):
+        self.n = 0
+        self.w = 0
+        self.l = 0
+        self.sum = 0.0
+        self.sumsq = 0.0
+        self.sum_win = 0.0
+        self.sum_loss = 0.0
+        self.max = -np.inf
+        self.min = np.inf
+        self.cum = 0.0
+        self.run_max = 0.0
+        self.max_dd = 0.0
+    
+    def update(self, pnl: float):
+        """累加一笔交易的盈亏"""
+        pnl = float(pnl)
+        self.n += 1
+        if pnl > 0:
+            self.w += 1
+            self.sum_win += pnl
+        elif pnl < 0:
+            self.l += 1
+            self.sum_loss += pnl
+        
+        self.sum += pnl
+        self.sumsq += pnl * pnl
+        self.max = max(self.max, pnl)
+        self.min = min(self.min, pnl)
+        
+        # 回撤: 累计盈亏未创出正高点前不计回撤
+        self.cum += pnl
+        self.run_max = max(self.run_max, self.cum)
+        if self.run_max > 0:
+            drawdown = (self.run_max - self.cum) / self.run_max * 100
+            self.max_dd = max(self.max_dd, drawdown)
+    
+    @classmethod
+    def from_pnl(cls, pnl: np.ndarray) -> 'PerformanceStats':
+        """由按时间排序的盈亏序列一次性构建(用于从数据库重建)"""
+        stats = cls()
+        pnl = np.asarray(pnl, dtype=np.float64)
+        if pnl.size == 0:
+            return stats
+        
+        wins = pnl[pnl > 0]
+        losses = pnl[pnl < 0]
+        cumulative_pnl = np.cumsum(pnl)
+        running_max = np.maximum.accumulate(cumulative_pnl)
+        peak = np.where(running_max > 0, running_max, np.inf)
+        
+        stats.n = int(pnl.size)
+        stats.w = int(wins.size)
+        stats.l = int(losses.size)
+        stats.sum = float(pnl.sum())
+        stats.sumsq = float(np.dot(pnl, pnl))
+        stats.sum_win = float(wins.sum())
+        stats.sum_loss = float(losses.sum())
+        stats.max = float(pnl.max())
+        stats.min = float(pnl.min())
+        stats.cum = float(cumulative_pnl[-1])
+        stats.run_max = max(0.0, float(running_max.max()))
+        stats.max_dd = float(((running_max - cumulative_pnl) / peak * 100).max())
+        return stats
+    
+    def metrics(self) -> Dict:
+        """由累加量推导性能指标(字段与calculate_performance_metrics一致)"""
+        if self.n == 0:
+            return {}
+        
+        avg_pnl = self.sum / self.n
+        win_rate = self.w / self.n * 100
+        avg_profit = self.sum_win / self.w if self.w > 0 else 0
+        avg_loss = abs(self.sum_loss / self.l) if self.l > 0 else 0
+        profit_loss_ratio = avg_profit / avg_loss if avg_loss > 0 else 0
+        
+        # 样本方差 = (Σx² - (Σx)²/n) / (n-1)
+        if self.n > 1:
+            variance = max((self.sumsq - self.sum * self.sum / self.n) / (self.n - 1), 0.0)
+            pnl_std = np.sqrt(variance)
+        else:
+            pnl_std = 0
+        sharpe_ratio = avg_pnl / pnl_std * np.sqrt(252) if pnl_std > 0 else 0
+        
+        return {
+            'total_trades': self.n,
+            'winning_trades': self.w,
+            'losing_trades': self.l,
+            'win_rate': round(win_rate, 2),
+            'total_pnl': round(self.sum, 4),
+            'avg_pnl': round(avg_pnl, 4),
+            'max_profit': round(self.max, 4),
+            'max_loss': round(self.min, 4),
+            'profit_loss_ratio': round(profit_loss_ratio, 2),
+            'max_drawdown': round(self.max_dd, 2),
+            'sharpe_ratio': round(float(sharpe_ratio), 2)
+        }
+    
+    def to_dict(self) -> Dict:
+        return {field: getattr(self, field) for field in self.FIELDS}
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'PerformanceStats':
+        stats = cls()
+        for field in cls.FIELDS:
+            setattr(stats, field, data[field])
+        return stats
 
 class DataManager:
     """数据管理器"""
@@ -30,27 +320,69 @@ class DataManager:
         
         # 数据文件路径
         self.trades_file = self.data_dir / 'trades.csv'
-        self.klines_file = self.data_dir / 'klines.csv'
+        self.klines_dir = self.data_dir / 'klines'
         self.signals_file = self.data_dir / 'signals.csv'
         self.performance_file = self.data_dir / 'performance.json'
+        self.stats_file = self.data_dir / 'performance_stats.json'
         self.db_file = self.data_dir / 'trading_bot.db'
         
+        # 数据库连接: 单一写连接 + 每线程只读连接(WAL下读写互不阻塞)
+        self.conn: Optional[sqlite3.Connection] = None
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._read_conns: List[sqlite3.Connection] = []
+        
+        # 常驻的CSV追加写入句柄
+        self._csv_files: Dict[Path, Tuple] = {}
+        self._csv_lock = threading.Lock()
+        self._klines_lock = threading.Lock()
+        
+        # 近期K线查询缓存: 按K线周期分桶, 写入新K线时版本号递增使缓存失效
+        self._klines_version: Dict[Tuple[str, str], int] = {}
+        self._load_klines_cached = functools.lru_cache(maxsize=64)(self._query_klines)
+        
+        # K线写入队列, 按(symbol, timeframe)合并后批量写入
+        self._klines_queue: Dict[Tuple[str, str], List[tuple]] = defaultdict(list)
+        self._klines_pending = 0
+        self._klines_queue_lock = threading.Lock()
+        self._flush_timer: Optional[threading.Timer] = None
+        
+        # 后台写文件(write-behind), 每个文件只保留最新一份待写内容
+        self._bg_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='data-writer')
+        self._pending_writes: Dict[Path, bytes] = {}
+        self._pending_lock = threading.Lock()
+        
+        # 增量性能统计(全部交易 + 当日交易)
+        self._stats = PerformanceStats()
+        self._daily_stats = PerformanceStats()
+        self._daily_date = _today()
+        
         # 初始化数据库
         self._init_database()
+        self._load_performance_stats()
         
         logger.info("数据管理器初始化完成")
     
     def _init_database(self):
         """初始化SQLite数据库"""
         try:
-            conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
+            self.conn = self._connect()
+            cursor = self.conn.cursor()
+            
+            # 增量回收空闲页; 已有数据库需VACUUM一次才能切换
+            if cursor.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                cursor.execute("VACUUM")
+            
+            # 旧版TEXT时间戳表先改名, 建表后再迁移数据
+            version = cursor.execute("PRAGMA user_version").fetchone()[0]
+            legacy_tables = self._rename_legacy_tables(cursor) if version < SCHEMA_VERSION else []
             
             # 创建交易记录表
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS trades (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
+                    timestamp INTEGER NOT NULL,
                     symbol TEXT NOT NULL,
                     side TEXT NOT NULL,
                     amount REAL NOT NULL,
@@ -68,7 +400,7 @@ class DataManager:
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS klines (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
+                    timestamp INTEGER NOT NULL,
                     symbol TEXT NOT NULL,
                     timeframe TEXT NOT NULL,
                     open REAL NOT NULL,
@@ -84,7 +416,7 @@ class DataManager:
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS signals (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
+                    timestamp INTEGER NOT NULL,
                     symbol TEXT NOT NULL,
                     signal_type TEXT NOT NULL,
                     price REAL NOT NULL,
@@ -109,8 +441,27 @@ class DataManager:
                 )
             ''')
             
-            conn.commit()
-            conn.close()
+            if legacy_tables:
+                self._migrate_legacy_tables(cursor, legacy_tables)
+            
+            # 交易日汇总表与维护触发器, 旧库升级时由已有交易重建
+            for statement in DAILY_STATS_SQL:
+                cursor.execute(statement)
+            if version < 2:
+                cursor.execute("DELETE FROM daily_stats")
+                cursor.execute(DAILY_STATS_REBUILD_SQL)
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            
+            # 时间范围查询/清理所用索引
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_trades_ts ON trades(timestamp)")
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_klines_sym_tf_ts "
+                "ON klines(symbol, timeframe, timestamp DESC)"
+            )
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_signals_ts ON signals(timestamp)")
+            
+            self.conn.commit()
+            atexit.register(self.close)
             
             logger.info("数据库初始化完成")
             
@@ -118,38 +469,91 @@ class DataManager:
             logger.error(f"数据库初始化失败: {e}")
             raise
     
+    def _rename_legacy_tables(self, cursor: sqlite3.Cursor) -> List[str]:
+        """将timestamp仍为TEXT的旧表改名为<table>_legacy"""
+        legacy_tables = []
+        for table in LEGACY_TIMESTAMP_SQL:
+            columns = cursor.execute(f"PRAGMA table_info({table})").fetchall()
+            if any(col[1] == 'timestamp' and col[2].upper() == 'TEXT' for col in columns):
+                legacy_tables.append(table)
+        
+        if legacy_tables:
+            cursor.execute("BEGIN")
+            for table in legacy_tables:
+                cursor.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+        return legacy_tables
+    
+    def _migrate_legacy_tables(self, cursor: sqlite3.Cursor, legacy_tables: List[str]):
+        """把旧表数据转换为epoch毫秒写入新表"""
+        for table in legacy_tables:
+            columns = [col[1] for col in cursor.execute(f"PRAGMA table_info({table}_legacy)")]
+            select = ", ".join(
+                LEGACY_TIMESTAMP_SQL[table] if col == 'timestamp' else col for col in columns
+            )
+            cursor.execute(
+                f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) "
+                f"SELECT {select} FROM {table}_legacy"
+            )
+            cursor.execute(f"DROP TABLE {table}_legacy")
+            logger.info(f"数据表{table}时间戳已迁移为epoch毫秒")
+    
+    def _connect(self) -> sqlite3.Connection:
+        """创建数据库连接并应用连接参数"""
+        conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        for pragma in SQLITE_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+    
+    def _read_conn(self) -> sqlite3.Connection:
+        """获取当前线程的只读连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._write_lock:
+                self._read_conns.append(conn)
+        return conn
+    
+    def close(self):
+        """关闭CSV文件与数据库连接"""
+        self._flush_klines()
+        self._save_performance_stats()
+        self._bg_executor.shutdown(wait=True)
+        
+        with self._csv_lock:
+            for handle, _ in self._csv_files.values():
+                handle.close()
+            self._csv_files.clear()
+        
+        with self._write_lock:
+            for conn in self._read_conns:
+                conn.close()
+            self._read_conns.clear()
+            
+            if self.conn is not None:
+                # 按需刷新查询规划器统计信息, 使时间范围查询稳定走索引
+                self.conn.execute("PRAGMA optimize")
+                self.conn.close()
+                self.conn = None
+    
     def save_trade(self, trade_data: Dict):
         """保存交易记录"""
         try:
-            # 保存到数据库
-            conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
+            get = trade_data.get
+            timestamp = to_epoch_ms(get('timestamp'))
+            row = (
+                timestamp,
+                *[get(name, default) for name, default in TRADE_FIELDS[1:]]
+            )
             
-            cursor.execute('''
-                INSERT INTO trades (
-                    timestamp, symbol, side, amount, price, value, 
-                    fee, pnl, signal_type, order_id, status
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                trade_data.get('timestamp', datetime.now().isoformat()),
-                trade_data.get('symbol', ''),
-                trade_data.get('side', ''),
-                trade_data.get('amount', 0),
-                trade_data.get('price', 0),
-                trade_data.get('value', 0),
-                trade_data.get('fee', 0),
-                trade_data.get('pnl', 0),
-                trade_data.get('signal_type', ''),
-                trade_data.get('order_id', ''),
-                trade_data.get('status', 'completed')
-            ))
-            
-            conn.commit()
-            conn.close()
+            # 保存到数据库
+            with self._write_lock, self.conn:
+                self.conn.execute(TRADE_INSERT_SQL, row)
+                self._update_performance_stats(get('pnl', 0))
             
             # 保存到CSV文件(如果配置启用)
             if self.data_config.get('save_trades', True):
-                self._save_to_csv(trade_data, self.trades_file)
+                self._save_to_csv({**trade_data, 'timestamp': format_epoch_ms(timestamp)}, self.trades_file)
             
             logger.info(f"交易记录保存成功: {trade_data.get('side')} {trade_data.get('amount')} @ {trade_data.get('price')}")
             
@@ -159,62 +563,148 @@ class DataManager:
     def save_klines(self, klines_data: pd.DataFrame, symbol: str, timeframe: str):
         """保存K线数据"""
         try:
-            # 保存到数据库
-            conn = sqlite3.connect(self.db_file)
+            # 按列批量构建记录，避免逐行iterrows
+            index = klines_data.index
+            if not isinstance(index, pd.DatetimeIndex):
+                index = pd.to_datetime(index)
+            timestamps = index.as_unit('ms').asi8.tolist()
+            
+            o, h, l, c, v = [
+                klines_data[col].to_numpy(dtype='float64').tolist()
+                for col in ('open', 'high', 'low', 'close', 'volume')
+            ]
+            rows = zip(
+                timestamps, itertools.repeat(symbol), itertools.repeat(timeframe),
+                o, h, l, c, v
+            )
+            
+            # 加入写入队列, 达到行数阈值立即落盘, 否则由定时器在间隔后落盘
+            with self._klines_queue_lock:
+                self._klines_queue[(symbol, timeframe)].extend(rows)
+                self._klines_pending += len(timestamps)
+                flush_now = self._klines_pending >= KLINES_FLUSH_ROWS
+                
+                if not flush_now and self._flush_timer is None:
+                    self._flush_timer = threading.Timer(KLINES_FLUSH_INTERVAL, self._flush_klines)
+                    self._flush_timer.daemon = True
+                    self._flush_timer.start()
             
-            for index, row in klines_data.iterrows():
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT OR REPLACE INTO klines (
-                        timestamp, symbol, timeframe, open, high, low, close, volume
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    index.isoformat() if hasattr(index, 'isoformat') else str(index),
-                    symbol,
-                    timeframe,
-                    float(row['open']),
-                    float(row['high']),
-                    float(row['low']),
-                    float(row['close']),
-                    float(row['volume'])
-                ))
+            if flush_now:
+                self._flush_klines()
             
-            conn.commit()
-            conn.close()
+            logger.debug("K线数据已加入写入队列: {}条记录", len(timestamps))
             
-            # 保存到CSV文件(如果配置启用)
+        except Exception as e:
+            logger.error(f"保存K线数据失败: {e}")
+    
+    def _flush_klines(self):
+        """将队列中的K线在单个事务内批量写入数据库与Parquet"""
+        with self._klines_queue_lock:
+            batches = self._klines_queue
+            self._klines_queue = defaultdict(list)
+            self._klines_pending = 0
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+        
+        if not batches:
+            return
+        
+        try:
+            # 保存到数据库(单事务批量写入)
+            with self._write_lock, self.conn:
+                for key, rows in batches.items():
+                    self.conn.executemany(KLINES_UPSERT_SQL, rows)
+                    self._klines_version[key] = self._klines_version.get(key, 0) + 1
+            
+            # 保存到Parquet列式存储(如果配置启用)
             if self.data_config.get('save_klines', True):
-                klines_data.to_csv(self.klines_file, mode='a', header=not self.klines_file.exists())
+                for (symbol, timeframe), rows in batches.items():
+                    df = pd.DataFrame(rows, columns=KLINES_COLUMNS).drop(columns=['symbol', 'timeframe'])
+                    self._save_klines_parquet(df, symbol, timeframe)
             
-            logger.debug(f"K线数据保存成功: {len(klines_data)}条记录")
+            logger.debug(f"K线数据保存成功: {sum(len(rows) for rows in batches.values())}条记录")
             
         except Exception as e:
-            logger.error(f"保存K线数据失败: {e}")
+            logger.error(f"批量写入K线数据失败: {e}")
+    
+    def _klines_partition(self, symbol: str, timeframe: str) -> Path:
+        """K线Parquet分区目录(hive风格: symbol=/timeframe=/date=)"""
+        return self.klines_dir / f"symbol={quote(symbol, safe='')}" / f"timeframe={quote(timeframe, safe='')}"
+    
+    def _save_klines_parquet(self, df: pd.DataFrame, symbol: str, timeframe: str):
+        """按UTC日期分区写入Parquet, 与当日已有数据合并去重"""
+        dates = (df['timestamp'].to_numpy() // MS_PER_DAY).astype('datetime64[D]').astype(str)
+        partition = self._klines_partition(symbol, timeframe)
+        
+        with self._klines_lock:
+            for date, day_df in df.groupby(dates, sort=False):
+                day_dir = partition / f"date={date}"
+                day_dir.mkdir(parents=True, exist_ok=True)
+                day_file = day_dir / 'part-0.parquet'
+                
+                if day_file.exists():
+                    day_df = pd.concat([pq.read_table(day_file).to_pandas(), day_df])
+                day_df = (day_df.drop_duplicates('timestamp', keep='last')
+                          .sort_values('timestamp'))
+                
+                # 先写临时文件再替换, 避免读到写了一半的文件
+                tmp_file = day_file.with_suffix('.tmp')
+                pq.write_table(pa.Table.from_pandas(day_df, preserve_index=False), tmp_file)
+                os.replace(tmp_file, day_file)
+    
+    def load_klines_history(self, symbol: str, timeframe: str,
+                            start_date: Optional[str] = None,
+                            end_date: Optional[str] = None) -> pd.DataFrame:
+        """从Parquet存储加载K线历史(SQLite仅保留近期数据), 时间范围按UTC解释"""
+        try:
+            if self._klines_queue.get((symbol, timeframe)):
+                self._flush_klines()
+            
+            partition = self._klines_partition(symbol, timeframe)
+            if not partition.exists():
+                return pd.DataFrame()
+            
+            dataset = ds.dataset(partition, format='parquet', partitioning='hive')
+            
+            conditions = []
+            if start_date:
+                conditions.append(ds.field('timestamp') >= pd.Timestamp(start_date).value // 1_000_000)
+            if end_date:
+                conditions.append(ds.field('timestamp') <= pd.Timestamp(end_date).value // 1_000_000)
+            
+            filter_expr = None
+            for condition in conditions:
+                filter_expr = condition if filter_expr is None else filter_expr & condition
+            
+            columns = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+            df = dataset.to_table(columns=columns, filter=filter_expr).to_pandas()
+            
+            if not df.empty:
+                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+                df = df.set_index('timestamp').sort_index()
+            
+            logger.debug(f"加载K线历史: {len(df)}条")
+            return df
+            
+        except Exception as e:
+            logger.error(f"加载K线历史失败: {e}")
+            return pd.DataFrame()
     
     def save_signal(self, signal_data: Dict):
         """保存交易信号"""
         try:
-            conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
+            get = signal_data.get
+            row = (
+                to_epoch_ms(get('timestamp')),
+                *[get(name, default) for name, default in SIGNAL_FIELDS[1:-1]],
+                json.dumps(get('indicators', {}))
+            )
             
-            cursor.execute('''
-                INSERT INTO signals (
-                    timestamp, symbol, signal_type, price, confidence, indicators, executed
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                signal_data.get('timestamp', datetime.now().isoformat()),
-                signal_data.get('symbol', ''),
-                signal_data.get('signal_type', ''),
-                signal_data.get('price', 0),
-                signal_data.get('confidence', 0),
-                json.dumps(signal_data.get('indicators', {})),
-                signal_data.get('executed', False)
-            ))
-            
-            conn.commit()
-            conn.close()
-            
-            logger.debug(f"交易信号保存成功: {signal_data.get('signal_type')} @ {signal_data.get('price')}")
+            with self._write_lock, self.conn:
+                self.conn.execute(SIGNAL_INSERT_SQL, row)
+            
+            logger.debug("交易信号保存成功: {} @ {}", get('signal_type'), get('price'))
             
         except Exception as e:
             logger.error(f"保存交易信号失败: {e}")
@@ -222,41 +712,62 @@ class DataManager:
     def _save_to_csv(self, data: Dict, file_path: Path):
         """保存数据到CSV文件"""
         try:
-            df = pd.DataFrame([data])
-            df.to_csv(file_path, mode='a', header=not file_path.exists(), index=False)
+            with self._csv_lock:
+                self._csv_writer(file_path, data).writerow(data)
             
         except Exception as e:
             logger.error(f"保存CSV文件失败: {e}")
     
+    def _csv_writer(self, file_path: Path, data: Dict) -> csv.DictWriter:
+        """获取CSV文件的常驻写入器(首次打开时确定表头)"""
+        entry = self._csv_files.get(file_path)
+        if entry is not None:
+            return entry[1]
+        
+        is_new = not file_path.exists() or file_path.stat().st_size == 0
+        if is_new:
+            fieldnames = list(data.keys())
+        else:
+            # 沿用已有文件的表头
+            with open(file_path, 'r', newline='', encoding='utf-8') as f:
+                fieldnames = next(csv.reader(f))
+        
+        handle = open(file_path, 'a', newline='', encoding='utf-8', buffering=1 << 16)
+        writer = csv.DictWriter(handle, fieldnames=fieldnames, extrasaction='ignore')
+        if is_new:
+            writer.writeheader()
+        
+        self._csv_files[file_path] = (handle, writer)
+        return writer
+    
+    def flush(self):
+        """将缓冲的CSV数据写入磁盘"""
+        with self._csv_lock:
+            for handle, _ in self._csv_files.values():
+                handle.flush()
+    
     def load_trades(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
         """加载交易记录"""
         try:
-            conn = sqlite3.connect(self.db_file)
-            
             query = "SELECT * FROM trades"
             params = []
             
-            if start_date or end_date:
-                query += " WHERE"
-                conditions = []
-                
-                if start_date:
-                    conditions.append(" timestamp >= ?")
-                    params.append(start_date)
-                
-                if end_date:
-                    conditions.append(" timestamp <= ?")
-                    params.append(end_date)
-                
-                query += " AND".join(conditions)
+            if start_date and end_date:
+                query += " WHERE timestamp BETWEEN ? AND ?"
+                params.extend([to_epoch_ms(start_date), to_epoch_ms(end_date)])
+            elif start_date:
+                query += " WHERE timestamp >= ?"
+                params.append(to_epoch_ms(start_date))
+            elif end_date:
+                query += " WHERE timestamp <= ?"
+                params.append(to_epoch_ms(end_date))
             
             query += " ORDER BY timestamp DESC"
             
-            df = pd.read_sql_query(query, conn, params=params)
-            conn.close()
+            df = pd.read_sql_query(query, self._read_conn(), params=params)
             
             if not df.empty:
-                df['timestamp'] = pd.to_datetime(df['timestamp'])
+                df['timestamp'] = from_epoch_ms(df['timestamp'])
             
             logger.debug(f"加载交易记录: {len(df)}条")
             return df
@@ -265,26 +776,37 @@ class DataManager:
             logger.error(f"加载交易记录失败: {e}")
             return pd.DataFrame()
     
+    def _query_klines(self, symbol: str, timeframe: str, limit: int,
+                      bucket: int, version: int) -> pd.DataFrame:
+        """查询最近limit根K线(bucket/version仅作为缓存键)"""
+        query = '''
+            SELECT timestamp, open, high, low, close, volume 
+            FROM klines 
+            WHERE symbol = ? AND timeframe = ? 
+            ORDER BY timestamp DESC 
+            LIMIT ?
+        '''
+        
+        df = pd.read_sql_query(query, self._read_conn(), params=[symbol, timeframe, limit])
+        
+        if not df.empty:
+            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+            df.set_index('timestamp', inplace=True)
+            df = df.sort_index()  # 按时间正序排列
+        
+        return df
+    
     def load_klines(self, symbol: str, timeframe: str, limit: int = 1000) -> pd.DataFrame:
         """加载K线数据"""
         try:
-            conn = sqlite3.connect(self.db_file)
+            # 先落盘队列中的K线, 保证读到最新写入
+            if self._klines_queue.get((symbol, timeframe)):
+                self._flush_klines()
             
-            query = '''
-                SELECT timestamp, open, high, low, close, volume 
-                FROM klines 
-                WHERE symbol = ? AND timeframe = ? 
-                ORDER BY timestamp DESC 
-                LIMIT ?
-            '''
-            
-            df = pd.read_sql_query(query, conn, params=[symbol, timeframe, limit])
-            conn.close()
-            
-            if not df.empty:
-                df['timestamp'] = pd.to_datetime(df['timestamp'])
-                df.set_index('timestamp', inplace=True)
-                df = df.sort_index()  # 按时间正序排列
+            # 同一根K线内且无新写入时直接复用缓存结果
+            bucket = int(time.time() // timeframe_seconds(timeframe))
+            version = self._klines_version.get((symbol, timeframe), 0)
+            df = self._load_klines_cached(symbol, timeframe, limit, bucket, version).copy()
             
             logger.debug(f"加载K线数据: {len(df)}条")
             return df
@@ -296,23 +818,20 @@ class DataManager:
     def load_signals(self, start_date: Optional[str] = None, limit: int = 100) -> pd.DataFrame:
         """加载交易信号"""
         try:
-            conn = sqlite3.connect(self.db_file)
-            
             query = "SELECT * FROM signals"
             params = []
             
             if start_date:
                 query += " WHERE timestamp >= ?"
-                params.append(start_date)
+                params.append(to_epoch_ms(start_date))
             
             query += " ORDER BY timestamp DESC LIMIT ?"
             params.append(limit)
             
-            df = pd.read_sql_query(query, conn, params=params)
-            conn.close()
+            df = pd.read_sql_query(query, self._read_conn(), params=params)
             
             if not df.empty:
-                df['timestamp'] = pd.to_datetime(df['timestamp'])
+                df['timestamp'] = from_epoch_ms(df['timestamp'])
             
             logger.debug(f"加载交易信号: {len(df)}条")
             return df
@@ -327,34 +846,45 @@ class DataManager:
             if trades_df.empty:
                 return {}
             
+            # 回撤按时间正序累计(与增量统计一致), load_trades返回的是倒序
+            order = 'id' if 'id' in trades_df.columns else 'timestamp'
+            trades_df = trades_df.sort_values(order, kind='stable')
+            
+            # 只取一次pnl数组，后续统计均基于numpy完成(NULL盈亏按0计, 与增量统计一致)
+            pnl = trades_df['pnl'].fillna(0).to_numpy(dtype=np.float64)
+            wins = pnl[pnl > 0]
+            losses = pnl[pnl < 0]
+            
             # 基础统计
-            total_trades = len(trades_df)
-            winning_trades = len(trades_df[trades_df['pnl'] > 0])
-            losing_trades = len(trades_df[trades_df['pnl'] < 0])
+            total_trades = pnl.size
+            winning_trades = wins.size
+            losing_trades = losses.size
             
             # 盈亏统计
-            total_pnl = trades_df['pnl'].sum()
-            avg_pnl = trades_df['pnl'].mean()
-            max_profit = trades_df['pnl'].max()
-            max_loss = trades_df['pnl'].min()
+            total_pnl = pnl.sum()
+            avg_pnl = total_pnl / total_trades
+            max_profit = pnl.max()
+            max_loss = pnl.min()
             
             # 胜率
             win_rate = winning_trades / total_trades * 100 if total_trades > 0 else 0
             
             # 盈亏比
-            avg_profit = trades_df[trades_df['pnl'] > 0]['pnl'].mean() if winning_trades > 0 else 0
-            avg_loss = abs(trades_df[trades_df['pnl'] < 0]['pnl'].mean()) if losing_trades > 0 else 0
+            avg_profit = wins.mean() if winning_trades > 0 else 0
+            avg_loss = abs(losses.mean()) if losing_trades > 0 else 0
             profit_loss_ratio = avg_profit / avg_loss if avg_loss > 0 else 0
             
-            # 最大回撤
-            cumulative_pnl = trades_df['pnl'].cumsum()
-            running_max = cumulative_pnl.expanding().max()
-            drawdown = (running_max - cumulative_pnl) / running_max * 100
-            max_drawdown = drawdown.max() if not drawdown.empty else 0
-            
-            # 夏普比率(简化计算)
-            if trades_df['pnl'].std() > 0:
-                sharpe_ratio = avg_pnl / trades_df['pnl'].std() * np.sqrt(252)  # 年化
+            # 最大回撤(累计盈亏未创出正高点前不计回撤)
+            cumulative_pnl = np.cumsum(pnl)
+            running_max = np.maximum.accumulate(cumulative_pnl)
+            peak = np.where(running_max > 0, running_max, np.inf)
+            drawdown = (running_max - cumulative_pnl) / peak * 100
+            max_drawdown = drawdown.max()
+            
+            # 夏普比率(简化计算, 样本标准差)
+            pnl_std = pnl.std(ddof=1) if total_trades > 1 else 0
+            if pnl_std > 0:
+                sharpe_ratio = avg_pnl / pnl_std * np.sqrt(252)  # 年化
             else:
                 sharpe_ratio = 0
             
@@ -379,37 +909,130 @@ class DataManager:
             logger.error(f"计算性能指标失败: {e}")
             return {}
     
+    def _update_performance_stats(self, pnl: float):
+        """新交易写入后增量更新统计(调用方持有写锁)"""
+        today = _today()
+        if today != self._daily_date:
+            self._daily_stats = PerformanceStats()
+            self._daily_date = today
+        
+        pnl = pnl or 0
+        self._stats.update(pnl)
+        self._daily_stats.update(pnl)
+    
+    def get_performance_metrics(self) -> Dict:
+        """获取全部交易的性能指标(基于增量统计, 无需重新扫描历史)"""
+        with self._write_lock:
+            return self._stats.metrics()
+    
+    def rebuild_performance_stats(self):
+        """从数据库全量重建增量统计"""
+        try:
+            today = _today()
+            df = pd.read_sql_query(
+                "SELECT timestamp, pnl FROM trades ORDER BY id", self._read_conn()
+            )
+            pnl = df['pnl'].fillna(0).to_numpy(dtype=np.float64)
+            is_today = df['timestamp'].to_numpy() >= to_epoch_ms(today)
+            
+            with self._write_lock:
+                self._stats = PerformanceStats.from_pnl(pnl)
+                self._daily_stats = PerformanceStats.from_pnl(pnl[is_today])
+                self._daily_date = today
+            
+            logger.info(f"性能统计重建完成: 共{len(df)}笔交易")
+            
+        except Exception as e:
+            logger.error(f"重建性能统计失败: {e}")
+    
+    def _load_performance_stats(self):
+        """加载持久化的统计; 与数据库交易数不一致时重建"""
+        try:
+            trade_count = self.conn.execute("SELECT COUNT(*) FROM trades").fetchone()[0]
+            
+            if self.stats_file.exists():
+                with open(self.stats_file) as f:
+                    saved = json.load(f)
+                
+                stats = PerformanceStats.from_dict(saved['all'])
+                if stats.n == trade_count:
+                    self._stats = stats
+                    if saved.get('daily_date') == self._daily_date:
+                        self._daily_stats = PerformanceStats.from_dict(saved['daily'])
+                    return
+            
+            if trade_count > 0:
+                self.rebuild_performance_stats()
+            
+        except Exception as e:
+            logger.error(f"加载性能统计失败: {e}")
+            self.rebuild_performance_stats()
+    
+    def _save_performance_stats(self):
+        """持久化增量统计, 重启后无需重建"""
+        try:
+            with self._write_lock:
+                saved = {
+                    'all': self._stats.to_dict(),
+                    'daily': self._daily_stats.to_dict(),
+                    'daily_date': self._daily_date
+                }
+            
+            self._write_behind(self.stats_file, json.dumps(saved).encode())
+            
+        except Exception as e:
+            logger.error(f"保存性能统计失败: {e}")
+    
+    def _write_behind(self, path: Path, payload: bytes):
+        """提交后台写文件; 尚未写出的旧内容直接被新内容覆盖"""
+        with self._pending_lock:
+            scheduled = path in self._pending_writes
+            self._pending_writes[path] = payload
+        
+        if not scheduled:
+            try:
+                self._bg_executor.submit(self._flush_pending, path)
+            except RuntimeError:
+                # 执行器已关闭(退出阶段), 直接同步写入
+                self._flush_pending(path)
+    
+    def _flush_pending(self, path: Path):
+        """写出某个文件最新的待写内容"""
+        try:
+            with self._pending_lock:
+                payload = self._pending_writes.pop(path, None)
+            if payload is not None:
+                _atomic_write(path, payload)
+            
+        except Exception as e:
+            logger.error(f"写入文件失败: {path}: {e}")
+    
     def save_performance_metrics(self, metrics: Dict, date: str = None):
         """保存性能指标"""
         try:
             if date is None:
-                date = datetime.now().date().isoformat()
+                date = _today()
             
-            conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
+            with self._write_lock, self.conn:
+                self.conn.execute('''
+                    INSERT OR REPLACE INTO performance (
+                        date, total_trades, winning_trades, losing_trades, 
+                        total_pnl, max_drawdown, sharpe_ratio, win_rate
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    date,
+                    metrics.get('total_trades', 0),
+                    metrics.get('winning_trades', 0),
+                    metrics.get('losing_trades', 0),
+                    metrics.get('total_pnl', 0),
+                    metrics.get('max_drawdown', 0),
+                    metrics.get('sharpe_ratio', 0),
+                    metrics.get('win_rate', 0)
+                ))
             
-            cursor.execute('''
-                INSERT OR REPLACE INTO performance (
-                    date, total_trades, winning_trades, losing_trades, 
-                    total_pnl, max_drawdown, sharpe_ratio, win_rate
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                date,
-                metrics.get('total_trades', 0),
-                metrics.get('winning_trades', 0),
-                metrics.get('losing_trades', 0),
-                metrics.get('total_pnl', 0),
-                metrics.get('max_drawdown', 0),
-                metrics.get('sharpe_ratio', 0),
-                metrics.get('win_rate', 0)
-            ))
-            
-            conn.commit()
-            conn.close()
-            
-            # 同时保存到JSON文件
-            with open(self.performance_file, 'w') as f:
-                json.dump(metrics, f, indent=2)
+            # 同时保存到JSON文件(后台写入)
+            self._write_behind(self.performance_file, json.dumps(metrics, indent=2).encode())
+            self._save_performance_stats()
             
             logger.info(f"性能指标保存成功: {date}")
             
@@ -420,10 +1043,20 @@ class DataManager:
         """获取每日交易摘要"""
         try:
             if date is None:
-                date = datetime.now().date().isoformat()
+                date = _today()
             
-            start_date = f"{date} 00:00:00"
-            end_date = f"{date} 23:59:59"
+            # 当日摘要直接由增量统计得出
+            with self._write_lock:
+                if date == self._daily_date and date == _today():
+                    metrics = self._daily_stats.metrics()
+                    if not metrics:
+                        return {'date': date, 'no_trades': True}
+                    metrics['date'] = date
+                    return metrics
+            
+            # 当日[00:00, 次日00:00)的毫秒区间
+            start_date = to_epoch_ms(date)
+            end_date = to_epoch_ms(datetime.fromisoformat(date) + timedelta(days=1)) - 1
             
             trades_df = self.load_trades(start_date, end_date)
             
@@ -442,21 +1075,31 @@ class DataManager:
     def cleanup_old_data(self, days_to_keep: int = 30):
         """清理旧数据"""
         try:
-            cutoff_date = (datetime.now() - timedelta(days=days_to_keep)).isoformat()
-            
-            conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
-            
-            # 清理旧的K线数据
-            cursor.execute("DELETE FROM klines WHERE timestamp < ?", (cutoff_date,))
-            
-            # 清理旧的信号数据
-            cursor.execute("DELETE FROM signals WHERE timestamp < ?", (cutoff_date,))
-            
-            conn.commit()
-            conn.close()
-            
-            logger.info(f"清理{days_to_keep}天前的旧数据完成")
+            cutoff_date = to_epoch_ms(datetime.now() - timedelta(days=days_to_keep))
+            
+            # 清理旧的K线与信号数据, 分批删除避免长时间占用写锁
+            deleted = 0
+            for table in ('klines', 'signals'):
+                while True:
+                    with self._write_lock, self.conn:
+                        count = self.conn.execute(
+                            f"DELETE FROM {table} WHERE rowid IN "
+                            f"(SELECT rowid FROM {table} WHERE timestamp < ? LIMIT ?)",
+                            (cutoff_date, CLEANUP_BATCH_SIZE)
+                        ).rowcount
+                    
+                    deleted += count
+                    if count < CLEANUP_BATCH_SIZE:
+                        break
+                    time.sleep(0.01)
+            
+            self._load_klines_cached.cache_clear()
+            
+            # 回收删除后的空闲页
+            with self._write_lock:
+                self.conn.executescript("PRAGMA incremental_vacuum")
+            
+            logger.info(f"清理{days_to_keep}天前的旧数据完成: 删除{deleted}条")
             
         except Exception as e:
             logger.error(f"清理旧数据失败: {e}")
@@ -476,14 +1119,14 @@ class DataManager:
                     date_range[1] if date_range else None
                 )
                 if not trades_df.empty:
-                    trades_df.to_csv(export_dir / f'trades_{timestamp}.csv', index=False)
+                    write_csv(trades_df, export_dir / f'trades_{timestamp}.csv')
                 
                 # 导出信号记录
                 signals_df = self.load_signals(
                     date_range[0] if date_range else None
                 )
                 if not signals_df.empty:
-                    signals_df.to_csv(export_dir / f'signals_{timestamp}.csv', index=False)
+                    write_csv(signals_df, export_dir / f'signals_{timestamp}.csv')
             
             logger.info(f"数据导出完成: {export_dir}")
             
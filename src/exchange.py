@@ -6,12 +6,24 @@
 """
 
 import ccxt
+import ccxt.pro as ccxtpro
+import asyncio
+import inspect
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
+import numpy as np
 import time
 from typing import Dict, List, Optional, Tuple
 from loguru import logger
 from datetime import datetime, timedelta
 
+# 合法的下单方向
+ORDER_SIDES = frozenset(('buy', 'sell'))
+
+# 超过该秒数没有收到K线推送时视为推送中断, 交易周期改用REST获取
+KLINE_STREAM_MAX_AGE = 60
+
 class ExchangeInterface:
     """交易所接口类"""
     
@@ -20,34 +32,49 @@ class ExchangeInterface:
         self.exchange_config = config['exchange']
         self.trading_config = config['trading']
         
+        # 交易状态(须在连接前初始化, 连接成功后由_init_exchange置为True)
+        self.is_connected = False
+        self.last_price = 0
+        
         # 初始化交易所
         self.exchange = self._init_exchange()
         self.symbol = self.trading_config['symbol']
         self.timeframe = self.trading_config['timeframe']
         
-        # 交易状态
-        self.is_connected = False
-        self.last_price = 0
+        # WebSocket推送(ccxt.pro), 首次订阅时创建
+        self.aexchange = None
+        self.latest_bar = None
+        self._klines_cache: Optional[pd.DataFrame] = None
+        self._klines_pushed_at = 0.0
+        self._streaming = False
+        
+        # 并发回填使用的每线程REST客户端
+        self._worker_local = threading.local()
         
         logger.info(f"交易所接口初始化: {self.exchange_config['name']}")
     
+    def _exchange_params(self) -> Dict:
+        """同步/异步客户端共用的连接参数"""
+        return {
+            'apiKey': self.exchange_config['apiKey'],
+            'secret': self.exchange_config['secretKey'],
+            'sandbox': self.exchange_config.get('sandbox', False),
+            'rateLimit': self.exchange_config.get('rateLimit', 1200),
+            'enableRateLimit': self.exchange_config.get('enableRateLimit', True),
+            'options': {
+                'defaultType': 'spot' if self.trading_config['trade_type'] == 'spot' else 'future'
+            }
+        }
+    
     def _init_exchange(self) -> ccxt.Exchange:
         """初始化交易所连接"""
         try:
             exchange_class = getattr(ccxt, self.exchange_config['name'])
-            exchange = exchange_class({
-                'apiKey': self.exchange_config['apiKey'],
-                'secret': self.exchange_config['secretKey'],
-                'sandbox': self.exchange_config.get('sandbox', False),
-                'rateLimit': self.exchange_config.get('rateLimit', 1200),
-                'enableRateLimit': self.exchange_config.get('enableRateLimit', True),
-                'options': {
-                    'defaultType': 'spot' if self.trading_config['trade_type'] == 'spot' else 'future'
-                }
-            })
-            
-            # 测试连接
-            exchange.load_markets()
+            exchange = exchange_class(self._exchange_params())
+            
+            # 测试连接并缓存市场信息
+            self._markets = exchange.load_markets()
+            self._markets_loaded_at = time.monotonic()
             self.is_connected = True
             logger.info(f"交易所连接成功: {exchange.name}")
             return exchange
@@ -66,14 +93,7 @@ class ExchangeInterface:
                 limit=limit
             )
             
-            # 转换为DataFrame
-            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            df.set_index('timestamp', inplace=True)
-            
-            # 数据类型转换
-            for col in ['open', 'high', 'low', 'close', 'volume']:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
+            df = self._ohlcv_to_df(ohlcv)
             
             self.last_price = float(df['close'].iloc[-1])
             logger.debug(f"获取K线数据成功: {len(df)}条, 最新价格: {self.last_price:.4f}")
@@ -83,6 +103,165 @@ class ExchangeInterface:
             logger.error(f"获取K线数据失败: {e}")
             raise
     
+    async def get_klines_async(self, limit: int = 100, since: Optional[int] = None) -> pd.DataFrame:
+        """异步获取K线数据(since为起始epoch毫秒, 用于增量获取)"""
+        try:
+            exchange = self._get_async_exchange()
+            ohlcv = await exchange.fetch_ohlcv(self.symbol, self.timeframe, since=since, limit=limit)
+            
+            df = self._ohlcv_to_df(ohlcv)
+            
+            self.last_price = float(df['close'].iloc[-1])
+            logger.debug("获取K线数据成功: {}条, 最新价格: {:.4f}", len(df), self.last_price)
+            return df
+            
+        except Exception as e:
+            self._mark_disconnected(e)
+            logger.error(f"获取K线数据失败: {e}")
+            raise
+    
+    def _worker_exchange(self, workers: int) -> ccxt.Exchange:
+        """获取当前工作线程独享的REST客户端(限频间隔按线程数放大, 总请求速率不变)"""
+        exchange = getattr(self._worker_local, 'exchange', None)
+        if exchange is None:
+            exchange_class = getattr(ccxt, self.exchange_config['name'])
+            exchange = exchange_class(self._exchange_params())
+            exchange.rateLimit = self.exchange.rateLimit * workers
+            exchange.set_markets(self._markets)
+            self._worker_local.exchange = exchange
+        return exchange
+    
+    def fetch_many_klines(self, symbols: List[str], timeframe: Optional[str] = None,
+                          limit: int = 100, max_workers: int = 8) -> Dict[str, pd.DataFrame]:
+        """并发获取多个交易对的K线(冷启动回填)"""
+        timeframe = timeframe or self.timeframe
+        workers = max(1, min(max_workers, len(symbols)))
+        
+        def fetch(symbol: str):
+            try:
+                exchange = self._worker_exchange(workers)
+                return exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+            except Exception as e:
+                logger.error(f"获取K线数据失败: {symbol}: {e}")
+                return None
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='klines-fetch') as executor:
+            results = list(executor.map(fetch, symbols))
+        
+        # 在调用线程中构建DataFrame
+        klines = {
+            symbol: self._ohlcv_to_df(ohlcv)
+            for symbol, ohlcv in zip(symbols, results)
+            if ohlcv is not None
+        }
+        
+        logger.debug(f"并发获取K线数据完成: {len(klines)}/{len(symbols)}个交易对")
+        return klines
+    
+    @staticmethod
+    def _ohlcv_to_df(ohlcv: List[List]) -> pd.DataFrame:
+        """OHLCV列表转换为以时间为索引的DataFrame"""
+        # 一次性转为float64数组(None转为NaN), 无需逐列to_numeric
+        arr = np.asarray(ohlcv, dtype=np.float64).reshape(-1, 6)
+        index = pd.to_datetime(arr[:, 0].astype(np.int64), unit='ms')
+        index.name = 'timestamp'
+        
+        return pd.DataFrame({
+            'open': arr[:, 1],
+            'high': arr[:, 2],
+            'low': arr[:, 3],
+            'close': arr[:, 4],
+            'volume': arr[:, 5]
+        }, index=index)
+    
+    def _get_async_exchange(self):
+        """获取ccxt.pro客户端(WebSocket推送 + 异步REST)"""
+        if self.aexchange is None:
+            exchange_class = getattr(ccxtpro, self.exchange_config['name'])
+            self.aexchange = exchange_class(self._exchange_params())
+            self.aexchange.set_markets(self._markets)
+        return self.aexchange
+    
+    async def reconnect(self) -> bool:
+        """重连: 复用已加载的市场信息和同步客户端的HTTP会话, 只重建异步客户端并校验连通性"""
+        try:
+            if self.aexchange is not None:
+                await self.aexchange.close()
+                self.aexchange = None
+            
+            await self._get_async_exchange().fetch_time()
+            self.is_connected = True
+            logger.info("交易所重连成功")
+            
+        except Exception as e:
+            self.is_connected = False
+            logger.error(f"交易所重连失败: {e}")
+        
+        return self.is_connected
+    
+    def _mark_disconnected(self, error: Exception):
+        """网络类错误时标记连接异常, 由健康检查触发重连"""
+        if isinstance(error, ccxt.NetworkError):
+            self.is_connected = False
+    
+    @staticmethod
+    async def _invoke(callback, *args):
+        """调用回调, 兼容普通函数与协程函数"""
+        result = callback(*args)
+        if inspect.isawaitable(result):
+            await result
+    
+    async def stream_klines(self, callback=None, limit: int = 100):
+        """订阅K线推送, 维护最近limit根K线并回调最新DataFrame"""
+        self._streaming = True
+        
+        while self._streaming:
+            try:
+                # 每轮重新获取客户端, 重连重建异步客户端后推送自动切换到新连接
+                exchange = self._get_async_exchange()
+                
+                # REST仅用于启动时回填历史, 之后由推送增量更新
+                if self._klines_cache is None:
+                    ohlcv = await exchange.fetch_ohlcv(self.symbol, self.timeframe, limit=limit)
+                    self._klines_cache = self._ohlcv_to_df(ohlcv)
+                
+                ohlcv = await exchange.watch_ohlcv(self.symbol, self.timeframe)
+                bars = self._ohlcv_to_df(ohlcv)
+                
+                # 未收盘K线会被重复推送, 按时间覆盖旧值
+                cache = self._klines_cache
+                cache = pd.concat([cache[~cache.index.isin(bars.index)], bars])
+                self._klines_cache = cache.iloc[-limit:]
+                
+                self._klines_pushed_at = time.monotonic()
+                self.latest_bar = ohlcv[-1]
+                self.last_price = float(self.latest_bar[4])
+                
+                if callback is not None:
+                    await self._invoke(callback, self._klines_cache)
+                
+            except Exception as e:
+                logger.error(f"K线推送订阅失败: {e}")
+                await asyncio.sleep(1)
+    
+    def streamed_klines(self, min_ts: int) -> Optional[pd.DataFrame]:
+        """推送维护的最近K线; 推送未启动、已中断或最后一根早于min_ts时返回None"""
+        cache = self._klines_cache
+        if not self._streaming or cache is None:
+            return None
+        if time.monotonic() - self._klines_pushed_at > KLINE_STREAM_MAX_AGE:
+            return None
+        if cache.index[-1].value // 1_000_000 < min_ts:
+            return None
+        return cache
+    
+    async def stop_streams(self):
+        """停止推送订阅并关闭WebSocket连接"""
+        self._streaming = False
+        if self.aexchange is not None:
+            await self.aexchange.close()
+            self.aexchange = None
+    
     def get_ticker(self) -> Dict:
         """获取实时价格信息"""
         try:
@@ -100,24 +279,10 @@ class ExchangeInterface:
         """获取账户余额"""
         try:
             balance = self.exchange.fetch_balance()
+            result = self._extract_balance(balance)
             
-            # 提取相关币种余额
             base_currency = self.trading_config['base_currency']
             quote_currency = self.trading_config['quote_currency']
-            
-            result = {
-                base_currency: {
-                    'free': balance.get(base_currency, {}).get('free', 0),
-                    'used': balance.get(base_currency, {}).get('used', 0),
-                    'total': balance.get(base_currency, {}).get('total', 0)
-                },
-                quote_currency: {
-                    'free': balance.get(quote_currency, {}).get('free', 0),
-                    'used': balance.get(quote_currency, {}).get('used', 0),
-                    'total': balance.get(quote_currency, {}).get('total', 0)
-                }
-            }
-            
             logger.debug(f"账户余额: {base_currency}={result[base_currency]['total']:.4f}, "
                         f"{quote_currency}={result[quote_currency]['total']:.4f}")
             return result
@@ -126,15 +291,39 @@ class ExchangeInterface:
             logger.error(f"获取账户余额失败: {e}")
             raise
     
+    async def get_balance_async(self) -> Dict:
+        """异步获取账户余额"""
+        try:
+            balance = await self._get_async_exchange().fetch_balance()
+            return self._extract_balance(balance)
+            
+        except Exception as e:
+            self._mark_disconnected(e)
+            logger.error(f"获取账户余额失败: {e}")
+            raise
+    
+    def _extract_balance(self, balance: Dict) -> Dict:
+        """提取相关币种余额"""
+        base_currency = self.trading_config['base_currency']
+        quote_currency = self.trading_config['quote_currency']
+        
+        return {
+            base_currency: {
+                'free': balance.get(base_currency, {}).get('free', 0),
+                'used': balance.get(base_currency, {}).get('used', 0),
+                'total': balance.get(base_currency, {}).get('total', 0)
+            },
+            quote_currency: {
+                'free': balance.get(quote_currency, {}).get('free', 0),
+                'used': balance.get(quote_currency, {}).get('used', 0),
+                'total': balance.get(quote_currency, {}).get('total', 0)
+            }
+        }
+    
     def place_market_order(self, side: str, amount: float, price: Optional[float] = None) -> Dict:
         """下市价单"""
         try:
-            # 参数验证
-            if side not in ['buy', 'sell']:
-                raise ValueError(f"无效的交易方向: {side}")
-            
-            if amount <= 0:
-                raise ValueError(f"无效的交易数量: {amount}")
+            self._check_market_order(side, amount)
             
             # 下单
             order = self.exchange.create_market_order(
@@ -150,11 +339,39 @@ class ExchangeInterface:
             logger.error(f"市价单下单失败: {e}")
             raise
     
+    async def place_market_order_async(self, side: str, amount: float) -> Dict:
+        """异步下市价单"""
+        try:
+            self._check_market_order(side, amount)
+            
+            order = await self._get_async_exchange().create_market_order(
+                symbol=self.symbol,
+                side=side,
+                amount=amount
+            )
+            
+            logger.info(f"市价单下单成功: {side} {amount} {self.symbol}, 订单ID: {order['id']}")
+            return order
+            
+        except Exception as e:
+            self._mark_disconnected(e)
+            logger.error(f"市价单下单失败: {e}")
+            raise
+    
+    @staticmethod
+    def _check_market_order(side: str, amount: float):
+        """市价单参数验证"""
+        if side not in ORDER_SIDES:
+            raise ValueError(f"无效的交易方向: {side}")
+        
+        if amount <= 0:
+            raise ValueError(f"无效的交易数量: {amount}")
+    
     def place_limit_order(self, side: str, amount: float, price: float) -> Dict:
         """下限价单"""
         try:
             # 参数验证
-            if side not in ['buy', 'sell']:
+            if side not in ORDER_SIDES:
                 raise ValueError(f"无效的交易方向: {side}")
             
             if amount <= 0 or price <= 0:
@@ -179,7 +396,7 @@ class ExchangeInterface:
         """下止损单"""
         try:
             # 参数验证
-            if side not in ['buy', 'sell']:
+            if side not in ORDER_SIDES:
                 raise ValueError(f"无效的交易方向: {side}")
             
             if amount <= 0 or stop_price <= 0:
@@ -268,21 +485,65 @@ class ExchangeInterface:
                 return {'size': 0, 'side': 'none', 'unrealizedPnl': 0}
             
             positions = self.exchange.fetch_positions([self.symbol])
-            position = positions[0] if positions else {}
+            result = self._extract_position(positions)
+            
+            logger.debug(f"持仓信息: {result}")
+            return result
+            
+        except Exception as e:
+            logger.error(f"获取持仓信息失败: {e}")
+            raise
+    
+    @staticmethod
+    def _extract_position(positions: List[Dict]) -> Dict:
+        """提取当前交易对持仓"""
+        position = positions[0] if positions else {}
+        
+        return {
+            'size': position.get('size', 0),
+            'side': position.get('side', 'none'),
+            'unrealizedPnl': position.get('unrealizedPnl', 0),
+            'percentage': position.get('percentage', 0),
+            'entryPrice': position.get('entryPrice', 0)
+        }
+    
+    async def snapshot(self) -> Dict:
+        """并发获取余额/价格/持仓/挂单, 返回同一时刻的账户快照"""
+        try:
+            exchange = self._get_async_exchange()
+            is_futures = self.trading_config['trade_type'] == 'futures'
+            
+            async def no_positions():
+                return []
+            
+            balance, ticker, positions, open_orders = await asyncio.gather(
+                exchange.fetch_balance(),
+                exchange.fetch_ticker(self.symbol),
+                exchange.fetch_positions([self.symbol]) if is_futures else no_positions(),
+                exchange.fetch_open_orders(self.symbol)
+            )
+            
+            self.last_price = float(ticker['last'])
+            
+            if is_futures:
+                position = self._extract_position(positions)
+            else:
+                position = {'size': 0, 'side': 'none', 'unrealizedPnl': 0}
             
             result = {
-                'size': position.get('size', 0),
-                'side': position.get('side', 'none'),
-                'unrealizedPnl': position.get('unrealizedPnl', 0),
-                'percentage': position.get('percentage', 0),
-                'entryPrice': position.get('entryPrice', 0)
+                'balance': self._extract_balance(balance),
+                'ticker': ticker,
+                'position': position,
+                'open_orders': open_orders
             }
             
-            logger.debug(f"持仓信息: {result}")
+            logger.debug(f"账户快照: 价格={self.last_price:.4f}, 持仓={position['size']}, "
+                        f"挂单={len(open_orders)}")
             return result
             
         except Exception as e:
-            logger.error(f"获取持仓信息失败: {e}")
+            self._mark_disconnected(e)
+            logger.error(f"获取账户快照失败: {e}")
             raise
     
     def close_position(self, side: str = 'auto') -> Dict:
@@ -311,10 +572,18 @@ class ExchangeInterface:
             logger.error(f"平仓失败: {e}")
             raise
     
+    def refresh_markets(self, ttl: float = 3600) -> Dict:
+        """按TTL刷新市场信息缓存, 未过期时直接返回缓存"""
+        if time.monotonic() - self._markets_loaded_at >= ttl:
+            self._markets = self.exchange.load_markets(reload=True)
+            self._markets_loaded_at = time.monotonic()
+            logger.debug("市场信息缓存已刷新")
+        return self._markets
+    
     def get_exchange_info(self) -> Dict:
         """获取交易所信息"""
         try:
-            markets = self.exchange.load_markets()
+            markets = self.refresh_markets()
             symbol_info = markets.get(self.symbol, {})
             
             result = {
@@ -7,10 +7,34 @@
 
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 from datetime import datetime, timedelta
 from loguru import logger
 from enum import Enum
+from .data_manager import to_epoch_ms, from_epoch_ms
+
+# 内存中交易记录缓冲区容量; 写满后丢弃较早的一半, 完整记录由DataManager落库
+TRADE_BUFFER_CAPACITY = 2048
+
+# 风险管理配置必需参数
+REQUIRED_RISK_KEYS = ('stop_loss_pct', 'take_profit_pct', 'max_position_size', 'max_daily_trades')
+
+# 交易方向: 'buy'/'long'/'sell'/'short'等字符串, 或已归一化的±1
+Side = Union[str, int]
+
+# 交易方向 -> 方向符号(多头+1, 空头-1); 已是符号的直接透传
+_SIDE_SIGN = {
+    'buy': 1, 'long': 1, 'sell': -1, 'short': -1,
+    'BUY': 1, 'LONG': 1, 'SELL': -1, 'SHORT': -1,
+    1: 1, -1: -1
+}
+
+def side_sign(side: Side) -> int:
+    """把交易方向(字符串或±1)转换为方向符号"""
+    sign = _SIDE_SIGN.get(side)
+    if sign is None:
+        sign = 1 if str(side).lower() in ('buy', 'long') else -1
+    return sign
 
 class RiskLevel(Enum):
     """风险等级"""
@@ -19,6 +43,9 @@ class RiskLevel(Enum):
     HIGH = "HIGH"
     CRITICAL = "CRITICAL"
 
+# 需要减仓的风险等级
+REDUCE_POSITION_LEVELS = frozenset((RiskLevel.HIGH, RiskLevel.CRITICAL))
+
 class RiskManager:
     """风险管理器"""
     
@@ -26,20 +53,55 @@ class RiskManager:
         self.config = config
         self.risk_config = config['strategy']['risk_management']
         self.trading_config = config['trading']
+        self.reload_config()
         
         # 风险状态
-        self.daily_trades_count = 0
-        self.daily_pnl = 0
-        self.max_drawdown = 0
-        self.current_drawdown = 0
+        self.daily_trades_count: int = 0
+        self.daily_pnl: float = 0.0
+        self.max_drawdown: float = 0.0
+        self.current_drawdown: float = 0.0
         self.last_reset_date = datetime.now().date()
         
-        # 交易记录
-        self.trade_history = []
+        # 近期交易记录(列式存储)与累计计数
+        self._cap: int = TRADE_BUFFER_CAPACITY
+        self._n: int = 0
+        self._total_trades: int = 0
+        self._total_pnl: float = 0.0
+        self._ts = np.empty(self._cap, dtype=np.int64)
+        self._amount = np.empty(self._cap, dtype=np.float64)
+        self._price = np.empty(self._cap, dtype=np.float64)
+        self._pnl = np.empty(self._cap, dtype=np.float64)
+        self._fee = np.empty(self._cap, dtype=np.float64)
+        self._symbol = np.empty(self._cap, dtype='U16')
+        self._side = np.empty(self._cap, dtype=np.int8)  # 方向符号(+1/-1)
         self.active_stop_orders = {}
+        # symbol -> (止损价, 止盈价, 方向符号, 入场价)
+        self._active_levels: Dict[str, Tuple[float, float, int, float]] = {}
         
         logger.info("风险管理器初始化完成")
     
+    def reload_config(self, config: Optional[Dict] = None):
+        """重新计算缓存的风控参数(运行期修改配置后调用)"""
+        if config is not None:
+            self.config = config
+            self.risk_config = config['strategy']['risk_management']
+            self.trading_config = config['trading']
+        
+        rc = self.risk_config
+        missing = [key for key in REQUIRED_RISK_KEYS if key not in rc]
+        if missing:
+            raise KeyError(f"风险管理配置缺少参数: {', '.join(missing)}")
+        if 'trade_amount' not in self.trading_config:
+            raise KeyError("交易配置缺少参数: trade_amount")
+        if rc['max_position_size'] <= 0 or rc['max_daily_trades'] <= 0:
+            raise ValueError("max_position_size和max_daily_trades必须大于0")
+        
+        self._stop_loss_frac: float = rc['stop_loss_pct'] / 100.0
+        self._take_profit_frac: float = rc['take_profit_pct'] / 100.0
+        self._max_position: float = float(rc['max_position_size'])
+        self._max_daily_trades: int = int(rc['max_daily_trades'])
+        self._trade_amount: float = float(self.trading_config['trade_amount'])
+    
     def check_daily_limits(self) -> bool:
         """检查每日交易限制"""
         try:
@@ -53,7 +115,7 @@ class RiskManager:
                 logger.info("每日风险计数器已重置")
             
             # 检查每日交易次数限制
-            max_daily_trades = self.risk_config['max_daily_trades']
+            max_daily_trades = self._max_daily_trades
             if self.daily_trades_count >= max_daily_trades:
                 logger.warning(f"已达到每日最大交易次数限制: {self.daily_trades_count}/{max_daily_trades}")
                 return False
@@ -66,286 +128,260 @@ class RiskManager:
     
     def check_position_size(self, amount: float, current_position: float = 0) -> bool:
         """检查持仓大小限制"""
-        try:
-            max_position = self.risk_config['max_position_size']
-            new_position = abs(current_position + amount)
-            
-            if new_position > max_position:
-                logger.warning(f"持仓大小超限: 新持仓={new_position:.4f}, 最大允许={max_position}")
-                return False
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"检查持仓大小时出错: {e}")
+        max_position = self._max_position
+        new_position = abs(current_position + amount)
+        
+        if new_position > max_position:
+            logger.warning(f"持仓大小超限: 新持仓={new_position:.4f}, 最大允许={max_position}")
             return False
+        
+        return True
     
     def calculate_position_size(self, account_balance: float, risk_per_trade: float = 0.02) -> float:
         """计算合适的持仓大小"""
-        try:
-            # 基于账户余额和风险比例计算
-            base_amount = self.trading_config['trade_amount']
-            
-            # 风险调整
-            risk_adjusted_amount = account_balance * risk_per_trade
-            
-            # 取较小值作为实际交易量
-            calculated_amount = min(base_amount, risk_adjusted_amount)
-            
-            # 确保不超过最大持仓限制
-            max_position = self.risk_config['max_position_size']
-            final_amount = min(calculated_amount, max_position)
-            
-            logger.debug(f"持仓大小计算: 基础={base_amount}, 风险调整={risk_adjusted_amount:.4f}, "
-                        f"最终={final_amount:.4f}")
-            
-            return final_amount
-            
-        except Exception as e:
-            logger.error(f"计算持仓大小时出错: {e}")
-            return self.trading_config['trade_amount']
+        # 基于账户余额和风险比例计算
+        base_amount = self._trade_amount
+        
+        # 风险调整
+        risk_adjusted_amount = account_balance * risk_per_trade
+        
+        # 取较小值作为实际交易量
+        calculated_amount = min(base_amount, risk_adjusted_amount)
+        
+        # 确保不超过最大持仓限制
+        max_position = self._max_position
+        final_amount = min(calculated_amount, max_position)
+        
+        logger.debug("持仓大小计算: 基础={}, 风险调整={:.4f}, 最终={:.4f}",
+                     base_amount, risk_adjusted_amount, final_amount)
+        
+        return final_amount
     
-    def calculate_stop_loss(self, entry_price: float, side: str, method: str = 'percentage') -> float:
-        """计算止损价格"""
-        try:
-            stop_loss_pct = self.risk_config['stop_loss_pct'] / 100
-            
-            if method == 'percentage':
-                if side.lower() in ['buy', 'long']:
-                    stop_loss = entry_price * (1 - stop_loss_pct)
-                else:  # sell, short
-                    stop_loss = entry_price * (1 + stop_loss_pct)
-            
-            elif method == 'atr':
-                # 基于ATR的动态止损(需要历史数据)
-                # 这里使用固定百分比作为备选
-                stop_loss = self.calculate_stop_loss(entry_price, side, 'percentage')
-            
-            else:
-                raise ValueError(f"不支持的止损方法: {method}")
-            
-            logger.debug(f"止损计算: 入场价={entry_price:.4f}, 方向={side}, 止损价={stop_loss:.4f}")
-            return stop_loss
-            
-        except Exception as e:
-            logger.error(f"计算止损价格时出错: {e}")
-            return 0
+    def calculate_stop_loss(self, entry_price: float, side: Side, method: str = 'percentage') -> float:
+        """计算止损价格(side可为字符串方向或±1)"""
+        sign = side_sign(side)
+        
+        if method == 'percentage':
+            stop_loss = entry_price * (1 - sign * self._stop_loss_frac)
+        
+        elif method == 'atr':
+            # 基于ATR的动态止损(需要历史数据)
+            # 这里使用固定百分比作为备选
+            stop_loss = self.calculate_stop_loss(entry_price, sign, 'percentage')
+        
+        else:
+            raise ValueError(f"不支持的止损方法: {method}")
+        
+        logger.debug("止损计算: 入场价={:.4f}, 方向={}, 止损价={:.4f}", entry_price, side, stop_loss)
+        return stop_loss
+    
+    def calculate_take_profit(self, entry_price: float, side: Side, method: str = 'percentage') -> float:
+        """计算止盈价格(side可为字符串方向或±1)"""
+        sign = side_sign(side)
+        
+        if method == 'percentage':
+            take_profit = entry_price * (1 + sign * self._take_profit_frac)
+        
+        elif method == 'risk_reward':
+            # 基于风险回报比的止盈
+            risk_reward_ratio = 2.0  # 1:2的风险回报比
+            stop_loss = self.calculate_stop_loss(entry_price, sign)
+            risk_amount = sign * (entry_price - stop_loss)
+            take_profit = entry_price + sign * risk_amount * risk_reward_ratio
+        
+        else:
+            raise ValueError(f"不支持的止盈方法: {method}")
+        
+        logger.debug("止盈计算: 入场价={:.4f}, 方向={}, 止盈价={:.4f}", entry_price, side, take_profit)
+        return take_profit
     
-    def calculate_take_profit(self, entry_price: float, side: str, method: str = 'percentage') -> float:
-        """计算止盈价格"""
+    def open_position(self, symbol: str, entry_price: float, side: Side):
+        """开仓/调仓时计算一次止损止盈价位并缓存"""
         try:
-            take_profit_pct = self.risk_config['take_profit_pct'] / 100
-            
-            if method == 'percentage':
-                if side.lower() in ['buy', 'long']:
-                    take_profit = entry_price * (1 + take_profit_pct)
-                else:  # sell, short
-                    take_profit = entry_price * (1 - take_profit_pct)
-            
-            elif method == 'risk_reward':
-                # 基于风险回报比的止盈
-                risk_reward_ratio = 2.0  # 1:2的风险回报比
-                stop_loss = self.calculate_stop_loss(entry_price, side)
-                
-                if side.lower() in ['buy', 'long']:
-                    risk_amount = entry_price - stop_loss
-                    take_profit = entry_price + (risk_amount * risk_reward_ratio)
-                else:
-                    risk_amount = stop_loss - entry_price
-                    take_profit = entry_price - (risk_amount * risk_reward_ratio)
-            
-            else:
-                raise ValueError(f"不支持的止盈方法: {method}")
-            
-            logger.debug(f"止盈计算: 入场价={entry_price:.4f}, 方向={side}, 止盈价={take_profit:.4f}")
-            return take_profit
+            sign = side_sign(side)
+            stop_loss = self.calculate_stop_loss(entry_price, sign)
+            take_profit = self.calculate_take_profit(entry_price, sign)
+            self._active_levels[symbol] = (stop_loss, take_profit, sign, entry_price)
             
         except Exception as e:
-            logger.error(f"计算止盈价格时出错: {e}")
-            return 0
+            logger.error(f"缓存止损止盈价位时出错: {e}")
     
-    def check_stop_loss_trigger(self, current_price: float, entry_price: float, 
-                               side: str, position_size: float) -> bool:
+    def close_position(self, symbol: str):
+        """平仓后清除缓存的止损止盈价位"""
+        self._active_levels.pop(symbol, None)
+    
+    def check_stop_loss_trigger(self, current_price: float, symbol: str) -> bool:
         """检查是否触发止损"""
-        try:
-            if position_size == 0:
-                return False
-            
-            stop_loss_price = self.calculate_stop_loss(entry_price, side)
-            
-            # 检查止损触发条件
-            if side.lower() in ['buy', 'long']:
-                triggered = current_price <= stop_loss_price
-            else:  # sell, short
-                triggered = current_price >= stop_loss_price
-            
-            if triggered:
-                loss_pct = abs(current_price - entry_price) / entry_price * 100
-                logger.warning(f"止损触发: 当前价格={current_price:.4f}, 止损价={stop_loss_price:.4f}, "
-                             f"亏损={loss_pct:.2f}%")
-            
-            return triggered
-            
-        except Exception as e:
-            logger.error(f"检查止损触发时出错: {e}")
+        levels = self._active_levels.get(symbol)
+        if levels is None:
             return False
+        
+        stop_loss_price, _, sign, entry_price = levels
+        triggered = (current_price - stop_loss_price) * sign <= 0
+        
+        if triggered:
+            loss_pct = abs(current_price - entry_price) / entry_price * 100
+            logger.warning(f"止损触发: 当前价格={current_price:.4f}, 止损价={stop_loss_price:.4f}, "
+                         f"亏损={loss_pct:.2f}%")
+        
+        return triggered
     
-    def check_take_profit_trigger(self, current_price: float, entry_price: float, 
-                                 side: str, position_size: float) -> bool:
+    def check_take_profit_trigger(self, current_price: float, symbol: str) -> bool:
         """检查是否触发止盈"""
-        try:
-            if position_size == 0:
-                return False
-            
-            take_profit_price = self.calculate_take_profit(entry_price, side)
-            
-            # 检查止盈触发条件
-            if side.lower() in ['buy', 'long']:
-                triggered = current_price >= take_profit_price
-            else:  # sell, short
-                triggered = current_price <= take_profit_price
-            
-            if triggered:
-                profit_pct = abs(current_price - entry_price) / entry_price * 100
-                logger.info(f"止盈触发: 当前价格={current_price:.4f}, 止盈价={take_profit_price:.4f}, "
-                           f"盈利={profit_pct:.2f}%")
-            
-            return triggered
-            
-        except Exception as e:
-            logger.error(f"检查止盈触发时出错: {e}")
+        levels = self._active_levels.get(symbol)
+        if levels is None:
             return False
+        
+        _, take_profit_price, sign, entry_price = levels
+        triggered = (current_price - take_profit_price) * sign >= 0
+        
+        if triggered:
+            profit_pct = abs(current_price - entry_price) / entry_price * 100
+            logger.info(f"止盈触发: 当前价格={current_price:.4f}, 止盈价={take_profit_price:.4f}, "
+                       f"盈利={profit_pct:.2f}%")
+        
+        return triggered
     
-    def calculate_pnl(self, entry_price: float, current_price: float, 
-                     position_size: float, side: str) -> float:
-        """计算未实现盈亏"""
-        try:
-            if position_size == 0:
-                return 0
-            
-            if side.lower() in ['buy', 'long']:
-                pnl = (current_price - entry_price) * position_size
-            else:  # sell, short
-                pnl = (entry_price - current_price) * position_size
-            
-            return pnl
-            
-        except Exception as e:
-            logger.error(f"计算盈亏时出错: {e}")
-            return 0
+    @staticmethod
+    def calculate_pnl(entry_price: float, current_price: float,
+                      position_size: float, sign: int) -> float:
+        """计算未实现盈亏(sign为方向符号, 字符串方向先经side_sign转换)"""
+        return sign * (current_price - entry_price) * position_size
+    
+    @staticmethod
+    def calculate_pnl_vec(entry_price: np.ndarray, current_price: np.ndarray,
+                          position_size: np.ndarray, sign: np.ndarray) -> np.ndarray:
+        """批量计算多个持仓的未实现盈亏"""
+        return np.asarray(sign) * (np.asarray(current_price) - np.asarray(entry_price)) * np.asarray(position_size)
     
     def update_drawdown(self, current_pnl: float, peak_value: float):
         """更新回撤统计"""
-        try:
-            # 计算当前回撤
-            if peak_value > 0:
-                self.current_drawdown = (peak_value - current_pnl) / peak_value * 100
-            else:
-                self.current_drawdown = 0
-            
-            # 更新最大回撤
-            self.max_drawdown = max(self.max_drawdown, self.current_drawdown)
-            
-            logger.debug(f"回撤更新: 当前回撤={self.current_drawdown:.2f}%, "
-                        f"最大回撤={self.max_drawdown:.2f}%")
-            
-        except Exception as e:
-            logger.error(f"更新回撤时出错: {e}")
+        # 计算当前回撤
+        if peak_value > 0:
+            self.current_drawdown = (peak_value - current_pnl) / peak_value * 100
+        else:
+            self.current_drawdown = 0
+        
+        # 更新最大回撤
+        self.max_drawdown = max(self.max_drawdown, self.current_drawdown)
+        
+        logger.debug("回撤更新: 当前回撤={:.2f}%, 最大回撤={:.2f}%", self.current_drawdown, self.max_drawdown)
     
     def assess_risk_level(self, current_pnl: float, position_size: float, 
                          volatility: float = 0) -> RiskLevel:
         """评估当前风险等级"""
-        try:
-            risk_score = 0
-            
-            # 基于回撤的风险评分
-            if self.current_drawdown > 15:
-                risk_score += 3
-            elif self.current_drawdown > 10:
-                risk_score += 2
-            elif self.current_drawdown > 5:
-                risk_score += 1
-            
-            # 基于持仓大小的风险评分
-            max_position = self.risk_config['max_position_size']
-            position_ratio = abs(position_size) / max_position
-            if position_ratio > 0.8:
-                risk_score += 2
-            elif position_ratio > 0.6:
-                risk_score += 1
-            
-            # 基于每日交易次数的风险评分
-            max_trades = self.risk_config['max_daily_trades']
-            trade_ratio = self.daily_trades_count / max_trades
-            if trade_ratio > 0.8:
-                risk_score += 1
-            
-            # 确定风险等级
-            if risk_score >= 5:
-                risk_level = RiskLevel.CRITICAL
-            elif risk_score >= 3:
-                risk_level = RiskLevel.HIGH
-            elif risk_score >= 1:
-                risk_level = RiskLevel.MEDIUM
-            else:
-                risk_level = RiskLevel.LOW
-            
-            logger.debug(f"风险评估: 得分={risk_score}, 等级={risk_level.value}")
-            return risk_level
-            
-        except Exception as e:
-            logger.error(f"评估风险等级时出错: {e}")
-            return RiskLevel.MEDIUM
+        risk_score = 0
+        
+        # 基于回撤的风险评分
+        if self.current_drawdown > 15:
+            risk_score += 3
+        elif self.current_drawdown > 10:
+            risk_score += 2
+        elif self.current_drawdown > 5:
+            risk_score += 1
+        
+        # 基于持仓大小的风险评分
+        max_position = self._max_position
+        position_ratio = abs(position_size) / max_position
+        if position_ratio > 0.8:
+            risk_score += 2
+        elif position_ratio > 0.6:
+            risk_score += 1
+        
+        # 基于每日交易次数的风险评分
+        max_trades = self._max_daily_trades
+        trade_ratio = self.daily_trades_count / max_trades
+        if trade_ratio > 0.8:
+            risk_score += 1
+        
+        # 确定风险等级
+        if risk_score >= 5:
+            risk_level = RiskLevel.CRITICAL
+        elif risk_score >= 3:
+            risk_level = RiskLevel.HIGH
+        elif risk_score >= 1:
+            risk_level = RiskLevel.MEDIUM
+        else:
+            risk_level = RiskLevel.LOW
+        
+        logger.debug("风险评估: 得分={}, 等级={}", risk_score, risk_level.value)
+        return risk_level
     
     def should_reduce_position(self, risk_level: RiskLevel) -> bool:
         """判断是否应该减仓"""
-        try:
-            if risk_level in [RiskLevel.HIGH, RiskLevel.CRITICAL]:
-                logger.warning(f"风险等级过高({risk_level.value})，建议减仓")
-                return True
-            
-            return False
-            
-        except Exception as e:
-            logger.error(f"判断减仓时出错: {e}")
-            return False
+        if risk_level in REDUCE_POSITION_LEVELS:
+            logger.warning(f"风险等级过高({risk_level.value})，建议减仓")
+            return True
+        
+        return False
     
     def should_stop_trading(self, risk_level: RiskLevel) -> bool:
         """判断是否应该停止交易"""
-        try:
-            if risk_level == RiskLevel.CRITICAL:
-                logger.critical("风险等级达到临界值，建议停止交易")
-                return True
-            
-            # 检查每日亏损限制
-            if self.daily_pnl < -1000:  # 可配置的每日亏损限制
-                logger.warning(f"每日亏损过大({self.daily_pnl:.2f})，建议停止交易")
-                return True
-            
-            return False
-            
-        except Exception as e:
-            logger.error(f"判断停止交易时出错: {e}")
-            return False
+        if risk_level == RiskLevel.CRITICAL:
+            logger.critical("风险等级达到临界值，建议停止交易")
+            return True
+        
+        # 检查每日亏损限制
+        if self.daily_pnl < -1000:  # 可配置的每日亏损限制
+            logger.warning(f"每日亏损过大({self.daily_pnl:.2f})，建议停止交易")
+            return True
+        
+        return False
+    
+    def _compact(self):
+        """缓冲区写满时只保留最近一半记录"""
+        keep = self._cap // 2
+        for name in ('_ts', '_amount', '_price', '_pnl', '_fee', '_symbol', '_side'):
+            buf = getattr(self, name)
+            buf[:keep] = buf[self._n - keep:self._n]
+        self._n = keep
+    
+    @property
+    def trade_history(self) -> List[Dict]:
+        """以字典列表形式返回近期交易记录(兼容旧接口)"""
+        n = self._n
+        return [
+            {
+                'timestamp': ts.to_pydatetime(),
+                'symbol': symbol,
+                'side': 'buy' if side > 0 else 'sell',
+                'amount': amount,
+                'price': price,
+                'pnl': pnl,
+                'fee': fee
+            }
+            for ts, symbol, side, amount, price, pnl, fee in zip(
+                from_epoch_ms(pd.Series(self._ts[:n])), self._symbol[:n].tolist(), self._side[:n].tolist(),
+                self._amount[:n].tolist(), self._price[:n].tolist(),
+                self._pnl[:n].tolist(), self._fee[:n].tolist()
+            )
+        ]
     
     def record_trade(self, trade_info: Dict):
         """记录交易信息"""
         try:
-            trade_record = {
-                'timestamp': datetime.now(),
-                'symbol': trade_info.get('symbol', ''),
-                'side': trade_info.get('side', ''),
-                'amount': trade_info.get('amount', 0),
-                'price': trade_info.get('price', 0),
-                'pnl': trade_info.get('pnl', 0),
-                'fee': trade_info.get('fee', 0)
-            }
-            
-            self.trade_history.append(trade_record)
+            if self._n == self._cap:
+                self._compact()
+            
+            i = self._n
+            get = trade_info.get
+            pnl = get('pnl', 0) or 0
+            self._ts[i] = to_epoch_ms(get('timestamp'))
+            self._symbol[i] = get('symbol', '')
+            self._side[i] = side_sign(get('side', 'buy'))
+            self._amount[i] = get('amount', 0) or 0
+            self._price[i] = get('price', 0) or 0
+            self._pnl[i] = pnl
+            self._fee[i] = get('fee', 0) or 0
+            self._n = i + 1
+            
+            self._total_trades += 1
+            self._total_pnl += pnl
             self.daily_trades_count += 1
-            self.daily_pnl += trade_record['pnl']
+            self.daily_pnl += pnl
             
-            logger.info(f"交易记录: {trade_record}")
+            logger.info(f"交易记录: {get('symbol', '')} {get('side', '')} {get('amount', 0)} @ {get('price', 0)}, "
+                       f"盈亏={pnl}")
             
         except Exception as e:
             logger.error(f"记录交易时出错: {e}")
@@ -358,12 +394,13 @@ class RiskManager:
                 'daily_pnl': self.daily_pnl,
                 'max_drawdown': self.max_drawdown,
                 'current_drawdown': self.current_drawdown,
-                'total_trades': len(self.trade_history),
+                'total_trades': self._total_trades,
+                'total_pnl': self._total_pnl,
                 'risk_limits': self.risk_config,
                 'last_reset_date': self.last_reset_date.isoformat()
             }
             
-            logger.debug(f"风险报告生成: {report}")
+            logger.debug("风险报告生成: {}", report)
             return report
             
         except Exception as e:
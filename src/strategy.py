@@ -9,19 +9,27 @@
 import pandas as pd
 import numpy as np
 import ta
-from typing import Dict, List, Optional, Tuple
-from enum import Enum
+from typing import Dict, List, Optional, Tuple, Union
+from enum import Enum, IntFlag
 from loguru import logger
+from ._njit import HAS_NUMBA
+from . import _indicators_numba as nbi
 
-class SignalType(Enum):
-    """交易信号类型"""
-    BUY = "BUY"
-    SELL = "SELL"
-    LONG = "LONG"    # 做多(合约)
-    SHORT = "SHORT"  # 做空(合约)
-    CLOSE_LONG = "CLOSE_LONG"   # 平多仓
-    CLOSE_SHORT = "CLOSE_SHORT" # 平空仓
-    HOLD = "HOLD"
+class SignalType(IntFlag):
+    """交易信号类型(位标志, 便于按组判断; 对外展示和落库使用name)"""
+    HOLD = 0
+    BUY = 1
+    LONG = 2         # 做多(合约)
+    SELL = 4
+    SHORT = 8        # 做空(合约)
+    CLOSE_LONG = 16  # 平多仓
+    CLOSE_SHORT = 32 # 平空仓
+
+# 信号分组掩码
+OPENS_LONG = SignalType.BUY | SignalType.LONG
+OPENS_SHORT = SignalType.SELL | SignalType.SHORT
+OPEN_SIGNALS = OPENS_LONG | OPENS_SHORT
+CLOSE_SIGNALS = SignalType.CLOSE_LONG | SignalType.CLOSE_SHORT
 
 class TrendDirection(Enum):
     """趋势方向"""
@@ -29,6 +37,77 @@ class TrendDirection(Enum):
     DOWN = "DOWN"
     SIDEWAYS = "SIDEWAYS"
 
+# 内核返回的整数编码与枚举的对应关系
+TREND_BY_CODE = (TrendDirection.SIDEWAYS, TrendDirection.UP, TrendDirection.DOWN)
+SIGNAL_BY_CODE = {int(signal): signal for signal in SignalType.__members__.values()}
+TRADE_TYPE_CODES = {'spot': nbi.TRADE_SPOT, 'futures': nbi.TRADE_FUTURES}
+
+# 成交量均线和价格变化率均线的窗口
+VOLUME_SMA_WINDOW = 20
+PRICE_CHANGE_SMA_WINDOW = 5
+
+def _rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    """基于累加和的滑动均值, 窗口内含NaN或不足window个值时为NaN(同rolling(window).mean())"""
+    out = np.full(len(x), np.nan)
+    if len(x) < window:
+        return out
+    
+    nan_mask = np.isnan(x)
+    csum = np.concatenate(([0.0], np.cumsum(np.where(nan_mask, 0.0, x))))
+    nan_count = np.concatenate(([0], np.cumsum(nan_mask)))
+    means = (csum[window:] - csum[:-window]) / window
+    means[(nan_count[window:] - nan_count[:-window]) > 0] = np.nan
+    out[window - 1:] = means
+    return out
+
+# calculate_indicators写回DataFrame的指标列(按原有顺序)
+INDICATOR_COLUMNS = ('ema_fast', 'ema_slow', 'macd', 'macd_signal', 'macd_histogram',
+                     'adx', 'adx_pos', 'adx_neg', 'bb_upper', 'bb_middle', 'bb_lower', 'bb_width',
+                     'rsi', 'volume_sma', 'volume_ratio', 'price_change', 'price_change_sma')
+
+class FeatureStore:
+    """行情与指标的列式存储: 每列一个float64数组, 仅在需要展示时转换为DataFrame"""
+    
+    def __init__(self, cols: Dict[str, np.ndarray], index: Optional[pd.Index] = None,
+                 n: Optional[int] = None):
+        self.cols = cols
+        self.index = index
+        self.n = len(next(iter(cols.values()))) if n is None else n
+    
+    def __len__(self) -> int:
+        return self.n
+    
+    def head(self, n: int) -> 'FeatureStore':
+        """前n行的视图(不复制数据), 回测逐K线推进时使用"""
+        return FeatureStore(self.cols, self.index, n)
+    
+    def last(self, name: str) -> float:
+        """某列最新值"""
+        return float(self.cols[name][self.n - 1])
+    
+    def last_values(self, names: List[str]) -> List[float]:
+        """多列最新值, 一次性转换为Python float"""
+        i = self.n - 1
+        return np.array([self.cols[name][i] for name in names]).tolist()
+    
+    def last_rows(self, names: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """指定列的最新一行和前一行(C连续数组)"""
+        rows = np.empty((2, len(names)))
+        i = self.n - 1
+        j = i - 1 if i > 0 else i
+        for k, name in enumerate(names):
+            col = self.cols[name]
+            rows[0, k] = col[i]
+            rows[1, k] = col[j]
+        return rows[0], rows[1]
+    
+    def to_frame(self) -> pd.DataFrame:
+        """转换为DataFrame"""
+        index = self.index[:self.n] if self.index is not None else None
+        return pd.DataFrame({name: col[:self.n] for name, col in self.cols.items()}, index=index)
+
+Frame = Union[pd.DataFrame, FeatureStore]
+
 class TrendFollowingStrategy:
     """趋势跟踪策略类"""
     
@@ -40,202 +119,216 @@ class TrendFollowingStrategy:
         self.risk_config = self.strategy_config['risk_management']
         
         # 策略状态
-        self.current_position = 0  # 当前持仓
-        self.last_signal = SignalType.HOLD
-        self.entry_price = 0
+        self.current_position: float = 0  # 当前持仓
+        self.last_signal: SignalType = SignalType.HOLD
+        self.entry_price: float = 0
         self.trend_direction = TrendDirection.SIDEWAYS
         
+        # 运行期间不变的配置常量在初始化时取出
+        self._adx_thresh: float = float(self.indicators_config['adx_threshold'])
+        self._rsi_hi: float = float(self.indicators_config['rsi_overbought'])
+        self._rsi_lo: float = float(self.indicators_config['rsi_oversold'])
+        self._vol_thresh: float = float(self.signals_config['volume_threshold'])
+        self._stop_loss_frac: float = self.risk_config['stop_loss_pct'] / 100
+        self._take_profit_frac: float = self.risk_config['take_profit_pct'] / 100
+        # 指标预热长度(ta的ADX要到第2*adx_period-1根才有值), 再加最新和前一根两行
+        cfg = self.indicators_config
+        self._warmup: int = max(cfg['ema_slow'], 2 * cfg['adx_period'] - 1, cfg['bb_period'],
+                                cfg['rsi_period'], cfg['macd_slow'] + cfg['macd_signal'])
+        self._min_bars: int = self._warmup + 2
+        
+        # 信号判断用到的列、阈值和交易类型编码
+        self._signal_cols = list(nbi.SIGNAL_COLUMNS)
+        self._thresholds = np.array(
+            [self._adx_thresh, self._rsi_hi, self._rsi_lo, self._vol_thresh], dtype=np.float64
+        )
+        self._trade_type_code: int = TRADE_TYPE_CODES.get(config['trading']['trade_type'], -1)
+        
         logger.info(f"趋势跟踪策略初始化完成: {self.strategy_config['name']}")
     
     def calculate_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
-        """计算技术指标"""
+        """计算技术指标并写回DataFrame(回测和报表使用)"""
+        store = self.calculate_indicators_np(df['close'], df['high'], df['low'], df['volume'], df.index)
+        for name in INDICATOR_COLUMNS:
+            df[name] = store.cols[name]
+        return df
+    
+    def calculate_indicators_np(self, close, high, low, volume,
+                                index: Optional[pd.Index] = None) -> FeatureStore:
+        """直接在numpy数组上计算技术指标, 返回FeatureStore"""
         try:
-            # EMA指标
-            df['ema_fast'] = ta.trend.EMAIndicator(
-                df['close'], window=self.indicators_config['ema_fast']
-            ).ema_indicator()
-            
-            df['ema_slow'] = ta.trend.EMAIndicator(
-                df['close'], window=self.indicators_config['ema_slow']
-            ).ema_indicator()
+            # 内核签名要求可写的C连续float64数组, pandas写时复制下to_numpy可能返回只读视图, 这里显式复制
+            close = np.array(close, dtype=np.float64)
+            high = np.array(high, dtype=np.float64)
+            low = np.array(low, dtype=np.float64)
+            volume = np.array(volume, dtype=np.float64)
             
-            # MACD指标
-            macd = ta.trend.MACD(
-                df['close'],
-                window_fast=self.indicators_config['macd_fast'],
-                window_slow=self.indicators_config['macd_slow'],
-                window_sign=self.indicators_config['macd_signal']
-            )
-            df['macd'] = macd.macd()
-            df['macd_signal'] = macd.macd_signal()
-            df['macd_histogram'] = macd.macd_diff()
-            
-            # ADX趋势强度指标
-            adx = ta.trend.ADXIndicator(
-                df['high'], df['low'], df['close'],
-                window=self.indicators_config['adx_period']
-            )
-            df['adx'] = adx.adx()
-            df['adx_pos'] = adx.adx_pos()
-            df['adx_neg'] = adx.adx_neg()
-            
-            # 布林带
-            bb = ta.volatility.BollingerBands(
-                df['close'],
-                window=self.indicators_config['bb_period'],
-                window_dev=self.indicators_config['bb_std']
-            )
-            df['bb_upper'] = bb.bollinger_hband()
-            df['bb_middle'] = bb.bollinger_mavg()
-            df['bb_lower'] = bb.bollinger_lband()
-            df['bb_width'] = (df['bb_upper'] - df['bb_lower']) / df['bb_middle']
-            
-            # RSI
-            df['rsi'] = ta.momentum.RSIIndicator(
-                df['close'], window=self.indicators_config['rsi_period']
-            ).rsi()
+            if HAS_NUMBA:
+                ind = self._calculate_indicators_numba(close, high, low)
+            else:
+                ind = self._calculate_indicators_ta(close, high, low)
             
-            # 成交量指标
-            df['volume_sma'] = df['volume'].rolling(window=20).mean()
-            df['volume_ratio'] = df['volume'] / df['volume_sma']
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ind['bb_width'] = (ind['bb_upper'] - ind['bb_lower']) / ind['bb_middle']
+                
+                # 成交量指标
+                volume_sma = _rolling_mean(volume, VOLUME_SMA_WINDOW)
+                ind['volume_sma'] = volume_sma
+                ind['volume_ratio'] = volume / volume_sma
+                
+                # 价格变化率
+                price_change = np.empty_like(close)
+                price_change[:1] = np.nan
+                price_change[1:] = close[1:] / close[:-1] - 1
+            ind['price_change'] = price_change
+            ind['price_change_sma'] = _rolling_mean(price_change, PRICE_CHANGE_SMA_WINDOW)
             
-            # 价格变化率
-            df['price_change'] = df['close'].pct_change()
-            df['price_change_sma'] = df['price_change'].rolling(window=5).mean()
+            cols = {'close': close, 'high': high, 'low': low, 'volume': volume}
+            cols.update((name, ind[name]) for name in INDICATOR_COLUMNS)
             
             logger.debug("技术指标计算完成")
-            return df
+            return FeatureStore(cols, index)
             
         except Exception as e:
             logger.error(f"计算技术指标时出错: {e}")
             raise
     
-    def detect_trend(self, df: pd.DataFrame) -> TrendDirection:
+    def _calculate_indicators_numba(self, close: np.ndarray, high: np.ndarray,
+                                    low: np.ndarray) -> Dict[str, np.ndarray]:
+        """用Numba内核计算EMA/MACD/ADX/布林带/RSI"""
+        cfg = self.indicators_config
+        n = len(close)
+        
+        ema_fast, ema_slow = np.empty(n), np.empty(n)
+        nbi.ema(close, cfg['ema_fast'], ema_fast)
+        nbi.ema(close, cfg['ema_slow'], ema_slow)
+        
+        macd, macd_signal, macd_hist = np.empty(n), np.empty(n), np.empty(n)
+        nbi.macd(close, cfg['macd_fast'], cfg['macd_slow'], cfg['macd_signal'],
+                 macd, macd_signal, macd_hist)
+        
+        adx, adx_pos, adx_neg = np.empty(n), np.empty(n), np.empty(n)
+        nbi.adx(high, low, close, cfg['adx_period'], adx, adx_pos, adx_neg)
+        
+        bb_upper, bb_middle, bb_lower = np.empty(n), np.empty(n), np.empty(n)
+        nbi.bbands(close, cfg['bb_period'], float(cfg['bb_std']), bb_upper, bb_middle, bb_lower)
+        
+        rsi = np.empty(n)
+        nbi.rsi(close, cfg['rsi_period'], rsi)
+        
+        return {
+            'ema_fast': ema_fast,
+            'ema_slow': ema_slow,
+            'macd': macd,
+            'macd_signal': macd_signal,
+            'macd_histogram': macd_hist,
+            'adx': adx,
+            'adx_pos': adx_pos,
+            'adx_neg': adx_neg,
+            'bb_upper': bb_upper,
+            'bb_middle': bb_middle,
+            'bb_lower': bb_lower,
+            'rsi': rsi
+        }
+    
+    def _calculate_indicators_ta(self, close: np.ndarray, high: np.ndarray,
+                                 low: np.ndarray) -> Dict[str, np.ndarray]:
+        """未安装numba时用ta库计算指标"""
+        df = pd.DataFrame({'close': close, 'high': high, 'low': low})
+        
+        # EMA指标
+        df['ema_fast'] = ta.trend.EMAIndicator(
+            df['close'], window=self.indicators_config['ema_fast']
+        ).ema_indicator()
+        
+        df['ema_slow'] = ta.trend.EMAIndicator(
+            df['close'], window=self.indicators_config['ema_slow']
+        ).ema_indicator()
+        
+        # MACD指标
+        macd = ta.trend.MACD(
+            df['close'],
+            window_fast=self.indicators_config['macd_fast'],
+            window_slow=self.indicators_config['macd_slow'],
+            window_sign=self.indicators_config['macd_signal']
+        )
+        df['macd'] = macd.macd()
+        df['macd_signal'] = macd.macd_signal()
+        df['macd_histogram'] = macd.macd_diff()
+        
+        # ADX趋势强度指标
+        adx = ta.trend.ADXIndicator(
+            df['high'], df['low'], df['close'],
+            window=self.indicators_config['adx_period']
+        )
+        df['adx'] = adx.adx()
+        df['adx_pos'] = adx.adx_pos()
+        df['adx_neg'] = adx.adx_neg()
+        
+        # 布林带
+        bb = ta.volatility.BollingerBands(
+            df['close'],
+            window=self.indicators_config['bb_period'],
+            window_dev=self.indicators_config['bb_std']
+        )
+        df['bb_upper'] = bb.bollinger_hband()
+        df['bb_middle'] = bb.bollinger_mavg()
+        df['bb_lower'] = bb.bollinger_lband()
+        
+        # RSI
+        df['rsi'] = ta.momentum.RSIIndicator(
+            df['close'], window=self.indicators_config['rsi_period']
+        ).rsi()
+        
+        return {name: df[name].to_numpy(dtype=np.float64) for name in df.columns
+                if name not in ('close', 'high', 'low')}
+    
+    def _last_rows(self, df: Frame) -> Tuple[np.ndarray, np.ndarray]:
+        """取最后两行信号所需列的ndarray(df可为DataFrame或FeatureStore)"""
+        if isinstance(df, FeatureStore):
+            return df.last_rows(self._signal_cols)
+        
+        # 内核签名要求C连续, 只复制末尾两行
+        m = np.array(df[self._signal_cols].to_numpy(dtype=np.float64)[-2:], order='C')
+        return m[-1], m[0]
+    
+    def detect_trend(self, df: Frame) -> TrendDirection:
         """检测趋势方向"""
         try:
-            latest = df.iloc[-1]
-            prev = df.iloc[-2] if len(df) > 1 else latest
-            
-            # 多重趋势确认条件
-            conditions = {
-                'ema_trend': latest['ema_fast'] > latest['ema_slow'],
-                'macd_trend': latest['macd'] > latest['macd_signal'],
-                'adx_strong': latest['adx'] > self.indicators_config['adx_threshold'],
-                'price_above_bb_mid': latest['close'] > latest['bb_middle'],
-                'adx_direction': latest['adx_pos'] > latest['adx_neg']
-            }
-            
-            # 上涨趋势判断
-            uptrend_score = sum([
-                conditions['ema_trend'],
-                conditions['macd_trend'],
-                conditions['adx_strong'] and conditions['adx_direction'],
-                conditions['price_above_bb_mid'],
-                latest['close'] > prev['close']
-            ])
-            
-            # 下跌趋势判断
-            downtrend_score = sum([
-                not conditions['ema_trend'],
-                not conditions['macd_trend'],
-                conditions['adx_strong'] and not conditions['adx_direction'],
-                not conditions['price_above_bb_mid'],
-                latest['close'] < prev['close']
-            ])
-            
-            if uptrend_score >= 3:
-                trend = TrendDirection.UP
-            elif downtrend_score >= 3:
-                trend = TrendDirection.DOWN
-            else:
-                trend = TrendDirection.SIDEWAYS
+            latest, prev = self._last_rows(df)
+            trend_code, up_score, down_score, _ = nbi.evaluate_signal(
+                latest, prev, self._thresholds, self._trade_type_code, float(self.current_position)
+            )
+            trend = TREND_BY_CODE[trend_code]
             
-            logger.debug(f"趋势检测: {trend.value}, 上涨得分: {uptrend_score}, 下跌得分: {downtrend_score}")
+            logger.debug("趋势检测: {}, 上涨得分: {}, 下跌得分: {}", trend.value, up_score, down_score)
             return trend
             
         except Exception as e:
             logger.error(f"趋势检测时出错: {e}")
             return TrendDirection.SIDEWAYS
     
-    def generate_signal(self, df: pd.DataFrame) -> SignalType:
+    def generate_signal(self, df: Frame) -> SignalType:
         """生成交易信号"""
         try:
-            if len(df) < max(self.indicators_config.values()):
+            if len(df) < self._min_bars:
                 return SignalType.HOLD
             
-            latest = df.iloc[-1]
-            prev = df.iloc[-2]
-            
-            # 检测趋势
-            current_trend = self.detect_trend(df)
+            # 趋势打分和信号判断在同一个内核里完成, 只读取一次最后两行
+            latest, prev = self._last_rows(df)
+            trend_code, up_score, down_score, signal_code = nbi.evaluate_signal(
+                latest, prev, self._thresholds, self._trade_type_code, float(self.current_position)
+            )
+            current_trend = TREND_BY_CODE[trend_code]
+            signal = SIGNAL_BY_CODE[signal_code]
             self.trend_direction = current_trend
             
-            # 成交量确认
-            volume_confirmed = latest['volume_ratio'] > self.signals_config['volume_threshold']
-            
-            # 信号生成逻辑
-            signal = SignalType.HOLD
-            
-            # 现货交易信号
-            if self.config['trading']['trade_type'] == 'spot':
-                # 买入信号
-                if (current_trend == TrendDirection.UP and 
-                    latest['ema_fast'] > latest['ema_slow'] and
-                    latest['macd'] > latest['macd_signal'] and
-                    latest['macd_histogram'] > prev['macd_histogram'] and
-                    latest['rsi'] < self.indicators_config['rsi_overbought'] and
-                    volume_confirmed and
-                    self.current_position <= 0):
-                    signal = SignalType.BUY
-                
-                # 卖出信号
-                elif (current_trend == TrendDirection.DOWN and
-                      latest['ema_fast'] < latest['ema_slow'] and
-                      latest['macd'] < latest['macd_signal'] and
-                      latest['macd_histogram'] < prev['macd_histogram'] and
-                      latest['rsi'] > self.indicators_config['rsi_oversold'] and
-                      volume_confirmed and
-                      self.current_position > 0):
-                    signal = SignalType.SELL
-            
-            # 合约交易信号
-            elif self.config['trading']['trade_type'] == 'futures':
-                # 做多信号
-                if (current_trend == TrendDirection.UP and
-                    latest['ema_fast'] > latest['ema_slow'] and
-                    latest['macd'] > latest['macd_signal'] and
-                    latest['close'] > latest['bb_middle'] and
-                    volume_confirmed and
-                    self.current_position <= 0):
-                    signal = SignalType.LONG
-                
-                # 做空信号
-                elif (current_trend == TrendDirection.DOWN and
-                      latest['ema_fast'] < latest['ema_slow'] and
-                      latest['macd'] < latest['macd_signal'] and
-                      latest['close'] < latest['bb_middle'] and
-                      volume_confirmed and
-                      self.current_position >= 0):
-                    signal = SignalType.SHORT
-                
-                # 平多仓信号
-                elif (self.current_position > 0 and
-                      (current_trend == TrendDirection.DOWN or
-                       latest['ema_fast'] < latest['ema_slow'] or
-                       latest['macd'] < latest['macd_signal'])):
-                    signal = SignalType.CLOSE_LONG
-                
-                # 平空仓信号
-                elif (self.current_position < 0 and
-                      (current_trend == TrendDirection.UP or
-                       latest['ema_fast'] > latest['ema_slow'] or
-                       latest['macd'] > latest['macd_signal'])):
-                    signal = SignalType.CLOSE_SHORT
+            logger.debug("趋势检测: {}, 上涨得分: {}, 下跌得分: {}", current_trend.value, up_score, down_score)
             
             # 记录信号生成日志
             if signal != SignalType.HOLD:
-                logger.info(f"生成交易信号: {signal.value}, 趋势: {current_trend.value}, "
-                           f"价格: {latest['close']:.4f}, 成交量倍数: {latest['volume_ratio']:.2f}")
+                logger.info(f"生成交易信号: {signal.name}, 趋势: {current_trend.value}, "
+                           f"价格: {latest[nbi.COL_CLOSE]:.4f}, 成交量倍数: {latest[nbi.COL_VOLUME_RATIO]:.2f}")
             
             self.last_signal = signal
             return signal
@@ -244,22 +337,91 @@ class TrendFollowingStrategy:
             logger.error(f"生成交易信号时出错: {e}")
             return SignalType.HOLD
     
+    def generate_signals_batch(self, frames: Dict[str, Frame],
+                               positions: Optional[Dict[str, float]] = None) -> Dict[str, SignalType]:
+        """批量生成多个交易对的信号(frames需已计算指标); 不修改策略自身状态"""
+        try:
+            positions = positions or {}
+            symbols = [symbol for symbol, df in frames.items() if len(df) >= self._min_bars]
+            signals = {symbol: SignalType.HOLD for symbol in frames}
+            if not symbols:
+                return signals
+            
+            # 每个交易对的最后两行堆叠成连续的(N, 列数)矩阵
+            n = len(symbols)
+            last = np.empty((n, len(self._signal_cols)))
+            prev = np.empty((n, len(self._signal_cols)))
+            for i, symbol in enumerate(symbols):
+                last[i], prev[i] = self._last_rows(frames[symbol])
+            pos = np.array([positions.get(symbol, 0) for symbol in symbols], dtype=np.float64)
+            
+            out_trend = np.empty(n, dtype=np.int8)
+            out_signal = np.empty(n, dtype=np.int8)
+            args = (last, prev, self._thresholds, self._trade_type_code, pos, out_trend, out_signal)
+            try:
+                nbi.evaluate_batch(*args)
+            except Exception as e:
+                logger.warning(f"并行信号评估失败, 改用串行: {e}")
+                nbi.evaluate_batch_serial(*args)
+            
+            for symbol, code in zip(symbols, out_signal.tolist()):
+                signal = SIGNAL_BY_CODE[code]
+                signals[symbol] = signal
+                if signal != SignalType.HOLD:
+                    logger.info(f"生成交易信号: {symbol} {signal.name}")
+            
+            return signals
+            
+        except Exception as e:
+            logger.error(f"批量生成交易信号时出错: {e}")
+            return {symbol: SignalType.HOLD for symbol in frames}
+    
+    def generate_signals_vectorized(self, df: Frame) -> np.ndarray:
+        """对每根K线一次性生成信号编码(int8, 与SignalType取值一致), 用于回测; 持仓按当前持仓计, 不修改策略自身状态"""
+        n = len(df)
+        out = np.zeros(n, dtype=np.int8)
+        if n < self._min_bars:
+            return out
+        
+        if isinstance(df, FeatureStore):
+            m = np.column_stack([df.cols[name][:n] for name in self._signal_cols])
+        else:
+            m = np.ascontiguousarray(df[self._signal_cols].to_numpy(dtype=np.float64))
+        
+        # 第i根K线以第i行为最新行、第i-1行为前一行, 与逐根调用generate_signal一致
+        start = self._min_bars - 1
+        last = np.ascontiguousarray(m[start:])
+        prev = np.ascontiguousarray(m[start - 1:-1])
+        k = len(last)
+        pos = np.full(k, float(self.current_position))
+        out_trend = np.empty(k, dtype=np.int8)
+        out_signal = np.empty(k, dtype=np.int8)
+        args = (last, prev, self._thresholds, self._trade_type_code, pos, out_trend, out_signal)
+        try:
+            nbi.evaluate_batch(*args)
+        except Exception as e:
+            logger.warning(f"并行信号评估失败, 改用串行: {e}")
+            nbi.evaluate_batch_serial(*args)
+        
+        out[start:] = out_signal
+        return out
+    
     def calculate_stop_loss_take_profit(self, entry_price: float, signal_type: SignalType) -> Tuple[float, float]:
         """计算止损止盈价格"""
         try:
-            stop_loss_pct = self.risk_config['stop_loss_pct'] / 100
-            take_profit_pct = self.risk_config['take_profit_pct'] / 100
+            stop_loss_pct = self._stop_loss_frac
+            take_profit_pct = self._take_profit_frac
             
-            if signal_type in [SignalType.BUY, SignalType.LONG]:
+            if signal_type & OPENS_LONG:
                 stop_loss = entry_price * (1 - stop_loss_pct)
                 take_profit = entry_price * (1 + take_profit_pct)
-            elif signal_type in [SignalType.SELL, SignalType.SHORT]:
+            elif signal_type & OPENS_SHORT:
                 stop_loss = entry_price * (1 + stop_loss_pct)
                 take_profit = entry_price * (1 - take_profit_pct)
             else:
                 stop_loss = take_profit = 0
             
-            logger.debug(f"止损止盈计算: 入场价格={entry_price:.4f}, 止损={stop_loss:.4f}, 止盈={take_profit:.4f}")
+            logger.debug("止损止盈计算: 入场价格={:.4f}, 止损={:.4f}, 止盈={:.4f}", entry_price, stop_loss, take_profit)
             return stop_loss, take_profit
             
         except Exception as e:
@@ -269,17 +431,17 @@ class TrendFollowingStrategy:
     def update_position(self, signal_type: SignalType, amount: float, price: float):
         """更新持仓状态"""
         try:
-            if signal_type in [SignalType.BUY, SignalType.LONG]:
+            if signal_type & OPENS_LONG:
                 self.current_position += amount
                 self.entry_price = price
-            elif signal_type in [SignalType.SELL, SignalType.SHORT]:
+            elif signal_type & OPENS_SHORT:
                 self.current_position -= amount
                 self.entry_price = price
-            elif signal_type in [SignalType.CLOSE_LONG, SignalType.CLOSE_SHORT]:
+            elif signal_type & CLOSE_SIGNALS:
                 self.current_position = 0
                 self.entry_price = 0
             
-            logger.info(f"持仓更新: 信号={signal_type.value}, 数量={amount}, 价格={price:.4f}, 当前持仓={self.current_position}")
+            logger.info(f"持仓更新: 信号={signal_type.name}, 数量={amount}, 价格={price:.4f}, 当前持仓={self.current_position}")
             
         except Exception as e:
             logger.error(f"更新持仓时出错: {e}")
@@ -288,7 +450,7 @@ class TrendFollowingStrategy:
         """获取策略状态"""
         return {
             'current_position': self.current_position,
-            'last_signal': self.last_signal.value,
+            'last_signal': self.last_signal.name,
             'entry_price': self.entry_price,
             'trend_direction': self.trend_direction.value,
             'strategy_name': self.strategy_config['name']
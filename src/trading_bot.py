@@ -5,22 +5,49 @@
 整合策略、交易所、风险管理等模块
 """
 
-import yaml
-import time
 import signal
 import sys
-from typing import Dict, Optional
+import time
+import asyncio
+import inspect
+import heapq
+import itertools
+from typing import Callable, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from loguru import logger
-import schedule
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import numpy as np
+import pandas as pd
 
 # 导入自定义模块
-from strategy import TrendFollowingStrategy, SignalType
-from exchange import ExchangeInterface
-from risk_manager import RiskManager, RiskLevel
-from data_manager import DataManager
+from .strategy import TrendFollowingStrategy, FeatureStore, SignalType, OPEN_SIGNALS
+from .exchange import ExchangeInterface
+from .risk_manager import RiskManager, RiskLevel
+from .data_manager import DataManager, to_epoch_ms, timeframe_seconds
+from ._risk_numba import position_pnl
+from ._njit import HAS_NUMBA
+from ._precompile import warmup
+from ._config import load_config
+
+# 指标计算使用的K线窗口长度
+KLINE_WINDOW = 200
+
+# K线周期 -> 交易检查间隔(秒); 日线固定在每天09:00检查
+CYCLE_PERIODS = {'1m': 60, '5m': 300, '15m': 900, '1h': 3600, '4h': 14400}
+
+# 信号记录中保存的收盘价与指标列(首列为收盘价)
+SIGNAL_SNAPSHOT_COLUMNS = ('close', 'ema_fast', 'ema_slow', 'macd', 'rsi', 'adx')
+
+# 健康检查间隔(秒)
+HEALTH_CHECK_INTERVAL = 30
+
+# 止损止盈平仓原因 -> (日志名称, 日志级别)
+EXIT_REASONS = {
+    'stop_loss': ('止损', 'WARNING'),
+    'take_profit': ('止盈', 'INFO')
+}
 
 class TradingBot:
     """量化交易机器人主类"""
@@ -29,6 +56,14 @@ class TradingBot:
         # 加载配置
         self.config = self._load_config(config_path)
         
+        # 交易参数在运行期间不变, 绑定为属性避免每个周期重复查字典
+        trading_config = self.config['trading']
+        self._symbol = trading_config['symbol']
+        self._timeframe = trading_config['timeframe']
+        self._trade_type = trading_config['trade_type']
+        self._trade_amount = trading_config['trade_amount']
+        self._timeframe_ms = timeframe_seconds(self._timeframe) * 1000
+        
         # 初始化各模块
         self.exchange = ExchangeInterface(self.config)
         self.strategy = TrendFollowingStrategy(self.config)
@@ -42,21 +77,69 @@ class TradingBot:
         self.current_position = 0
         self.entry_price = 0
         
+        # 最近KLINE_WINDOW根K线缓存, 每个周期只增量获取新K线
+        self._kline_cache: Optional[pd.DataFrame] = None
+        
+        # 上次指标计算结果及其对应的最后一根K线
+        self._indicator_key: Optional[tuple] = None
+        self._indicator_store: Optional[FeatureStore] = None
+        
         # 性能统计
         self.total_trades = 0
         self.successful_trades = 0
         self.total_pnl = 0
         
+        # 事件循环(start时创建)与定时任务堆: [monotonic截止时间, 序号, 任务, 下次截止时间函数]
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._jobs: List[list] = []
+        self._job_seq = itertools.count()
+        self._tasks = set()
+        self._stream_task: Optional[asyncio.Task] = None
+        
+        # 信号 -> 下单处理函数
+        self._trade_handlers: Dict[SignalType, Callable] = {
+            SignalType.BUY: self._spot_buy,
+            SignalType.SELL: self._spot_sell,
+            SignalType.LONG: self._open_long,
+            SignalType.SHORT: self._open_short,
+            SignalType.CLOSE_LONG: self._close_all,
+            SignalType.CLOSE_SHORT: self._close_all
+        }
+        
+        # 数据落盘线程, 把数据库/文件写入移出交易关键路径(单线程保证写入顺序)
+        self._io_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='bot-io')
+        
         # 设置日志
         self._setup_logging()
         
+        # 预热Numba内核, 首个交易周期不再承担编译/加载缓存的开销
+        self._warmup_kernels()
+        
         logger.info("交易机器人初始化完成")
     
+    def _warmup_kernels(self):
+        """预热Numba内核与指标计算路径"""
+        if not HAS_NUMBA:
+            return
+        
+        try:
+            start = time.perf_counter()
+            warmup()
+            
+            # 用合成K线走一遍完整指标计算
+            close = np.linspace(100.0, 101.0, KLINE_WINDOW)
+            self.strategy.calculate_indicators_np(close, close + 0.5, close - 0.5, np.ones(KLINE_WINDOW))
+            
+            logger.info(f"Numba内核预热完成, 耗时{time.perf_counter() - start:.2f}秒")
+            
+        except Exception as e:
+            logger.warning(f"Numba内核预热失败: {e}")
+    
     def _load_config(self, config_path: str) -> Dict:
         """加载配置文件"""
         try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
+            config = load_config(config_path)
             logger.info(f"配置文件加载成功: {config_path}")
             return config
         except Exception as e:
@@ -103,9 +186,9 @@ class TradingBot:
         try:
             logger.info("=" * 50)
             logger.info("趋势跟踪量化交易机器人启动")
-            logger.info(f"交易对: {self.config['trading']['symbol']}")
-            logger.info(f"交易模式: {self.config['trading']['trade_type']}")
-            logger.info(f"时间周期: {self.config['trading']['timeframe']}")
+            logger.info(f"交易对: {self._symbol}")
+            logger.info(f"交易模式: {self._trade_type}")
+            logger.info(f"时间周期: {self._timeframe}")
             logger.info("=" * 50)
             
             self.is_running = True
@@ -118,7 +201,7 @@ class TradingBot:
             self._setup_scheduler()
             
             # 主循环
-            self._main_loop()
+            asyncio.run(self._main_loop())
             
         except Exception as e:
             logger.error(f"启动交易机器人失败: {e}")
@@ -127,57 +210,124 @@ class TradingBot:
     def _setup_scheduler(self):
         """设置定时任务"""
         try:
+            self._jobs = []
+            
             # 根据时间周期设置交易检查频率
-            timeframe = self.config['trading']['timeframe']
-            
-            if timeframe == '1m':
-                schedule.every(1).minutes.do(self._trading_cycle)
-            elif timeframe == '5m':
-                schedule.every(5).minutes.do(self._trading_cycle)
-            elif timeframe == '15m':
-                schedule.every(15).minutes.do(self._trading_cycle)
-            elif timeframe == '1h':
-                schedule.every().hour.do(self._trading_cycle)
-            elif timeframe == '4h':
-                schedule.every(4).hours.do(self._trading_cycle)
-            elif timeframe == '1d':
-                schedule.every().day.at("09:00").do(self._trading_cycle)
+            timeframe = self._timeframe
+            
+            if timeframe == '1d':
+                self._at(9, 0, self._trading_cycle)
             else:
-                # 默认每小时检查一次
-                schedule.every().hour.do(self._trading_cycle)
+                # 未列出的周期默认每小时检查一次
+                self._every(CYCLE_PERIODS.get(timeframe, 3600), self._trading_cycle)
+            
+            # 系统健康检查
+            self._every(HEALTH_CHECK_INTERVAL, self._health_check)
             
             # 每日性能报告
-            schedule.every().day.at("23:59").do(self._daily_report)
+            self._at(23, 59, self._daily_report)
             
-            # 每周数据清理
-            schedule.every().sunday.at("02:00").do(self._weekly_cleanup)
+            # 每周数据清理(周日)
+            self._at(2, 0, self._weekly_cleanup, weekday=6)
             
             logger.info(f"定时任务设置完成: {timeframe}")
             
         except Exception as e:
             logger.error(f"设置定时任务失败: {e}")
     
-    def _main_loop(self):
+    def _add_job(self, deadline: float, job: Callable, reschedule: Callable[[float], float]):
+        """加入定时任务堆"""
+        heapq.heappush(self._jobs, [deadline, next(self._job_seq), job, reschedule])
+    
+    def _every(self, interval: float, job: Callable):
+        """固定间隔任务, 按上次截止时间累加避免漂移"""
+        self._add_job(time.monotonic() + interval, job, lambda deadline: deadline + interval)
+    
+    def _at(self, hour: int, minute: int, job: Callable, weekday: Optional[int] = None):
+        """每天(或每周weekday)本地时间hour:minute执行的任务"""
+        def next_deadline(_=None) -> float:
+            now = datetime.now()
+            target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if weekday is not None:
+                target += timedelta(days=(weekday - now.weekday()) % 7)
+            if target <= now:
+                target += timedelta(days=1 if weekday is None else 7)
+            return time.monotonic() + (target - now).total_seconds()
+        
+        self._add_job(next_deadline(), job, next_deadline)
+    
+    def _run_due_jobs(self) -> Optional[float]:
+        """执行到期任务, 返回距下一个任务的秒数(无任务时为None)"""
+        now = time.monotonic()
+        while self._jobs and self._jobs[0][0] <= now:
+            entry = self._jobs[0]
+            self._run_job(entry[2])
+            entry[0] = entry[3](entry[0])
+            heapq.heapreplace(self._jobs, entry)
+        return self._jobs[0][0] - now if self._jobs else None
+    
+    def _run_job(self, job):
+        """在事件循环中执行任务, 协程任务以Task方式并发运行"""
+        if inspect.iscoroutinefunction(job):
+            task = asyncio.ensure_future(self._safe_async(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            self._safe(job)
+    
+    @staticmethod
+    def _safe(func: Callable, *args):
+        """调度边界的统一异常处理, 任务内部不再逐层try/except"""
+        try:
+            return func(*args)
+        except Exception as e:
+            logger.error(f"定时任务{getattr(func, '__name__', func)}执行失败: {e}")
+    
+    @staticmethod
+    async def _safe_async(func: Callable, *args):
+        """协程任务的统一异常处理"""
+        try:
+            return await func(*args)
+        except Exception as e:
+            logger.error(f"定时任务{getattr(func, '__name__', func)}执行失败: {e}")
+    
+    async def _main_loop(self):
         """主循环"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        
+        # K线推送常驻后台, 交易周期直接读取推送维护的K线
+        self._stream_task = asyncio.ensure_future(self.exchange.stream_klines(limit=KLINE_WINDOW))
+        
         try:
             while self.is_running:
-                # 执行定时任务
-                schedule.run_pending()
-                
-                # 检查系统状态
-                self._health_check()
+                # 执行到期的定时任务(含健康检查)
+                delay = self._run_due_jobs()
                 
-                # 短暂休眠
-                time.sleep(1)
+                # 休眠到下一个任务, stop()会提前唤醒
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
                 
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, asyncio.CancelledError):
             logger.info("接收到停止信号")
         except Exception as e:
             logger.error(f"主循环异常: {e}")
         finally:
+            # 等待进行中的交易周期结束, 再关闭异步连接
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+            if self._stream_task is not None:
+                self._stream_task.cancel()
+                await asyncio.gather(self._stream_task, return_exceptions=True)
+            try:
+                await self.exchange.stop_streams()
+            except Exception as e:
+                logger.error(f"关闭交易所异步连接失败: {e}")
             self.stop()
     
-    def _trading_cycle(self):
+    async def _trading_cycle(self):
         """交易周期执行"""
         try:
             if not self.is_trading_enabled:
@@ -186,42 +336,36 @@ class TradingBot:
             
             logger.info("开始交易周期检查")
             
-            # 1. 获取市场数据
-            klines_df = self.exchange.get_klines(limit=200)
+            # 本周期统一使用的时间戳(信号、交易记录、K线增量获取)
+            now_ms = to_epoch_ms()
+            
+            # 1-2. 并发获取市场数据(增量获取并保存新K线)和账户快照(余额/价格/持仓/挂单)
+            klines_df, snapshot = await asyncio.gather(
+                self._refresh_klines(now_ms),
+                self.exchange.snapshot()
+            )
             if klines_df.empty:
                 logger.warning("无法获取K线数据，跳过本次周期")
                 return
             
-            # 2. 保存K线数据
-            self.data_manager.save_klines(
-                klines_df, 
-                self.config['trading']['symbol'], 
-                self.config['trading']['timeframe']
-            )
-            
-            # 3. 计算技术指标
-            klines_df = self.strategy.calculate_indicators(klines_df)
+            # 3. 计算技术指标(循环内全程使用numpy列存储, 不再回写DataFrame)
+            store = self._indicators_for(klines_df)
             
             # 4. 生成交易信号
-            signal = self.strategy.generate_signal(klines_df)
-            current_price = float(klines_df['close'].iloc[-1])
+            signal = self.strategy.generate_signal(store)
+            last = store.last_values(SIGNAL_SNAPSHOT_COLUMNS)
+            current_price = last[0]
             
             # 5. 保存信号
             signal_data = {
-                'timestamp': datetime.now().isoformat(),
-                'symbol': self.config['trading']['symbol'],
-                'signal_type': signal.value,
+                'timestamp': now_ms,
+                'symbol': self._symbol,
+                'signal_type': signal.name,
                 'price': current_price,
                 'confidence': 0.8,  # 可以根据指标强度计算
-                'indicators': {
-                    'ema_fast': float(klines_df['ema_fast'].iloc[-1]),
-                    'ema_slow': float(klines_df['ema_slow'].iloc[-1]),
-                    'macd': float(klines_df['macd'].iloc[-1]),
-                    'rsi': float(klines_df['rsi'].iloc[-1]),
-                    'adx': float(klines_df['adx'].iloc[-1])
-                }
+                'indicators': dict(zip(SIGNAL_SNAPSHOT_COLUMNS[1:], last[1:]))
             }
-            self.data_manager.save_signal(signal_data)
+            self._submit_io(self.data_manager.save_signal, signal_data)
             
             # 6. 风险检查
             if not self._risk_check(current_price):
@@ -230,255 +374,302 @@ class TradingBot:
             
             # 7. 执行交易
             if signal != SignalType.HOLD:
-                self._execute_trade(signal, current_price)
+                await self._execute_trade(signal, current_price, snapshot['balance'], now_ms)
             
-            # 8. 检查止损止盈
-            self._check_stop_conditions(current_price)
+            # 8. 检查止损止盈(使用快照中的最新成交价, 而非K线收盘价)
+            await self._check_stop_conditions(float(snapshot['ticker']['last']), now_ms)
             
-            logger.info(f"交易周期完成: 信号={signal.value}, 价格={current_price:.4f}")
+            logger.info("交易周期完成: 信号={}, 价格={:.4f}", signal.name, current_price)
             
         except Exception as e:
             logger.error(f"交易周期执行失败: {e}")
     
+    async def _refresh_klines(self, now_ms: int) -> pd.DataFrame:
+        """更新K线缓存并保存新K线: 优先使用WebSocket推送维护的K线, 推送未就绪或已滞后时REST增量获取"""
+        if self._kline_cache is None:
+            cache = self.data_manager.load_klines(self._symbol, self._timeframe, KLINE_WINDOW)
+            self._kline_cache = cache if not cache.empty else None
+        
+        cache = self._kline_cache
+        last_ts = int(cache.index[-1].value // 1_000_000) if cache is not None else None
+        
+        # 推送已包含当前周期的K线时直接使用, 不再发起REST请求
+        bars = self.exchange.streamed_klines(now_ms - now_ms % self._timeframe_ms)
+        if bars is not None:
+            since = last_ts
+        else:
+            bars, since = await self._fetch_klines(now_ms, cache, last_ts)
+        
+        if since is not None:
+            new_bars = bars[bars.index >= pd.Timestamp(since, unit='ms')]
+        else:
+            new_bars = bars
+        
+        self._submit_io(self.data_manager.save_klines, new_bars, self._symbol, self._timeframe)
+        self._kline_cache = bars
+        return bars
+    
+    async def _fetch_klines(self, now_ms: int, cache: Optional[pd.DataFrame],
+                            last_ts: Optional[int]) -> Tuple[pd.DataFrame, Optional[int]]:
+        """REST增量获取K线: 只获取最后一根K线之后的数据, 返回(合并后的K线, 增量起点)"""
+        since = None
+        limit = KLINE_WINDOW
+        if cache is not None:
+            # 从最后一根K线(可能未收盘)开始获取, 多取几根容忍本地与交易所的时钟偏差;
+            # 缺口超过窗口时整体重新获取
+            missing = (now_ms - last_ts) // self._timeframe_ms + 3
+            if missing < KLINE_WINDOW:
+                since, limit = last_ts, int(missing)
+        
+        bars = await self.exchange.get_klines_async(limit=limit, since=since)
+        if since is not None and bars.index[0] > cache.index[-1]:
+            # 返回数据与缓存不衔接, 放弃增量
+            bars = await self.exchange.get_klines_async(limit=KLINE_WINDOW)
+            since = None
+        
+        if since is not None:
+            # 未收盘K线会被重复获取, 按时间覆盖旧值
+            bars = pd.concat([cache[~cache.index.isin(bars.index)], bars]).iloc[-KLINE_WINDOW:]
+        return bars, since
+    
+    def _indicators_for(self, klines_df: pd.DataFrame) -> FeatureStore:
+        """计算技术指标; 最后一根K线与上次相同时直接复用上次结果"""
+        # 增量获取只会改动最后一根K线, 以其时间和OHLCV作为缓存键
+        key = (klines_df.index[-1], *klines_df.to_numpy()[-1].tolist())
+        if key != self._indicator_key:
+            self._indicator_store = self.strategy.calculate_indicators_np(
+                klines_df['close'], klines_df['high'], klines_df['low'], klines_df['volume'], klines_df.index
+            )
+            self._indicator_key = key
+        else:
+            logger.debug("K线未变化, 复用上次指标计算结果")
+        return self._indicator_store
+    
+    def _submit_io(self, func: Callable, *args):
+        """提交后台写入; 落盘线程已关闭(退出阶段)时直接同步写入"""
+        try:
+            self._io_pool.submit(func, *args)
+        except RuntimeError:
+            func(*args)
+    
     def _risk_check(self, current_price: float) -> bool:
         """风险检查"""
-        try:
-            # 检查每日交易限制
-            if not self.risk_manager.check_daily_limits():
-                return False
-            
-            # 评估风险等级
-            risk_level = self.risk_manager.assess_risk_level(
-                self.total_pnl, self.current_position
-            )
-            
-            # 检查是否应该停止交易
-            if self.risk_manager.should_stop_trading(risk_level):
-                self.is_trading_enabled = False
-                logger.critical("风险过高，自动禁用交易")
-                return False
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"风险检查失败: {e}")
+        # 检查每日交易限制
+        if not self.risk_manager.check_daily_limits():
+            return False
+        
+        # 评估风险等级
+        risk_level = self.risk_manager.assess_risk_level(
+            self.total_pnl, self.current_position
+        )
+        
+        # 检查是否应该停止交易
+        if self.risk_manager.should_stop_trading(risk_level):
+            self.is_trading_enabled = False
+            logger.critical("风险过高，自动禁用交易")
             return False
+        
+        return True
     
-    def _execute_trade(self, signal: SignalType, current_price: float):
+    async def _execute_trade(self, signal: SignalType, current_price: float,
+                             balance: Optional[Dict] = None, timestamp: Optional[int] = None):
         """执行交易"""
         try:
-            trade_amount = self.config['trading']['trade_amount']
-            symbol = self.config['trading']['symbol']
-            
-            # 获取账户余额
-            balance = self.exchange.get_balance()
-            
-            # 根据信号类型执行不同操作
-            order = None
-            
-            if signal == SignalType.BUY and self.current_position <= 0:
-                # 现货买入
-                order = self.exchange.place_market_order('buy', trade_amount)
-                if order:
-                    self.current_position += trade_amount
-                    self.entry_price = current_price
-                    self.strategy.update_position(signal, trade_amount, current_price)
-            
-            elif signal == SignalType.SELL and self.current_position > 0:
-                # 现货卖出
-                sell_amount = min(trade_amount, self.current_position)
-                order = self.exchange.place_market_order('sell', sell_amount)
-                if order:
-                    self.current_position -= sell_amount
-                    if self.current_position <= 0:
-                        self.entry_price = 0
-                    self.strategy.update_position(signal, sell_amount, current_price)
-            
-            elif signal == SignalType.LONG and self.current_position <= 0:
-                # 合约做多
-                order = self.exchange.place_market_order('buy', trade_amount)
-                if order:
-                    self.current_position = trade_amount
-                    self.entry_price = current_price
-                    self.strategy.update_position(signal, trade_amount, current_price)
-            
-            elif signal == SignalType.SHORT and self.current_position >= 0:
-                # 合约做空
-                order = self.exchange.place_market_order('sell', trade_amount)
-                if order:
-                    self.current_position = -trade_amount
-                    self.entry_price = current_price
-                    self.strategy.update_position(signal, trade_amount, current_price)
-            
-            elif signal in [SignalType.CLOSE_LONG, SignalType.CLOSE_SHORT]:
-                # 平仓
-                if self.current_position != 0:
-                    close_side = 'sell' if self.current_position > 0 else 'buy'
-                    order = self.exchange.place_market_order(close_side, abs(self.current_position))
-                    if order:
-                        # 计算盈亏
-                        pnl = self._calculate_pnl(current_price)
-                        self.total_pnl += pnl
-                        
-                        self.current_position = 0
-                        self.entry_price = 0
-                        self.strategy.update_position(signal, 0, current_price)
+            # 获取账户余额(交易周期内已与K线并发获取)
+            if balance is None:
+                balance = await self.exchange.get_balance_async()
+            
+            # 按信号类型查表分派, 持仓条件不满足时处理函数返回None
+            handler = self._trade_handlers.get(signal)
+            order = await handler(signal, current_price) if handler is not None else None
             
             # 记录交易
             if order:
-                self._record_trade(order, signal, current_price)
+                self._record_trade(order, signal, current_price, timestamp=timestamp)
+                self._sync_stop_levels()
                 
                 # 设置止损止盈订单
-                if signal in [SignalType.BUY, SignalType.LONG, SignalType.SELL, SignalType.SHORT]:
+                if signal & OPEN_SIGNALS:
                     self._set_stop_orders(current_price, signal)
             
         except Exception as e:
             logger.error(f"执行交易失败: {e}")
     
+    async def _spot_buy(self, signal: SignalType, current_price: float) -> Optional[Dict]:
+        """现货买入"""
+        if self.current_position > 0:
+            return None
+        
+        order = await self.exchange.place_market_order_async('buy', self._trade_amount)
+        if order:
+            self.current_position += self._trade_amount
+            self.entry_price = current_price
+            self.strategy.update_position(signal, self._trade_amount, current_price)
+        return order
+    
+    async def _spot_sell(self, signal: SignalType, current_price: float) -> Optional[Dict]:
+        """现货卖出"""
+        if self.current_position <= 0:
+            return None
+        
+        sell_amount = min(self._trade_amount, self.current_position)
+        order = await self.exchange.place_market_order_async('sell', sell_amount)
+        if order:
+            self.current_position -= sell_amount
+            if self.current_position <= 0:
+                self.entry_price = 0
+            self.strategy.update_position(signal, sell_amount, current_price)
+        return order
+    
+    async def _open_long(self, signal: SignalType, current_price: float) -> Optional[Dict]:
+        """合约做多"""
+        if self.current_position > 0:
+            return None
+        
+        order = await self.exchange.place_market_order_async('buy', self._trade_amount)
+        if order:
+            self.current_position = self._trade_amount
+            self.entry_price = current_price
+            self.strategy.update_position(signal, self._trade_amount, current_price)
+        return order
+    
+    async def _open_short(self, signal: SignalType, current_price: float) -> Optional[Dict]:
+        """合约做空"""
+        if self.current_position < 0:
+            return None
+        
+        order = await self.exchange.place_market_order_async('sell', self._trade_amount)
+        if order:
+            self.current_position = -self._trade_amount
+            self.entry_price = current_price
+            self.strategy.update_position(signal, self._trade_amount, current_price)
+        return order
+    
+    async def _close_all(self, signal: SignalType, current_price: float) -> Optional[Dict]:
+        """平仓"""
+        if self.current_position == 0:
+            return None
+        
+        close_side = 'sell' if self.current_position > 0 else 'buy'
+        order = await self.exchange.place_market_order_async(close_side, abs(self.current_position))
+        if order:
+            # 计算盈亏
+            pnl = self._calculate_pnl(current_price)
+            self.total_pnl += pnl
+            
+            self.current_position = 0
+            self.entry_price = 0
+            self.strategy.update_position(signal, 0, current_price)
+        return order
+    
     def _calculate_pnl(self, current_price: float) -> float:
         """计算盈亏"""
-        try:
-            if self.current_position == 0 or self.entry_price == 0:
-                return 0
-            
-            if self.current_position > 0:  # 多头
-                pnl = (current_price - self.entry_price) * self.current_position
-            else:  # 空头
-                pnl = (self.entry_price - current_price) * abs(self.current_position)
-            
-            return pnl
-            
-        except Exception as e:
-            logger.error(f"计算盈亏失败: {e}")
-            return 0
+        return position_pnl(float(self.current_position), float(self.entry_price), float(current_price))
     
     def _set_stop_orders(self, entry_price: float, signal: SignalType):
         """设置止损止盈订单"""
-        try:
-            stop_loss, take_profit = self.strategy.calculate_stop_loss_take_profit(entry_price, signal)
-            
-            if stop_loss > 0 and take_profit > 0:
-                # 这里可以设置实际的止损止盈订单
-                # 由于不同交易所API差异，这里仅记录价格
-                logger.info(f"止损止盈设置: 止损={stop_loss:.4f}, 止盈={take_profit:.4f}")
-            
-        except Exception as e:
-            logger.error(f"设置止损止盈失败: {e}")
+        stop_loss, take_profit = self.strategy.calculate_stop_loss_take_profit(entry_price, signal)
+        
+        if stop_loss > 0 and take_profit > 0:
+            # 这里可以设置实际的止损止盈订单
+            # 由于不同交易所API差异，这里仅记录价格
+            logger.info("止损止盈设置: 止损={:.4f}, 止盈={:.4f}", stop_loss, take_profit)
     
-    def _check_stop_conditions(self, current_price: float):
-        """检查止损止盈条件"""
-        try:
-            if self.current_position == 0 or self.entry_price == 0:
-                return
-            
+    def _sync_stop_levels(self):
+        """持仓或入场价变化后刷新风险管理器缓存的止损止盈价位"""
+        if self.current_position == 0 or self.entry_price == 0:
+            self.risk_manager.close_position(self._symbol)
+        else:
             side = 'buy' if self.current_position > 0 else 'sell'
-            
-            # 检查止损
-            if self.risk_manager.check_stop_loss_trigger(
-                current_price, self.entry_price, side, self.current_position
-            ):
-                logger.warning("触发止损，执行平仓")
-                self._execute_stop_loss(current_price)
-            
-            # 检查止盈
-            elif self.risk_manager.check_take_profit_trigger(
-                current_price, self.entry_price, side, self.current_position
-            ):
-                logger.info("触发止盈，执行平仓")
-                self._execute_take_profit(current_price)
-            
-        except Exception as e:
-            logger.error(f"检查止损止盈失败: {e}")
+            self.risk_manager.open_position(self._symbol, self.entry_price, side)
     
-    def _execute_stop_loss(self, current_price: float):
-        """执行止损"""
-        try:
-            if self.current_position == 0:
-                return
-            
-            close_side = 'sell' if self.current_position > 0 else 'buy'
-            order = self.exchange.place_market_order(close_side, abs(self.current_position))
-            
-            if order:
-                pnl = self._calculate_pnl(current_price)
-                self.total_pnl += pnl
-                
-                # 记录交易
-                self._record_trade(order, SignalType.SELL, current_price, 'stop_loss')
-                
-                self.current_position = 0
-                self.entry_price = 0
-                
-                logger.warning(f"止损执行完成: 盈亏={pnl:.4f}")
-            
-        except Exception as e:
-            logger.error(f"执行止损失败: {e}")
+    async def _check_stop_conditions(self, current_price: float, timestamp: Optional[int] = None):
+        """检查止损止盈条件"""
+        if self.current_position == 0 or self.entry_price == 0:
+            return
+        
+        # 检查止损
+        if self.risk_manager.check_stop_loss_trigger(current_price, self._symbol):
+            logger.warning("触发止损，执行平仓")
+            await self._close_position(current_price, 'stop_loss', timestamp)
+        
+        # 检查止盈
+        elif self.risk_manager.check_take_profit_trigger(current_price, self._symbol):
+            logger.info("触发止盈，执行平仓")
+            await self._close_position(current_price, 'take_profit', timestamp)
     
-    def _execute_take_profit(self, current_price: float):
-        """执行止盈"""
+    async def _close_position(self, current_price: float, reason: str, timestamp: Optional[int] = None):
+        """止损/止盈平仓, reason为'stop_loss'或'take_profit'"""
+        label, level = EXIT_REASONS[reason]
         try:
-            if self.current_position == 0:
+            pos = self.current_position
+            if pos == 0:
                 return
             
-            close_side = 'sell' if self.current_position > 0 else 'buy'
-            order = self.exchange.place_market_order(close_side, abs(self.current_position))
+            close_side = 'sell' if pos > 0 else 'buy'
+            order = await self.exchange.place_market_order_async(close_side, abs(pos))
             
             if order:
                 pnl = self._calculate_pnl(current_price)
                 self.total_pnl += pnl
                 
                 # 记录交易
-                self._record_trade(order, SignalType.SELL, current_price, 'take_profit')
+                self._record_trade(order, SignalType.SELL, current_price, reason, timestamp)
                 
                 self.current_position = 0
                 self.entry_price = 0
+                self._sync_stop_levels()
                 
-                logger.info(f"止盈执行完成: 盈亏={pnl:.4f}")
+                logger.log(level, "{}执行完成: 盈亏={:.4f}", label, pnl)
             
         except Exception as e:
-            logger.error(f"执行止盈失败: {e}")
+            logger.error(f"执行{label}失败: {e}")
     
-    def _record_trade(self, order: Dict, signal: SignalType, price: float, trade_type: str = 'normal'):
-        """记录交易"""
+    def _record_trade(self, order: Dict, signal: SignalType, price: float, trade_type: str = 'normal',
+                      timestamp: Optional[int] = None):
+        """记录交易(timestamp为所在交易周期的时间戳, 缺省取当前时间)"""
         try:
+            amount = order.get('amount', 0)
+            pnl = self._calculate_pnl(price) if trade_type in EXIT_REASONS else 0
+            side = order.get('side', '')
+            
             trade_data = {
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': timestamp if timestamp is not None else to_epoch_ms(),
                 'symbol': order.get('symbol', ''),
-                'side': order.get('side', ''),
-                'amount': order.get('amount', 0),
+                'side': side,
+                'amount': amount,
                 'price': price,
-                'value': order.get('amount', 0) * price,
+                'value': amount * price,
                 'fee': order.get('fee', {}).get('cost', 0),
-                'pnl': self._calculate_pnl(price) if trade_type in ['stop_loss', 'take_profit'] else 0,
-                'signal_type': signal.value,
+                'pnl': pnl,
+                'signal_type': signal.name,
                 'order_id': order.get('id', ''),
                 'status': order.get('status', 'completed')
             }
             
             # 保存到数据管理器
-            self.data_manager.save_trade(trade_data)
+            self._submit_io(self.data_manager.save_trade, trade_data)
             
             # 更新统计
             self.total_trades += 1
-            if trade_data['pnl'] > 0:
-                self.successful_trades += 1
+            self.successful_trades += pnl > 0
             
             # 记录到风险管理器
             self.risk_manager.record_trade(trade_data)
             
-            logger.info(f"交易记录: {trade_data['side']} {trade_data['amount']} @ {price:.4f}")
+            logger.info("交易记录: {} {} @ {:.4f}", side, amount, price)
             
         except Exception as e:
             logger.error(f"记录交易失败: {e}")
     
-    def _health_check(self):
+    async def _health_check(self):
         """系统健康检查"""
         try:
             # 检查交易所连接
             if not self.exchange.is_connected:
                 logger.warning("交易所连接异常")
-                # 尝试重连
-                self.exchange = ExchangeInterface(self.config)
+                # 尝试重连(复用市场信息与会话, 不重新初始化交易所接口)
+                await self.exchange.reconnect()
             
             # 检查市场是否开放
             if not self.exchange.is_market_open():
@@ -548,13 +739,15 @@ class TradingBot:
             
             self.is_running = False
             self.is_trading_enabled = False
+            self._wake_main_loop()
             
             # 如果有持仓，询问是否平仓
             if self.current_position != 0:
                 logger.warning(f"当前持仓: {self.current_position}")
                 # 在实际应用中，可以选择自动平仓或手动处理
             
-            # 生成最终报告
+            # 等待后台写入完成, 再生成最终报告
+            self._io_pool.shutdown(wait=True)
             self._generate_final_report()
             
             logger.info("交易机器人已停止")
@@ -562,19 +755,21 @@ class TradingBot:
         except Exception as e:
             logger.error(f"停止机器人失败: {e}")
     
+    def _wake_main_loop(self):
+        """唤醒休眠中的主循环(可在信号处理器或其他线程中调用)"""
+        if self._loop is not None and self._wakeup is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+    
     def _generate_final_report(self):
         """生成最终报告"""
         try:
-            # 获取所有交易记录
-            trades_df = self.data_manager.load_trades()
+            # 总体性能(增量统计, 无需重新加载全部交易)
+            metrics = self.data_manager.get_performance_metrics()
             
-            if trades_df.empty:
+            if not metrics:
                 logger.info("无交易记录")
                 return
             
-            # 计算总体性能
-            metrics = self.data_manager.calculate_performance_metrics(trades_df)
-            
             report = f"""
             ==================== 最终交易报告 ====================
             运行时间: {datetime.now().isoformat()}
@@ -94,6 +94,9 @@ install_dependencies() {
     print_info "安装依赖包..."
     pip install -r requirements.txt
     
+    print_info "预编译Numba内核..."
+    python3 -m src._precompile
+    
     print_success "依赖安装完成"
 }
 
@@ -253,8 +256,7 @@ test_mode() {
     print_info "运行连接测试..."
     python3 -c "
 import sys
-sys.path.append('src')
-from exchange import ExchangeInterface
+from src.exchange import ExchangeInterface
 import yaml
 
 with open('config.yaml', 'r') as f:
@@ -10,28 +10,133 @@ import os
 from pathlib import Path
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple
 import sqlite3
-import yaml
+from string import Template
 import warnings
 warnings.filterwarnings('ignore')
 
-# 设置中文字体
-plt.rcParams['font.sans-serif'] = ['SimHei', 'Arial Unicode MS', 'DejaVu Sans']
-plt.rcParams['axes.unicode_minus'] = False
+# 添加项目根目录到Python路径, 以包的形式导入src
+root_path = Path(__file__).parent.parent
+sys.path.insert(0, str(root_path))
 
-# 添加src目录到Python路径
-src_path = Path(__file__).parent.parent / 'src'
-sys.path.insert(0, str(src_path))
+from src.data_manager import to_epoch_ms, from_epoch_ms
+from src import _analysis_numba as nba
+from src._config import load_config
+
+NO_TRADES_MESSAGE = "无交易数据可分析"
+
+# 只读分析连接参数(与机器人写入并发, 不加写锁)
+ANALYZER_PRAGMAS = (
+    "PRAGMA query_only=1",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA busy_timeout=5000",
+)
+
+# K线按块读取的行数与绘图降采样周期
+KLINES_CHUNKSIZE = 100_000
+KLINES_CHART_RULE = '5min'
+
+# 图表保存分辨率
+CHART_DPI = 120
+
+# 报告模板: 指标先按REPORT_FIELD_FORMATS格式化为字符串, 再填入静态框架
+REPORT_FIELD_FORMATS = {
+    'total_trades': '>6',
+    'winning_trades': '>6',
+    'losing_trades': '>6',
+    'win_rate': '>6.2f',
+    'total_pnl': '>10.4f',
+    'avg_pnl': '>10.4f',
+    'avg_win': '>10.4f',
+    'avg_loss': '>10.4f',
+    'profit_loss_ratio': '>6.2f',
+    'max_win': '>10.4f',
+    'max_loss': '>10.4f',
+    'max_drawdown': '>10.4f',
+    'max_drawdown_pct': '>6.2f',
+    'max_drawdown_duration': '>6',
+    'sharpe_ratio': '>6.2f',
+    'sortino_ratio': '>6.2f',
+    'calmar_ratio': '>6.2f',
+    'max_consecutive_losses': '>6',
+    'max_consecutive_wins': '>6',
+}
+
+REPORT_HEADER = Template("""
+╔══════════════════════════════════════════════════════════════════════════════════════╗
+║                                交易策略性能分析报告                                    ║
+╠══════════════════════════════════════════════════════════════════════════════════════╣
+║ 分析期间: ${start_date} 至 ${end_date} (共 ${days} 天)                     ║
+║ 生成时间: ${generated_at}                                                    ║
+╠══════════════════════════════════════════════════════════════════════════════════════╣
+║ 基础指标                                                                             ║
+║ • 总交易次数:     ${total_trades}                                                ║
+║ • 盈利交易:       ${winning_trades}                                                ║
+║ • 亏损交易:       ${losing_trades}                                                ║
+║ • 胜率:           ${win_rate}%                                              ║
+║ • 总盈亏:         ${total_pnl}                                          ║
+║ • 平均盈亏:       ${avg_pnl}                                          ║
+║ • 平均盈利:       ${avg_win}                                          ║
+║ • 平均亏损:       ${avg_loss}                                          ║
+║ • 盈亏比:         ${profit_loss_ratio}                                              ║
+║ • 最大单笔盈利:   ${max_win}                                          ║
+║ • 最大单笔亏损:   ${max_loss}                                          ║
+╠══════════════════════════════════════════════════════════════════════════════════════╣
+║ 风险指标                                                                             ║
+║ • 最大回撤:       ${max_drawdown}                                          ║
+║ • 最大回撤率:     ${max_drawdown_pct}%                                              ║
+║ • 回撤持续期:     ${max_drawdown_duration} 笔交易                                        ║
+║ • 夏普比率:       ${sharpe_ratio}                                              ║
+║ • 索提诺比率:     ${sortino_ratio}                                              ║
+║ • 卡尔马比率:     ${calmar_ratio}                                              ║
+║ • 最大连续亏损:   ${max_consecutive_losses} 笔                                            ║
+║ • 最大连续盈利:   ${max_consecutive_wins} 笔                                            ║
+╠══════════════════════════════════════════════════════════════════════════════════════╣""")
+
+REPORT_FOOTER = Template("""║ 策略评级                                                                             ║
+║ • 综合得分:       ${score}/100                                                        ║
+║ • 策略评级:       ${rating}                                                            ║
+╚══════════════════════════════════════════════════════════════════════════════════════╝
+""")
+
+def _minmax_downsample(values: np.ndarray, n_buckets: int) -> np.ndarray:
+    """按桶保留最小/最大值所在下标(保持时间顺序), 点数不超过桶数时原样返回"""
+    n = len(values)
+    if n <= 2 * n_buckets:
+        return np.arange(n)
+    size = -(-n // n_buckets)
+    rows = -(-n // size)
+    padded = np.full(rows * size, np.nan)
+    padded[:n] = values
+    padded = padded.reshape(rows, size)
+    offsets = np.arange(rows) * size
+    idx = np.concatenate((offsets + np.nanargmin(padded, axis=1), offsets + np.nanargmax(padded, axis=1)))
+    return np.unique(idx)
+
+def _load_pyplot(interactive: bool = False):
+    """按需加载matplotlib(仅绘图时), 非交互时使用无界面的Agg后端"""
+    import matplotlib
+    if not interactive:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    
+    # 设置中文字体
+    plt.rcParams['font.sans-serif'] = ['SimHei', 'Arial Unicode MS', 'DejaVu Sans']
+    plt.rcParams['axes.unicode_minus'] = False
+    return plt
 
 class PerformanceAnalyzer:
     """性能分析器"""
     
     def __init__(self, config_path: str = '../config.yaml'):
         self.config = self._load_config(config_path)
+        trading_config = self.config.get('trading', {})
+        self.symbol = trading_config.get('symbol')
+        self.timeframe = trading_config.get('timeframe')
         self.db_path = Path('../data/trading_bot.db')
         self.output_dir = Path('../analysis')
         self.output_dir.mkdir(parents=True, exist_ok=True)
@@ -39,25 +144,32 @@ class PerformanceAnalyzer:
         # 分析参数
         self.risk_free_rate = 0.02  # 无风险利率
         self.trading_days_per_year = 252
+        self._sqrt_days = np.sqrt(self.trading_days_per_year)  # 年化波动率系数
         
     def _load_config(self, config_path: str) -> Dict:
         """加载配置文件"""
         try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                return yaml.safe_load(f)
+            return load_config(config_path)
         except Exception as e:
             print(f"配置文件加载失败: {e}")
             return {}
     
-    def load_data(self, days: int = 30) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
-        """加载数据"""
+    def _connect(self) -> sqlite3.Connection:
+        """以只读方式打开数据库"""
         if not self.db_path.exists():
             raise FileNotFoundError("数据库文件不存在")
         
-        conn = sqlite3.connect(self.db_path)
+        conn = sqlite3.connect(self.db_path.resolve().as_uri() + "?mode=ro", uri=True)
+        for pragma in ANALYZER_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+    
+    def load_data(self, days: int = 30) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """加载数据"""
+        conn = self._connect()
         
         # 计算开始日期
-        start_date = (datetime.now() - timedelta(days=days)).isoformat()
+        start_date = to_epoch_ms(datetime.now() - timedelta(days=days))
         
         # 加载交易记录
         trades_query = """
@@ -75,54 +187,145 @@ class PerformanceAnalyzer:
         """
         signals_df = pd.read_sql_query(signals_query, conn, params=[start_date])
         
-        # 加载K线数据
-        klines_query = """
-            SELECT * FROM klines 
-            WHERE timestamp >= ? 
+        # 加载K线数据(分块读取并逐块降采样, 仅用于绘图)
+        # 按交易对和周期过滤, 走(symbol, timeframe, timestamp)索引的范围扫描
+        if self.symbol and self.timeframe:
+            klines_where = "symbol = ? AND timeframe = ? AND timestamp >= ?"
+            klines_params = [self.symbol, self.timeframe, start_date]
+        else:
+            klines_where = "timestamp >= ?"
+            klines_params = [start_date]
+        klines_query = f"""
+            SELECT timestamp, open, high, low, close, volume FROM klines 
+            WHERE {klines_where} 
             ORDER BY timestamp
         """
-        klines_df = pd.read_sql_query(klines_query, conn, params=[start_date])
+        kline_chunks = []
+        for chunk in pd.read_sql_query(klines_query, conn, params=klines_params, chunksize=KLINES_CHUNKSIZE):
+            chunk['timestamp'] = pd.to_datetime(chunk['timestamp'], unit='ms')
+            kline_chunks.append(chunk.set_index('timestamp').resample(KLINES_CHART_RULE).last().dropna(how='all'))
         
         conn.close()
         
+        if kline_chunks:
+            klines_df = pd.concat(kline_chunks)
+            # 块边界可能切开同一个降采样区间
+            klines_df = klines_df[~klines_df.index.duplicated(keep='last')].reset_index()
+        else:
+            klines_df = pd.DataFrame(columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        
         # 数据预处理
         if not trades_df.empty:
-            trades_df['timestamp'] = pd.to_datetime(trades_df['timestamp'])
-            trades_df['date'] = trades_df['timestamp'].dt.date
+            trades_df['timestamp'] = from_epoch_ms(trades_df['timestamp'])
+            trades_df['date'] = trades_df['timestamp'].dt.normalize()
+            trades_df['side'] = trades_df['side'].astype('category')
         
         if not signals_df.empty:
-            signals_df['timestamp'] = pd.to_datetime(signals_df['timestamp'])
-            signals_df['date'] = signals_df['timestamp'].dt.date
+            signals_df['timestamp'] = from_epoch_ms(signals_df['timestamp'])
+            signals_df['date'] = signals_df['timestamp'].dt.normalize()
+            signals_df['signal_type'] = signals_df['signal_type'].astype('category')
         
         if not klines_df.empty:
-            klines_df['timestamp'] = pd.to_datetime(klines_df['timestamp'])
-            klines_df['date'] = klines_df['timestamp'].dt.date
+            klines_df['date'] = klines_df['timestamp'].dt.normalize()
         
         return trades_df, signals_df, klines_df
     
+    def load_aggregates(self, days: int = 30) -> Dict:
+        """在SQL中聚合加载(仅报告使用, 不拉取整表)"""
+        conn = self._connect()
+        start_date = to_epoch_ms(datetime.now() - timedelta(days=days))
+        
+        try:
+            # 按本地日期汇总交易(NULL盈亏按0计, 与逐笔分析一致)
+            daily_query = """
+                SELECT date(timestamp / 1000, 'unixepoch', 'localtime') AS date,
+                       COUNT(*) AS trades,
+                       SUM(COALESCE(pnl, 0)) AS pnl,
+                       SUM(pnl > 0) AS wins,
+                       SUM(pnl < 0) AS losses,
+                       SUM(CASE WHEN pnl > 0 THEN pnl ELSE 0 END) AS win_pnl,
+                       SUM(CASE WHEN pnl < 0 THEN pnl ELSE 0 END) AS loss_pnl,
+                       MAX(COALESCE(pnl, 0)) AS max_pnl,
+                       MIN(COALESCE(pnl, 0)) AS min_pnl
+                FROM trades
+                WHERE timestamp >= ?
+                GROUP BY date
+                ORDER BY date
+            """
+            daily_df = pd.read_sql_query(daily_query, conn, params=[start_date])
+            
+            # 风险指标依赖逐笔顺序, 只取pnl一列
+            pnl = np.array(conn.execute(
+                "SELECT COALESCE(pnl, 0) FROM trades WHERE timestamp >= ? ORDER BY timestamp", (start_date,)
+            ).fetchall(), dtype=np.float64).reshape(-1)
+            
+            signal_counts = dict(conn.execute("""
+                SELECT signal_type, COUNT(*) AS count
+                FROM signals
+                WHERE timestamp >= ?
+                GROUP BY signal_type
+                ORDER BY count DESC
+            """, (start_date,)).fetchall())
+            
+            # 信号准确率: 与逐笔分析一致, 统计每个信号后1小时内(含两端)的交易, NULL盈亏按0计
+            accuracy_rows = conn.execute("""
+                SELECT s.signal_type,
+                       COUNT(*) AS total,
+                       SUM(COALESCE(t.pnl, 0) > 0) AS profitable,
+                       SUM(COALESCE(t.pnl, 0)) AS pnl
+                FROM signals s
+                JOIN trades t
+                  ON t.timestamp BETWEEN s.timestamp AND s.timestamp + 3600000
+                WHERE s.timestamp >= ? AND t.timestamp >= ?
+                GROUP BY s.signal_type
+                ORDER BY MIN(s.timestamp)
+            """, (start_date, start_date)).fetchall()
+        finally:
+            conn.close()
+        
+        signal_accuracy = {
+            signal_type: {
+                'total': total,
+                'profitable': profitable,
+                'accuracy': profitable / total * 100,
+                'avg_pnl': pnl_sum / total
+            }
+            for signal_type, total, profitable, pnl_sum in accuracy_rows
+        }
+        
+        return {
+            'daily': daily_df,
+            'pnl': pnl,
+            'signal_counts': signal_counts,
+            'signal_accuracy': signal_accuracy
+        }
+    
     def calculate_basic_metrics(self, trades_df: pd.DataFrame) -> Dict:
         """计算基础指标"""
         if trades_df.empty:
             return {}
         
-        # 基础统计
-        total_trades = len(trades_df)
-        winning_trades = len(trades_df[trades_df['pnl'] > 0])
-        losing_trades = len(trades_df[trades_df['pnl'] < 0])
+        # 基础统计(盈亏掩码只计算一次, NULL盈亏按0计)
+        pnl = trades_df['pnl'].fillna(0).to_numpy(dtype=np.float64)
+        win_mask = pnl > 0
+        loss_mask = pnl < 0
+        total_trades = len(pnl)
+        winning_trades = int(win_mask.sum())
+        losing_trades = int(loss_mask.sum())
         
         # 盈亏统计
-        total_pnl = trades_df['pnl'].sum()
-        avg_pnl = trades_df['pnl'].mean()
-        avg_win = trades_df[trades_df['pnl'] > 0]['pnl'].mean() if winning_trades > 0 else 0
-        avg_loss = trades_df[trades_df['pnl'] < 0]['pnl'].mean() if losing_trades > 0 else 0
+        total_pnl = pnl.sum()
+        avg_pnl = pnl.mean()
+        avg_win = pnl[win_mask].mean() if winning_trades > 0 else 0
+        avg_loss = pnl[loss_mask].mean() if losing_trades > 0 else 0
         
         # 胜率和盈亏比
         win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
         profit_loss_ratio = abs(avg_win / avg_loss) if avg_loss != 0 else 0
         
         # 最大单笔盈利和亏损
-        max_win = trades_df['pnl'].max() if not trades_df.empty else 0
-        max_loss = trades_df['pnl'].min() if not trades_df.empty else 0
+        max_win = pnl.max()
+        max_loss = pnl.min()
         
         return {
             'total_trades': total_trades,
@@ -138,68 +341,84 @@ class PerformanceAnalyzer:
             'max_loss': max_loss
         }
     
+    def calculate_basic_metrics_from_daily(self, daily_df: pd.DataFrame) -> Dict:
+        """由按日汇总结果计算基础指标"""
+        if daily_df.empty:
+            return {}
+        
+        total_trades = int(daily_df['trades'].sum())
+        winning_trades = int(daily_df['wins'].sum())
+        losing_trades = int(daily_df['losses'].sum())
+        
+        total_pnl = daily_df['pnl'].sum()
+        avg_pnl = total_pnl / total_trades if total_trades > 0 else 0
+        avg_win = daily_df['win_pnl'].sum() / winning_trades if winning_trades > 0 else 0
+        avg_loss = daily_df['loss_pnl'].sum() / losing_trades if losing_trades > 0 else 0
+        
+        win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
+        profit_loss_ratio = abs(avg_win / avg_loss) if avg_loss != 0 else 0
+        
+        return {
+            'total_trades': total_trades,
+            'winning_trades': winning_trades,
+            'losing_trades': losing_trades,
+            'win_rate': win_rate,
+            'total_pnl': total_pnl,
+            'avg_pnl': avg_pnl,
+            'avg_win': avg_win,
+            'avg_loss': avg_loss,
+            'profit_loss_ratio': profit_loss_ratio,
+            'max_win': daily_df['max_pnl'].max(),
+            'max_loss': daily_df['min_pnl'].min()
+        }
+    
     def calculate_risk_metrics(self, trades_df: pd.DataFrame) -> Dict:
         """计算风险指标"""
         if trades_df.empty:
             return {}
         
-        # 累计收益曲线
-        trades_df = trades_df.copy()
-        trades_df['cumulative_pnl'] = trades_df['pnl'].cumsum()
+        # 累计收益曲线与回撤(数组只计算一次)
+        # 内核签名要求可写数组, 写时复制下to_numpy可能返回只读视图, 这里显式复制; NULL盈亏按0计
+        pnl = np.array(trades_df['pnl'].fillna(0), dtype=np.float64)
+        cumulative_pnl = np.cumsum(pnl)
+        peak = np.maximum.accumulate(cumulative_pnl)
+        drawdown = peak - cumulative_pnl
         
         # 最大回撤
-        peak = trades_df['cumulative_pnl'].expanding().max()
-        drawdown = peak - trades_df['cumulative_pnl']
         max_drawdown = drawdown.max()
-        max_drawdown_pct = (max_drawdown / peak.max() * 100) if peak.max() > 0 else 0
-        
-        # 回撤持续时间
-        drawdown_periods = []
-        in_drawdown = False
-        start_idx = 0
+        max_peak = peak.max()
+        max_drawdown_pct = (max_drawdown / max_peak * 100) if max_peak > 0 else 0
         
-        for i, dd in enumerate(drawdown):
-            if dd > 0 and not in_drawdown:
-                in_drawdown = True
-                start_idx = i
-            elif dd == 0 and in_drawdown:
-                in_drawdown = False
-                drawdown_periods.append(i - start_idx)
+        # 回撤持续时间与连续盈亏(单次扫描内核)
+        max_drawdown_duration = int(nba.drawdown_duration(drawdown))
+        max_consecutive_losses = int(nba.max_streak(pnl, -1))
+        max_consecutive_wins = int(nba.max_streak(pnl, 1))
         
-        max_drawdown_duration = max(drawdown_periods) if drawdown_periods else 0
+        # 收益均值/标准差复用于各比率(样本标准差, 与pandas一致)
+        annual_return = pnl.mean() * self.trading_days_per_year
+        excess_return = annual_return - self.risk_free_rate
+        sigma = pnl.std(ddof=1) if len(pnl) > 1 else 0
+        negative_returns = pnl[pnl < 0]
+        sigma_down = negative_returns.std(ddof=1) if len(negative_returns) > 1 else 0
         
         # 夏普比率
-        returns = trades_df['pnl']
-        if returns.std() > 0:
-            sharpe_ratio = (returns.mean() * self.trading_days_per_year - self.risk_free_rate) / (returns.std() * np.sqrt(self.trading_days_per_year))
+        if sigma > 0:
+            sharpe_ratio = excess_return / (sigma * self._sqrt_days)
         else:
             sharpe_ratio = 0
         
         # 索提诺比率(只考虑下行风险)
-        negative_returns = returns[returns < 0]
-        if len(negative_returns) > 0 and negative_returns.std() > 0:
-            sortino_ratio = (returns.mean() * self.trading_days_per_year - self.risk_free_rate) / (negative_returns.std() * np.sqrt(self.trading_days_per_year))
+        if sigma_down > 0:
+            sortino_ratio = excess_return / (sigma_down * self._sqrt_days)
         else:
             sortino_ratio = 0
         
         # 卡尔马比率
         if max_drawdown_pct > 0:
-            calmar_ratio = (returns.mean() * self.trading_days_per_year) / (max_drawdown_pct / 100)
+            calmar_ratio = annual_return / (max_drawdown_pct / 100)
         else:
             calmar_ratio = 0
         
-        # 连续亏损分析
-        trades_df['is_loss'] = trades_df['pnl'] < 0
-        trades_df['loss_group'] = (trades_df['is_loss'] != trades_df['is_loss'].shift()).cumsum()
-        loss_streaks = trades_df[trades_df['is_loss']].groupby('loss_group').size()
-        max_consecutive_losses = loss_streaks.max() if not loss_streaks.empty else 0
-        
-        # 连续盈利分析
-        trades_df['is_win'] = trades_df['pnl'] > 0
-        trades_df['win_group'] = (trades_df['is_win'] != trades_df['is_win'].shift()).cumsum()
-        win_streaks = trades_df[trades_df['is_win']].groupby('win_group').size()
-        max_consecutive_wins = win_streaks.max() if not win_streaks.empty else 0
-        
         return {
             'max_drawdown': max_drawdown,
             'max_drawdown_pct': max_drawdown_pct,
@@ -223,219 +442,221 @@ class PerformanceAnalyzer:
         signal_accuracy = {}
         if not trades_df.empty:
             # 简化分析：假设信号和交易在时间上相近
-            for signal_type in signals_df['signal_type'].unique():
-                signal_trades = []
-                signal_data = signals_df[signals_df['signal_type'] == signal_type]
-                
-                for _, signal in signal_data.iterrows():
-                    # 查找信号后1小时内的交易
-                    signal_time = signal['timestamp']
-                    nearby_trades = trades_df[
-                        (trades_df['timestamp'] >= signal_time) & 
-                        (trades_df['timestamp'] <= signal_time + timedelta(hours=1))
-                    ]
-                    
-                    if not nearby_trades.empty:
-                        signal_trades.extend(nearby_trades['pnl'].tolist())
-                
-                if signal_trades:
-                    profitable_signals = len([pnl for pnl in signal_trades if pnl > 0])
-                    signal_accuracy[signal_type] = {
-                        'total': len(signal_trades),
-                        'profitable': profitable_signals,
-                        'accuracy': profitable_signals / len(signal_trades) * 100,
-                        'avg_pnl': np.mean(signal_trades)
-                    }
+            order = np.argsort(trades_df['timestamp'].to_numpy(), kind='stable')
+            trade_times = trades_df['timestamp'].to_numpy()[order]
+            pnl = trades_df['pnl'].fillna(0).to_numpy(dtype=np.float64)[order]
+            
+            # 前缀和: 任意时间窗内的交易笔数/盈亏/盈利笔数都可O(1)得到
+            pnl_cumsum = np.concatenate(([0.0], np.cumsum(pnl)))
+            win_cumsum = np.concatenate(([0], np.cumsum(pnl > 0)))
+            
+            # 查找每个信号后1小时内的交易区间
+            signal_times = signals_df['timestamp'].to_numpy()
+            lo = np.searchsorted(trade_times, signal_times, side='left')
+            hi = np.searchsorted(trade_times, signal_times + np.timedelta64(1, 'h'), side='right')
+            
+            per_signal = pd.DataFrame({
+                'signal_type': signals_df['signal_type'].to_numpy(),
+                'total': hi - lo,
+                'profitable': win_cumsum[hi] - win_cumsum[lo],
+                'pnl': pnl_cumsum[hi] - pnl_cumsum[lo]
+            })
+            grouped = per_signal.groupby('signal_type', sort=False)[['total', 'profitable', 'pnl']].sum()
+            grouped = grouped[grouped['total'] > 0]
+            
+            # 按列取出标量, 不逐行构造Series
+            for signal_type, total, profitable_signals, pnl_sum in zip(
+                    grouped.index, grouped['total'].tolist(), grouped['profitable'].tolist(), grouped['pnl'].tolist()):
+                signal_accuracy[signal_type] = {
+                    'total': total,
+                    'profitable': profitable_signals,
+                    'accuracy': profitable_signals / total * 100,
+                    'avg_pnl': pnl_sum / total
+                }
         
         return {
             'signal_counts': signal_counts,
             'signal_accuracy': signal_accuracy
         }
     
-    def generate_charts(self, trades_df: pd.DataFrame, klines_df: pd.DataFrame, signals_df: pd.DataFrame):
-        """生成图表"""
+    def generate_charts(self, trades_df: pd.DataFrame, klines_df: pd.DataFrame, signals_df: pd.DataFrame,
+                        show: bool = False):
+        """生成图表(show=True时弹出窗口显示)"""
         if trades_df.empty:
             print("无交易数据，跳过图表生成")
             return
         
-        # 设置图表样式
+        plt = _load_pyplot(interactive=show)
+        
+        # 设置图表样式(matplotlib内置样式, 无需安装seaborn)
         plt.style.use('seaborn-v0_8')
-        fig = plt.figure(figsize=(20, 24))
+        fig, axes = plt.subplots(4, 2, figsize=(20, 24))
+        ax1, ax2, ax3, ax4, ax5, ax6, ax7, ax8 = axes.flat
         
         # 1. 累计收益曲线
-        ax1 = plt.subplot(4, 2, 1)
-        trades_df_copy = trades_df.copy()
-        trades_df_copy['cumulative_pnl'] = trades_df_copy['pnl'].cumsum()
-        plt.plot(trades_df_copy['timestamp'], trades_df_copy['cumulative_pnl'], 'b-', linewidth=2)
-        plt.title('累计收益曲线', fontsize=14, fontweight='bold')
-        plt.xlabel('时间')
-        plt.ylabel('累计盈亏')
-        plt.grid(True, alpha=0.3)
-        plt.xticks(rotation=45)
+        timestamps = trades_df['timestamp'].to_numpy()
+        cumulative_pnl = np.cumsum(trades_df['pnl'].fillna(0).to_numpy(dtype=np.float64))
+        ax1.plot(timestamps, cumulative_pnl, 'b-', linewidth=2)
+        ax1.set_title('累计收益曲线', fontsize=14, fontweight='bold')
+        ax1.set_xlabel('时间')
+        ax1.set_ylabel('累计盈亏')
+        ax1.grid(True, alpha=0.3)
+        ax1.tick_params(axis='x', labelrotation=45)
         
         # 2. 回撤曲线
-        ax2 = plt.subplot(4, 2, 2)
-        peak = trades_df_copy['cumulative_pnl'].expanding().max()
-        drawdown = (peak - trades_df_copy['cumulative_pnl']) / peak * 100
-        plt.fill_between(trades_df_copy['timestamp'], 0, -drawdown, color='red', alpha=0.3)
-        plt.plot(trades_df_copy['timestamp'], -drawdown, 'r-', linewidth=1)
-        plt.title('回撤曲线', fontsize=14, fontweight='bold')
-        plt.xlabel('时间')
-        plt.ylabel('回撤 (%)')
-        plt.grid(True, alpha=0.3)
-        plt.xticks(rotation=45)
+        peak = np.maximum.accumulate(cumulative_pnl)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            drawdown = (peak - cumulative_pnl) / peak * 100
+        ax2.fill_between(timestamps, 0, -drawdown, color='red', alpha=0.3, rasterized=True)
+        ax2.plot(timestamps, -drawdown, 'r-', linewidth=1)
+        ax2.set_title('回撤曲线', fontsize=14, fontweight='bold')
+        ax2.set_xlabel('时间')
+        ax2.set_ylabel('回撤 (%)')
+        ax2.grid(True, alpha=0.3)
+        ax2.tick_params(axis='x', labelrotation=45)
         
         # 3. 每日盈亏分布
-        ax3 = plt.subplot(4, 2, 3)
-        daily_pnl = trades_df.groupby('date')['pnl'].sum()
+        # 按时间索引重采样, 只保留有交易的日期/月份
+        pnl_series = trades_df.set_index('timestamp')['pnl']
+        daily_pnl = pnl_series.resample('1D').sum(min_count=1).dropna()
         colors = ['green' if x > 0 else 'red' for x in daily_pnl]
-        plt.bar(range(len(daily_pnl)), daily_pnl, color=colors, alpha=0.7)
-        plt.title('每日盈亏分布', fontsize=14, fontweight='bold')
-        plt.xlabel('交易日')
-        plt.ylabel('每日盈亏')
-        plt.grid(True, alpha=0.3)
-        plt.axhline(y=0, color='black', linestyle='-', alpha=0.5)
+        ax3.bar(range(len(daily_pnl)), daily_pnl, color=colors, alpha=0.7)
+        ax3.set_title('每日盈亏分布', fontsize=14, fontweight='bold')
+        ax3.set_xlabel('交易日')
+        ax3.set_ylabel('每日盈亏')
+        ax3.grid(True, alpha=0.3)
+        ax3.axhline(y=0, color='black', linestyle='-', alpha=0.5)
         
         # 4. 盈亏分布直方图
-        ax4 = plt.subplot(4, 2, 4)
-        plt.hist(trades_df['pnl'], bins=30, alpha=0.7, color='skyblue', edgecolor='black')
-        plt.axvline(trades_df['pnl'].mean(), color='red', linestyle='--', label=f'平均值: {trades_df["pnl"].mean():.4f}')
-        plt.title('单笔交易盈亏分布', fontsize=14, fontweight='bold')
-        plt.xlabel('盈亏')
-        plt.ylabel('频次')
-        plt.legend()
-        plt.grid(True, alpha=0.3)
+        ax4.hist(trades_df['pnl'], bins=30, alpha=0.7, color='skyblue', edgecolor='black')
+        ax4.axvline(trades_df['pnl'].mean(), color='red', linestyle='--', label=f'平均值: {trades_df["pnl"].mean():.4f}')
+        ax4.set_title('单笔交易盈亏分布', fontsize=14, fontweight='bold')
+        ax4.set_xlabel('盈亏')
+        ax4.set_ylabel('频次')
+        ax4.legend()
+        ax4.grid(True, alpha=0.3)
         
         # 5. 交易量分析
-        ax5 = plt.subplot(4, 2, 5)
         if not klines_df.empty:
-            plt.plot(klines_df['timestamp'], klines_df['close'], 'b-', alpha=0.7, label='价格')
+            # 每个像素列只保留最高/最低点, 绘制的顶点数与图宽相当
+            close = klines_df['close'].to_numpy(dtype=np.float64)
+            keep = _minmax_downsample(close, max(int(ax5.bbox.width), 1))
+            ax5.plot(klines_df['timestamp'].to_numpy()[keep], close[keep], 'b-', alpha=0.7, label='价格')
             
             # 标记交易点
             buy_trades = trades_df[trades_df['side'] == 'buy']
             sell_trades = trades_df[trades_df['side'] == 'sell']
             
             if not buy_trades.empty:
-                plt.scatter(buy_trades['timestamp'], buy_trades['price'], 
-                           color='green', marker='^', s=50, label='买入', alpha=0.8)
+                ax5.scatter(buy_trades['timestamp'], buy_trades['price'], 
+                            color='green', marker='^', s=50, label='买入', alpha=0.8, rasterized=True)
             
             if not sell_trades.empty:
-                plt.scatter(sell_trades['timestamp'], sell_trades['price'], 
-                           color='red', marker='v', s=50, label='卖出', alpha=0.8)
+                ax5.scatter(sell_trades['timestamp'], sell_trades['price'], 
+                            color='red', marker='v', s=50, label='卖出', alpha=0.8, rasterized=True)
             
-            plt.title('价格走势与交易点', fontsize=14, fontweight='bold')
-            plt.xlabel('时间')
-            plt.ylabel('价格')
-            plt.legend()
-            plt.grid(True, alpha=0.3)
-            plt.xticks(rotation=45)
+            ax5.set_title('价格走势与交易点', fontsize=14, fontweight='bold')
+            ax5.set_xlabel('时间')
+            ax5.set_ylabel('价格')
+            ax5.legend()
+            ax5.grid(True, alpha=0.3)
+            ax5.tick_params(axis='x', labelrotation=45)
         
         # 6. 信号分析
-        ax6 = plt.subplot(4, 2, 6)
         if not signals_df.empty:
             signal_counts = signals_df['signal_type'].value_counts()
-            plt.pie(signal_counts.values, labels=signal_counts.index, autopct='%1.1f%%')
-            plt.title('信号类型分布', fontsize=14, fontweight='bold')
+            ax6.pie(signal_counts.values, labels=signal_counts.index, autopct='%1.1f%%')
+            ax6.set_title('信号类型分布', fontsize=14, fontweight='bold')
         
         # 7. 月度表现
-        ax7 = plt.subplot(4, 2, 7)
-        trades_df_copy['month'] = trades_df_copy['timestamp'].dt.to_period('M')
-        monthly_pnl = trades_df_copy.groupby('month')['pnl'].sum()
+        monthly_pnl = pnl_series.resample('MS').sum(min_count=1).dropna()
         colors = ['green' if x > 0 else 'red' for x in monthly_pnl]
-        plt.bar(range(len(monthly_pnl)), monthly_pnl, color=colors, alpha=0.7)
-        plt.title('月度盈亏', fontsize=14, fontweight='bold')
-        plt.xlabel('月份')
-        plt.ylabel('月度盈亏')
-        plt.grid(True, alpha=0.3)
-        plt.axhline(y=0, color='black', linestyle='-', alpha=0.5)
+        ax7.bar(range(len(monthly_pnl)), monthly_pnl, color=colors, alpha=0.7)
+        ax7.set_title('月度盈亏', fontsize=14, fontweight='bold')
+        ax7.set_xlabel('月份')
+        ax7.set_ylabel('月度盈亏')
+        ax7.grid(True, alpha=0.3)
+        ax7.axhline(y=0, color='black', linestyle='-', alpha=0.5)
         
         # 8. 胜率分析
-        ax8 = plt.subplot(4, 2, 8)
         win_loss_data = ['盈利', '亏损']
         win_loss_counts = [len(trades_df[trades_df['pnl'] > 0]), len(trades_df[trades_df['pnl'] < 0])]
         colors = ['green', 'red']
-        plt.pie(win_loss_counts, labels=win_loss_data, colors=colors, autopct='%1.1f%%')
-        plt.title('盈亏比例', fontsize=14, fontweight='bold')
+        ax8.pie(win_loss_counts, labels=win_loss_data, colors=colors, autopct='%1.1f%%')
+        ax8.set_title('盈亏比例', fontsize=14, fontweight='bold')
         
-        plt.tight_layout()
+        fig.tight_layout()
         
         # 保存图表
         chart_path = self.output_dir / f'performance_analysis_{datetime.now().strftime("%Y%m%d_%H%M%S")}.png'
-        plt.savefig(chart_path, dpi=300, bbox_inches='tight')
+        fig.savefig(chart_path, dpi=CHART_DPI, bbox_inches='tight', pil_kwargs={'optimize': True})
         print(f"图表已保存: {chart_path}")
         
-        plt.show()
+        if show:
+            plt.show()
+        plt.close(fig)
     
-    def generate_report(self, days: int = 30) -> str:
-        """生成完整分析报告"""
+    def generate_report(self, days: int = 30, detailed: bool = True,
+                        trades_df: pd.DataFrame = None, signals_df: pd.DataFrame = None) -> str:
+        """生成完整分析报告(detailed=False时使用SQL聚合; 可传入已加载的数据)"""
         try:
-            # 加载数据
-            trades_df, signals_df, klines_df = self.load_data(days)
-            
-            if trades_df.empty:
-                return "无交易数据可分析"
+            if trades_df is None and detailed:
+                # 加载数据
+                trades_df, signals_df, _ = self.load_data(days)
             
-            # 计算指标
-            basic_metrics = self.calculate_basic_metrics(trades_df)
-            risk_metrics = self.calculate_risk_metrics(trades_df)
-            signal_metrics = self.analyze_signal_performance(trades_df, signals_df)
+            if trades_df is not None:
+                if trades_df.empty:
+                    return NO_TRADES_MESSAGE
+                
+                # 计算指标
+                basic_metrics = self.calculate_basic_metrics(trades_df)
+                risk_metrics = self.calculate_risk_metrics(trades_df)
+                signal_metrics = self.analyze_signal_performance(trades_df, signals_df) if signals_df is not None else {}
+            else:
+                aggregates = self.load_aggregates(days)
+                
+                if aggregates['daily'].empty:
+                    return NO_TRADES_MESSAGE
+                
+                basic_metrics = self.calculate_basic_metrics_from_daily(aggregates['daily'])
+                risk_metrics = self.calculate_risk_metrics(pd.DataFrame({'pnl': aggregates['pnl']}))
+                signal_metrics = {
+                    'signal_counts': aggregates['signal_counts'],
+                    'signal_accuracy': aggregates['signal_accuracy']
+                }
             
-            # 生成报告
-            report = f"""
-╔══════════════════════════════════════════════════════════════════════════════════════╗
-║                                交易策略性能分析报告                                    ║
-╠══════════════════════════════════════════════════════════════════════════════════════╣
-║ 分析期间: {(datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')} 至 {datetime.now().strftime('%Y-%m-%d')} (共 {days} 天)                     ║
-║ 生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}                                                    ║
-╠══════════════════════════════════════════════════════════════════════════════════════╣
-║ 基础指标                                                                             ║
-║ • 总交易次数:     {basic_metrics.get('total_trades', 0):>6}                                                ║
-║ • 盈利交易:       {basic_metrics.get('winning_trades', 0):>6}                                                ║
-║ • 亏损交易:       {basic_metrics.get('losing_trades', 0):>6}                                                ║
-║ • 胜率:           {basic_metrics.get('win_rate', 0):>6.2f}%                                              ║
-║ • 总盈亏:         {basic_metrics.get('total_pnl', 0):>10.4f}                                          ║
-║ • 平均盈亏:       {basic_metrics.get('avg_pnl', 0):>10.4f}                                          ║
-║ • 平均盈利:       {basic_metrics.get('avg_win', 0):>10.4f}                                          ║
-║ • 平均亏损:       {basic_metrics.get('avg_loss', 0):>10.4f}                                          ║
-║ • 盈亏比:         {basic_metrics.get('profit_loss_ratio', 0):>6.2f}                                              ║
-║ • 最大单笔盈利:   {basic_metrics.get('max_win', 0):>10.4f}                                          ║
-║ • 最大单笔亏损:   {basic_metrics.get('max_loss', 0):>10.4f}                                          ║
-╠══════════════════════════════════════════════════════════════════════════════════════╣
-║ 风险指标                                                                             ║
-║ • 最大回撤:       {risk_metrics.get('max_drawdown', 0):>10.4f}                                          ║
-║ • 最大回撤率:     {risk_metrics.get('max_drawdown_pct', 0):>6.2f}%                                              ║
-║ • 回撤持续期:     {risk_metrics.get('max_drawdown_duration', 0):>6} 笔交易                                        ║
-║ • 夏普比率:       {risk_metrics.get('sharpe_ratio', 0):>6.2f}                                              ║
-║ • 索提诺比率:     {risk_metrics.get('sortino_ratio', 0):>6.2f}                                              ║
-║ • 卡尔马比率:     {risk_metrics.get('calmar_ratio', 0):>6.2f}                                              ║
-║ • 最大连续亏损:   {risk_metrics.get('max_consecutive_losses', 0):>6} 笔                                            ║
-║ • 最大连续盈利:   {risk_metrics.get('max_consecutive_wins', 0):>6} 笔                                            ║
-╠══════════════════════════════════════════════════════════════════════════════════════╣
-"""
+            # 生成报告(指标一次性格式化后填入静态模板)
+            metrics = {**basic_metrics, **risk_metrics}
+            now = datetime.now()
+            fields = {name: format(metrics.get(name, 0), spec) for name, spec in REPORT_FIELD_FORMATS.items()}
+            lines = [REPORT_HEADER.substitute(
+                fields,
+                start_date=(now - timedelta(days=days)).strftime('%Y-%m-%d'),
+                end_date=now.strftime('%Y-%m-%d'),
+                days=days,
+                generated_at=now.strftime('%Y-%m-%d %H:%M:%S')
+            )]
             
             # 添加信号分析
             if signal_metrics.get('signal_counts'):
-                report += "║ 信号分析                                                                             ║\n"
+                lines.append("║ 信号分析                                                                             ║")
                 for signal_type, count in signal_metrics['signal_counts'].items():
-                    report += f"║ • {signal_type:<12}: {count:>6} 次                                                        ║\n"
+                    lines.append(f"║ • {signal_type:<12}: {count:>6} 次                                                        ║")
                 
                 if signal_metrics.get('signal_accuracy'):
-                    report += "║                                                                                      ║\n"
-                    report += "║ 信号准确率                                                                           ║\n"
+                    lines.append("║                                                                                      ║")
+                    lines.append("║ 信号准确率                                                                           ║")
                     for signal_type, accuracy in signal_metrics['signal_accuracy'].items():
-                        report += f"║ • {signal_type:<12}: {accuracy['accuracy']:>6.2f}% ({accuracy['profitable']}/{accuracy['total']})                                    ║\n"
+                        lines.append(f"║ • {signal_type:<12}: {accuracy['accuracy']:>6.2f}% ({accuracy['profitable']}/{accuracy['total']})                                    ║")
                 
-                report += "╠══════════════════════════════════════════════════════════════════════════════════════╣\n"
+                lines.append("╠══════════════════════════════════════════════════════════════════════════════════════╣")
             
             # 添加评级
             score = self._calculate_strategy_score(basic_metrics, risk_metrics)
             rating = self._get_strategy_rating(score)
             
-            report += f"""║ 策略评级                                                                             ║
-║ • 综合得分:       {score:>6.1f}/100                                                        ║
-║ • 策略评级:       {rating:>6}                                                            ║
-╚══════════════════════════════════════════════════════════════════════════════════════╝
-"""
+            lines.append(REPORT_FOOTER.substitute(score=format(score, '>6.1f'), rating=format(rating, '>6')))
+            report = "\n".join(lines)
             
             return report
             
@@ -527,27 +748,33 @@ class PerformanceAnalyzer:
         except Exception as e:
             print(f"保存报告失败: {e}")
     
-    def run_full_analysis(self, days: int = 30, save_charts: bool = True):
+    def run_full_analysis(self, days: int = 30, save_charts: bool = True, show_charts: bool = False):
         """运行完整分析"""
         print(f"开始分析最近 {days} 天的交易数据...")
         
         try:
-            # 加载数据
-            trades_df, signals_df, klines_df = self.load_data(days)
-            
-            if trades_df.empty:
-                print("无交易数据可分析")
-                return
+            # 仅在需要图表时加载明细数据
+            if save_charts:
+                trades_df, signals_df, klines_df = self.load_data(days)
+                
+                if trades_df.empty:
+                    print(NO_TRADES_MESSAGE)
+                    return
             
-            # 生成报告
-            report = self.generate_report(days)
+            # 生成报告(需要图表时复用已加载的数据, 不再重复查询)
+            if save_charts:
+                report = self.generate_report(days, trades_df=trades_df, signals_df=signals_df)
+            else:
+                report = self.generate_report(days, detailed=False)
             print(report)
+            if report == NO_TRADES_MESSAGE:
+                return
             self.save_report(report)
             
             # 生成图表
             if save_charts:
                 print("\n生成分析图表...")
-                self.generate_charts(trades_df, klines_df, signals_df)
+                self.generate_charts(trades_df, klines_df, signals_df, show=show_charts)
             
             print("\n分析完成!")
             
@@ -562,6 +789,7 @@ def main():
     parser.add_argument('--days', type=int, default=30, help='分析天数')
     parser.add_argument('--no-charts', action='store_true', help='不生成图表')
     parser.add_argument('--report-only', action='store_true', help='仅生成报告')
+    parser.add_argument('--show', action='store_true', help='生成图表后弹出窗口显示')
     
     args = parser.parse_args()
     
@@ -570,12 +798,12 @@ def main():
     
     if args.report_only:
         # 仅生成报告
-        report = analyzer.generate_report(args.days)
+        report = analyzer.generate_report(args.days, detailed=False)
         print(report)
         analyzer.save_report(report)
     else:
         # 运行完整分析
-        analyzer.run_full_analysis(args.days, not args.no_charts)
+        analyzer.run_full_analysis(args.days, not args.no_charts, args.show)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -7,19 +7,51 @@
 
 import sys
 import os
+import hashlib
+import asyncio
 from pathlib import Path
 import pandas as pd
 import numpy as np
-import yaml
 from datetime import datetime, timedelta
 from typing import Dict, List
 
-# 添加src目录到Python路径
-src_path = Path(__file__).parent.parent / 'src'
-sys.path.insert(0, str(src_path))
+# 添加项目根目录到Python路径, 以包的形式导入src
+root_path = Path(__file__).parent.parent
+sys.path.insert(0, str(root_path))
 
-from strategy import TrendFollowingStrategy, SignalType
+from src.strategy import TrendFollowingStrategy, SIGNAL_BY_CODE
+from src._indicators_numba import SIG_HOLD
+from src import _backtest_numba as nbb
+from src._config import load_config
+from src.data_manager import write_csv
 import ccxt
+import ccxt.async_support as ccxt_async
+
+# 指标预热跳过的K线数
+WARMUP_BARS = 50
+
+# 历史K线本地缓存目录
+OHLCV_CACHE_DIR = Path('data') / 'cache'
+
+# ccxt fetch_ohlcv返回的列顺序
+OHLCV_COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+# 单次请求K线数与并发窗口数(限频由客户端enableRateLimit控制)
+OHLCV_FETCH_LIMIT = 1000
+OHLCV_FETCH_CONCURRENCY = 5
+
+# 成交记录列
+TRADE_COLUMNS = ('timestamp', 'signal', 'side', 'amount', 'price', 'pnl', 'balance')
+
+# 内核成交类型编码 -> (信号/平仓原因, 方向)
+TRADE_KINDS = {
+    nbb.KIND_BUY: ('BUY', 'buy'),
+    nbb.KIND_LONG: ('LONG', 'long'),
+    nbb.KIND_SHORT: ('SHORT', 'short'),
+    nbb.KIND_SELL: ('sell', 'close'),
+    nbb.KIND_CLOSE: ('close', 'close'),
+    nbb.KIND_FINAL: ('final_close', 'close'),
+}
 
 class Backtester:
     """回测器"""
@@ -33,131 +65,231 @@ class Backtester:
         self.current_balance = self.initial_balance
         self.position = 0
         self.entry_price = 0
-        self.trades = []
+        self.trades = {column: [] for column in TRADE_COLUMNS}  # 成交记录(按列存储)
         
         # 性能统计
         self.total_trades = 0
         self.winning_trades = 0
         self.total_pnl = 0
         self.max_drawdown = 0
-        self.balance_history = []
+        self.gross_win = 0
+        self.gross_loss = 0
+        self.win_count = 0
+        self.loss_count = 0
+        
+        # 余额历史(列存储, 回测时按K线数预分配)
+        self._bh_time = np.empty(0, dtype='datetime64[ns]')
+        self._bh_balance = np.empty(0)
+        self._bh_equity = np.empty(0)
+        self._bh_position = np.empty(0)
+        self._bh_price = np.empty(0)
+        self._bh_len = 0
+        self._trade_pnls = np.empty(0)  # 平仓盈亏
         
     def _load_config(self, config_path: str) -> Dict:
         """加载配置文件"""
-        with open(config_path, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f)
+        return load_config(config_path)
     
     def get_historical_data(self, symbol: str, timeframe: str, 
                            start_date: str, end_date: str) -> pd.DataFrame:
-        """获取历史数据"""
+        """获取历史数据(优先读取本地Parquet缓存, 只补拉缺失的尾部)"""
         try:
-            # 初始化交易所
-            exchange = ccxt.binance({
-                'apiKey': self.config['exchange']['apiKey'],
-                'secret': self.config['exchange']['secretKey'],
-                'sandbox': False,
-                'enableRateLimit': True
-            })
-            
-            # 转换时间格式
+            # 转换时间格式(只用到交易所的解析工具, 下载走异步客户端)
+            exchange = ccxt.binance()
             start_timestamp = exchange.parse8601(start_date + 'T00:00:00Z')
             end_timestamp = exchange.parse8601(end_date + 'T23:59:59Z')
-            
-            all_data = []
-            current_timestamp = start_timestamp
+            timeframe_ms = exchange.parse_timeframe(timeframe) * 1000
             
             print(f"获取历史数据: {symbol} {timeframe} from {start_date} to {end_date}")
             
-            while current_timestamp and end_timestamp and current_timestamp < end_timestamp:
+            # 缓存按(交易对, 周期, 起始日期)区分, 结束日期更晚时增量补齐
+            cache_file = self._ohlcv_cache_file(symbol, timeframe, start_date)
+            cached = pd.DataFrame()
+            current_timestamp = start_timestamp
+            if cache_file.exists():
                 try:
-                    ohlcv = exchange.fetch_ohlcv(
-                        symbol=symbol,
-                        timeframe=timeframe,
-                        since=current_timestamp,
-                        limit=1000
-                    )
-                    
-                    if not ohlcv:
-                        break
-                    
-                    all_data.extend(ohlcv)
-                    current_timestamp = ohlcv[-1][0] + 1
-                    
-                    print(f"已获取 {len(all_data)} 条数据...")
-                    
+                    cached = pd.read_parquet(cache_file)
                 except Exception as e:
-                    print(f"获取数据出错: {e}")
-                    break
+                    print(f"读取缓存失败, 重新下载: {e}")
+                    cached = pd.DataFrame()
+                if not cached.empty:
+                    current_timestamp = int(cached.index[-1].value // 1_000_000) + 1
+                    if current_timestamp + timeframe_ms > end_timestamp:
+                        print(f"使用缓存数据: {cache_file}")
+                        return cached[cached.index <= pd.Timestamp(end_timestamp, unit='ms')]
+            
+            all_data = self._fetch_ohlcv(symbol, timeframe, current_timestamp, end_timestamp, timeframe_ms)
             
             # 转换为DataFrame
-            if not all_data:
+            if not all_data and cached.empty:
                 return pd.DataFrame()
             
-            # 构造DataFrame
-            df = pd.DataFrame(all_data)
-            df.columns = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            df.set_index('timestamp', inplace=True)
+            # 构造DataFrame(在numpy层按时间戳去重并排序, 再由列数组一次构造)
+            arr = np.asarray(all_data, dtype=np.float64).reshape(-1, len(OHLCV_COLUMNS))
+            _, first = np.unique(arr[:, 0], return_index=True)
+            arr = arr[first]
+            index = pd.to_datetime(arr[:, 0].astype(np.int64), unit='ms').rename('timestamp')
+            df = pd.DataFrame({name: arr[:, j] for j, name in enumerate(OHLCV_COLUMNS) if j}, index=index)
+            
+            # 增量数据都在缓存最后一根之后, 直接拼接仍保持有序
+            if not cached.empty:
+                df = pd.concat([cached, df]) if not df.empty else cached
             
-            # 去重并排序
-            df = df[~df.index.duplicated(keep='first')]
-            df = df.sort_index()
+            if all_data:
+                self._save_ohlcv_cache(df, cache_file)
             
             print(f"历史数据获取完成: {len(df)} 条记录")
-            return df if isinstance(df, pd.DataFrame) else pd.DataFrame()
+            return df[df.index <= pd.Timestamp(end_timestamp, unit='ms')]
             
         except Exception as e:
             print(f"获取历史数据失败: {e}")
             return pd.DataFrame()
     
+    def _fetch_ohlcv(self, symbol: str, timeframe: str, since: int, until: int, timeframe_ms: int) -> List:
+        """下载[since, until]区间的K线(按1000根预先切分窗口并发请求)"""
+        if not since or not until or since >= until:
+            return []
+        return asyncio.run(self._fetch_ohlcv_async(symbol, timeframe, since, until, timeframe_ms))
+    
+    async def _fetch_ohlcv_async(self, symbol: str, timeframe: str, since: int, until: int, timeframe_ms: int) -> List:
+        """并发下载各窗口, 某个窗口失败时只保留它之前的连续数据"""
+        exchange = ccxt_async.binance({
+            'apiKey': self.config['exchange']['apiKey'],
+            'secret': self.config['exchange']['secretKey'],
+            'sandbox': False,
+            'enableRateLimit': True
+        })
+        step = OHLCV_FETCH_LIMIT * timeframe_ms
+        windows = list(range(since, until, step))
+        semaphore = asyncio.Semaphore(OHLCV_FETCH_CONCURRENCY)
+        fetched = 0
+        
+        async def fetch_window(window_start: int):
+            nonlocal fetched
+            async with semaphore:
+                ohlcv = await exchange.fetch_ohlcv(
+                    symbol=symbol,
+                    timeframe=timeframe,
+                    since=window_start,
+                    limit=OHLCV_FETCH_LIMIT
+                )
+            fetched += len(ohlcv)
+            print(f"已获取 {fetched} 条数据...")
+            return [row for row in ohlcv if row[0] < window_start + step]
+        
+        try:
+            results = await asyncio.gather(*(fetch_window(w) for w in windows), return_exceptions=True)
+        finally:
+            await exchange.close()
+        
+        all_data = []
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"获取数据出错: {result}")
+                break
+            all_data.extend(result)
+        
+        return all_data
+    
+    def _ohlcv_cache_file(self, symbol: str, timeframe: str, start_date: str) -> Path:
+        """K线缓存文件路径"""
+        key = hashlib.sha1(f"{symbol}|{timeframe}|{start_date}".encode('utf-8')).hexdigest()[:16]
+        return OHLCV_CACHE_DIR / f"ohlcv_{key}.parquet"
+    
+    def _save_ohlcv_cache(self, df: pd.DataFrame, cache_file: Path):
+        """写入K线缓存(先写临时文件再替换)"""
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = cache_file.with_suffix('.tmp')
+            df.to_parquet(tmp_file, compression='zstd')
+            os.replace(tmp_file, cache_file)
+        except Exception as e:
+            print(f"写入缓存失败: {e}")
+    
     def run_backtest(self, data: pd.DataFrame) -> Dict:
         """运行回测"""
         print("开始回测...")
         
-        # 计算技术指标
-        data = self.strategy.calculate_indicators(data)
-        
-        # 逐行处理数据
-        for i in range(len(data)):
-            if i < 50:  # 跳过前50行，确保指标计算完整
-                continue
-            
-            current_data = data.iloc[:i+1]
-            current_price = float(current_data['close'].iloc[-1])
-            current_time = current_data.index[-1]
-            
-            # 生成交易信号
-            signal = self.strategy.generate_signal(current_data)
+        # 计算技术指标(numpy列存储), 再一次性生成全部K线的信号编码
+        store = self.strategy.calculate_indicators_np(
+            data['close'], data['high'], data['low'], data['volume'], data.index
+        )
+        signals = self.strategy.generate_signals_vectorized(store)
+        closes = store.cols['close']
+        times = data.index
+        n = len(store)
+        start = min(WARMUP_BARS, n)  # 跳过前50行，确保指标计算完整
+        
+        # 逐K线撮合在Numba内核中完成, 结果写入预分配数组
+        trade_amount = self.config['trading']['trade_amount']
+        state = np.array([self.current_balance, self.position, self.entry_price], dtype=np.float64)
+        balances, equities, positions = np.empty(n), np.empty(n), np.empty(n)
+        self._bh_time = times.to_numpy(dtype='datetime64[ns]')[start:]
+        self._bh_balance, self._bh_equity, self._bh_position = balances[start:], equities[start:], positions[start:]
+        self._bh_price = closes[start:]
+        self._bh_len = n - start
+        max_trades = n - start + 1
+        trade_bar = np.empty(max_trades, dtype=np.int64)
+        trade_kind = np.empty(max_trades, dtype=np.int8)
+        trade_price, trade_pnl, trade_balance = np.empty(max_trades), np.empty(max_trades), np.empty(max_trades)
+        n_trades = nbb.run_backtest(closes, signals, start, float(trade_amount), state,
+                                    balances, equities, positions,
+                                    trade_bar, trade_kind, trade_price, trade_pnl, trade_balance)
+        self.current_balance = float(state[nbb.ST_BALANCE])
+        self.position = float(state[nbb.ST_POSITION])
+        self.entry_price = float(state[nbb.ST_ENTRY])
+        self._trade_pnls = trade_pnl[:n_trades][trade_kind[:n_trades] >= nbb.KIND_SELL]
+        
+        # 成交记录按列追加(持仓只会是0或±trade_amount, 每笔成交数量都是trade_amount)
+        bars = trade_bar[:n_trades]
+        kinds = trade_kind[:n_trades].tolist()
+        first = len(self.trades['timestamp'])
+        self.trades['timestamp'].extend(times[bars])
+        self.trades['signal'].extend(TRADE_KINDS[kind][0] for kind in kinds)
+        self.trades['side'].extend(TRADE_KINDS[kind][1] for kind in kinds)
+        self.trades['amount'].extend([trade_amount] * n_trades)
+        self.trades['price'].extend(trade_price[:n_trades].tolist())
+        self.trades['pnl'].extend(trade_pnl[:n_trades].tolist())
+        self.trades['balance'].extend(trade_balance[:n_trades].tolist())
+        
+        # 平仓统计
+        pnls = self._trade_pnls
+        wins = pnls[pnls > 0]
+        losses = pnls[pnls < 0]
+        self.total_pnl += float(pnls.sum())
+        self.total_trades += len(pnls)
+        self.winning_trades += len(wins)
+        self.gross_win += float(wins.sum())
+        self.win_count += len(wins)
+        self.gross_loss -= float(losses.sum())
+        self.loss_count += len(losses)
+        
+        # 信号K线 -> 成交记录行号(最终平仓单独输出)
+        trade_at_bar = {bar: first + j for j, (bar, kind) in enumerate(zip(bars.tolist(), kinds))
+                        if kind != nbb.KIND_FINAL}
+        
+        # 按K线顺序输出调试信息/信号/成交(只遍历有输出的K线)
+        debug_bars = np.arange(-(-start // 100) * 100, n, 100)
+        rsi_arr = store.cols.get('rsi')
+        macd_arr = store.cols.get('macd')
+        for i in np.union1d(np.flatnonzero(signals[start:]) + start, debug_bars).tolist():
+            current_time = times[i]
+            current_price = float(closes[i])
+            code = int(signals[i])  # 整数编码直接比较, 只在输出时转成SignalType
             
-            # 添加调试信息
             if i % 100 == 0:  # 每100条数据打印一次调试信息
-                rsi_value = current_data['rsi'].iloc[-1] if 'rsi' in current_data.columns else 'N/A'
-                macd_value = current_data['macd'].iloc[-1] if 'macd' in current_data.columns else 'N/A'
-                rsi_str = f"{rsi_value:.2f}" if rsi_value != 'N/A' else 'N/A'
-                macd_str = f"{macd_value:.4f}" if macd_value != 'N/A' else 'N/A'
-                print(f"调试信息 - 时间: {current_time}, 价格: {current_price:.2f}, RSI: {rsi_str}, MACD: {macd_str}, 信号: {signal.name}")
-            
-            # 执行交易
-            if signal != SignalType.HOLD:
-                print(f"交易信号: {signal.name} at {current_time} - Price: {current_price}")
-                self._execute_backtest_trade(signal, current_price, current_time)
+                rsi_value = rsi_arr[i] if rsi_arr is not None else np.nan
+                macd_value = macd_arr[i] if macd_arr is not None else np.nan
+                print(f"调试信息 - 时间: {current_time}, 价格: {current_price:.2f}, RSI: {rsi_value:.2f}, MACD: {macd_value:.4f}, 信号: {SIGNAL_BY_CODE[code].name}")
             
-            # 记录余额历史
-            unrealized_pnl = self._calculate_unrealized_pnl(current_price)
-            current_equity = self.current_balance + unrealized_pnl
-            self.balance_history.append({
-                'timestamp': current_time,
-                'balance': self.current_balance,
-                'equity': current_equity,
-                'position': self.position,
-                'price': current_price
-            })
+            if code != SIG_HOLD:
+                print(f"交易信号: {SIGNAL_BY_CODE[code].name} at {current_time} - Price: {current_price}")
+                if i in trade_at_bar:
+                    self._print_trade(trade_at_bar[i])
         
-        # 如果最后还有持仓，平仓
-        if self.position != 0:
-            final_price = float(data['close'].iloc[-1])
-            final_time = data.index[-1]
-            self._close_position(final_price, final_time, 'final_close')
+        # 如果最后还有持仓，内核已按最后收盘价平仓
+        if n_trades and trade_kind[n_trades - 1] == nbb.KIND_FINAL:
+            self._print_trade(first + n_trades - 1)
         
         # 计算性能指标
         performance = self._calculate_performance()
@@ -165,124 +297,32 @@ class Backtester:
         print("回测完成")
         return performance
     
-    def _execute_backtest_trade(self, signal: SignalType, price: float, timestamp):
-        """执行回测交易"""
-        trade_amount = self.config['trading']['trade_amount']
-        
-        if signal == SignalType.BUY and self.position <= 0:
-            # 买入
-            cost = trade_amount * price
-            if self.current_balance >= cost:
-                self.position += trade_amount
-                self.current_balance -= cost
-                self.entry_price = price
-                
-                self.trades.append({
-                    'timestamp': timestamp,
-                    'signal': signal.value,
-                    'side': 'buy',
-                    'amount': trade_amount,
-                    'price': price,
-                    'balance': self.current_balance
-                })
-                
-                print(f"{timestamp}: BUY {trade_amount} @ {price:.4f}")
-        
-        elif signal == SignalType.SELL and self.position > 0:
-            # 卖出
-            self._close_position(price, timestamp, 'sell')
-        
-        elif signal == SignalType.LONG and self.position <= 0:
-            # 做多(合约)
-            self.position = trade_amount
-            self.entry_price = price
-            
-            self.trades.append({
-                'timestamp': timestamp,
-                'signal': signal.value,
-                'side': 'long',
-                'amount': trade_amount,
-                'price': price,
-                'balance': self.current_balance
-            })
-            
-            print(f"{timestamp}: LONG {trade_amount} @ {price:.4f}")
-        
-        elif signal == SignalType.SHORT and self.position >= 0:
-            # 做空(合约)
-            self.position = -trade_amount
-            self.entry_price = price
-            
-            self.trades.append({
-                'timestamp': timestamp,
-                'signal': signal.value,
-                'side': 'short',
-                'amount': trade_amount,
-                'price': price,
-                'balance': self.current_balance
-            })
-            
-            print(f"{timestamp}: SHORT {trade_amount} @ {price:.4f}")
-        
-        elif signal in [SignalType.CLOSE_LONG, SignalType.CLOSE_SHORT]:
-            # 平仓
-            if self.position != 0:
-                self._close_position(price, timestamp, 'close')
+    def _print_trade(self, row: int):
+        """打印第row笔成交记录"""
+        trade = {column: values[row] for column, values in self.trades.items()}
+        if trade['side'] == 'close':
+            print(f"{trade['timestamp']}: CLOSE {trade['amount']} @ {trade['price']:.4f}, PnL: {trade['pnl']:.4f}")
+        else:
+            print(f"{trade['timestamp']}: {trade['signal']} {trade['amount']} @ {trade['price']:.4f}")
     
-    def _close_position(self, price: float, timestamp, reason: str):
-        """平仓"""
-        if self.position == 0:
-            return
-        
-        # 计算盈亏
-        if self.position > 0:  # 多头
-            pnl = (price - self.entry_price) * self.position
-            self.current_balance += self.position * price
-        else:  # 空头
-            pnl = (self.entry_price - price) * abs(self.position)
-            self.current_balance += pnl
-        
-        self.total_pnl += pnl
-        self.total_trades += 1
-        
-        if pnl > 0:
-            self.winning_trades += 1
-        
-        self.trades.append({
-            'timestamp': timestamp,
-            'signal': reason,
-            'side': 'close',
-            'amount': abs(self.position),
-            'price': price,
-            'pnl': pnl,
-            'balance': self.current_balance
+    def _balance_frame(self) -> pd.DataFrame:
+        """余额历史DataFrame(直接采用列数组)"""
+        k = self._bh_len
+        return pd.DataFrame({
+            'timestamp': self._bh_time[:k],
+            'balance': self._bh_balance[:k],
+            'equity': self._bh_equity[:k],
+            'position': self._bh_position[:k],
+            'price': self._bh_price[:k]
         })
-        
-        print(f"{timestamp}: CLOSE {abs(self.position)} @ {price:.4f}, PnL: {pnl:.4f}")
-        
-        self.position = 0
-        self.entry_price = 0
-    
-    def _calculate_unrealized_pnl(self, current_price: float) -> float:
-        """计算未实现盈亏"""
-        if self.position == 0 or self.entry_price == 0:
-            return 0
-        
-        if self.position > 0:  # 多头
-            return (current_price - self.entry_price) * self.position
-        else:  # 空头
-            return (self.entry_price - current_price) * abs(self.position)
     
     def _calculate_performance(self) -> Dict:
         """计算性能指标"""
-        if not self.balance_history:
+        if self._bh_len == 0:
             return {}
         
-        # 转换为DataFrame
-        balance_df = pd.DataFrame(self.balance_history)
-        
-        # 计算收益率
-        balance_df['returns'] = balance_df['equity'].pct_change()
+        # 直接在权益数组上计算, 不构造中间Series
+        equity = self._bh_equity[:self._bh_len]
         
         # 基础指标
         final_balance = self.current_balance
@@ -292,22 +332,20 @@ class Backtester:
         win_rate = (self.winning_trades / self.total_trades * 100) if self.total_trades > 0 else 0
         
         # 最大回撤
-        balance_df['peak'] = balance_df['equity'].expanding().max()
-        balance_df['drawdown'] = (balance_df['peak'] - balance_df['equity']) / balance_df['peak'] * 100
-        max_drawdown = balance_df['drawdown'].max()
-        
-        # 夏普比率
-        if balance_df['returns'].std() > 0:
-            sharpe_ratio = balance_df['returns'].mean() / balance_df['returns'].std() * np.sqrt(252)
+        peak = np.maximum.accumulate(equity)
+        max_drawdown = ((peak - equity) / peak * 100).max()
+        
+        # 夏普比率(按每笔平仓盈亏计算, 与监控工具口径一致; 逐K线权益收益大多为0会压低波动)
+        trade_pnls = self._trade_pnls
+        pnl_std = trade_pnls.std(ddof=1) if len(trade_pnls) > 1 else 0
+        if pnl_std > 0:
+            sharpe_ratio = trade_pnls.mean() / pnl_std * np.sqrt(252)
         else:
             sharpe_ratio = 0
         
-        # 盈亏比
-        winning_trades_df = pd.DataFrame([t for t in self.trades if t.get('pnl', 0) > 0])
-        losing_trades_df = pd.DataFrame([t for t in self.trades if t.get('pnl', 0) < 0])
-        
-        avg_win = winning_trades_df['pnl'].mean() if not winning_trades_df.empty else 0
-        avg_loss = abs(losing_trades_df['pnl'].mean()) if not losing_trades_df.empty else 0
+        # 盈亏比(平仓时累计的盈亏合计)
+        avg_win = self.gross_win / self.win_count if self.win_count else 0
+        avg_loss = self.gross_loss / self.loss_count if self.loss_count else 0
         profit_loss_ratio = avg_win / avg_loss if avg_loss > 0 else 0
         
         performance = {
@@ -328,20 +366,20 @@ class Backtester:
         
         return performance
     
-    def save_results(self, performance: Dict, filename: str = None):
-        """保存回测结果"""
+    def save_results(self, performance: Dict, filename: str = None, file_format: str = 'csv'):
+        """保存回测结果(file_format为'parquet'时交易记录和余额历史写为zstd压缩的Parquet)"""
         if filename is None:
             filename = f"backtest_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
         
         # 保存交易记录
         trades_df = pd.DataFrame(self.trades)
         base_filename = filename.replace('.csv', '') if filename and filename.endswith('.csv') else (filename if filename else 'backtest_results')
-        trades_df.to_csv(f"trades_{base_filename}.csv", index=False)
+        self._write_table(trades_df, f"trades_{base_filename}", file_format)
         
         # 保存余额历史
-        balance_df = pd.DataFrame(self.balance_history)
+        balance_df = self._balance_frame()
         balance_filename = filename.replace('.csv', '') if filename and filename.endswith('.csv') else (filename if filename else 'backtest_results')
-        balance_df.to_csv(f"balance_{balance_filename}.csv", index=False)
+        self._write_table(balance_df, f"balance_{balance_filename}", file_format)
         
         # 保存性能指标
         performance_filename = filename.replace('.csv', '') if filename and filename.endswith('.csv') else (filename if filename else 'backtest_results')
@@ -353,6 +391,13 @@ class Backtester:
                 f.write(f"{key}: {value}\n")
         
         print(f"回测结果已保存: {filename}")
+    
+    def _write_table(self, df: pd.DataFrame, stem: str, file_format: str):
+        """用pyarrow写出表格(CSV或Parquet)"""
+        if file_format == 'parquet':
+            df.to_parquet(f"{stem}.parquet", compression='zstd', index=False)
+        else:
+            write_csv(df, Path(f"{stem}.csv"))
 
 def main():
     """主函数"""
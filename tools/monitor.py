@@ -6,19 +6,32 @@
 """
 
 import sys
-import os
 from pathlib import Path
 import pandas as pd
+import numpy as np
 import time
-import yaml
 from datetime import datetime, timedelta
 from typing import Dict, List
 import sqlite3
 import json
+import functools
 
-# 添加src目录到Python路径
-src_path = Path(__file__).parent.parent / 'src'
-sys.path.insert(0, str(src_path))
+# 添加项目根目录到Python路径, 以包的形式导入src
+root_path = Path(__file__).parent.parent
+sys.path.insert(0, str(root_path))
+
+from src.data_manager import to_epoch_ms, from_epoch_ms
+from src import _analysis_numba as nba
+from src._config import load_config
+
+# 查询结果缓存时间(秒), 同一刷新周期内每个查询最多执行一次
+QUERY_CACHE_TTL = 5
+
+# 清屏并将光标移到左上角
+CLEAR_SCREEN = "\x1b[2J\x1b[H"
+
+# 报告段落分隔线
+REPORT_SEPARATOR = "╠══════════════════════════════════════════════════════════════╣"
 
 class TradingMonitor:
     """交易监控器"""
@@ -28,48 +41,57 @@ class TradingMonitor:
         self.db_path = Path('../data/trading_bot.db')
         
         # 监控参数
-        self.refresh_interval = 30  # 刷新间隔(秒)
+        self.poll_interval = 1  # 检查数据库变化的间隔(秒), 有变化才刷新报告
         self.alert_thresholds = {
             'max_drawdown': 10.0,  # 最大回撤警告阈值
             'daily_loss': -500,    # 每日亏损警告阈值
             'win_rate': 30.0       # 胜率警告阈值
         }
         
+        # 按TTL时间桶缓存查询结果(时间桶变化即视为过期)
+        self._status_cached = functools.lru_cache(maxsize=8)(self._query_status)
+        self._risk_cached = functools.lru_cache(maxsize=8)(self._query_risk_metrics)
+        
     def _load_config(self, config_path: str) -> Dict:
         """加载配置文件"""
         try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                return yaml.safe_load(f)
+            return load_config(config_path)
         except Exception as e:
             print(f"配置文件加载失败: {e}")
             return {}
     
+    def _cache_bucket(self) -> int:
+        """当前缓存时间桶"""
+        return int(time.monotonic() // QUERY_CACHE_TTL)
+    
     def get_real_time_status(self) -> Dict:
-        """获取实时状态"""
+        """获取实时状态(TTL内复用查询结果)"""
+        return self._status_cached(self._cache_bucket())
+    
+    def _query_status(self, bucket: int) -> Dict:
+        """查询实时状态"""
         try:
             if not self.db_path.exists():
                 return {'error': '数据库文件不存在'}
             
             conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
             
-            # 获取最新交易记录
+            # 获取最新交易记录(单行结果直接fetchone, 不构造DataFrame)
             latest_trade_query = """
                 SELECT * FROM trades 
                 ORDER BY timestamp DESC 
                 LIMIT 1
             """
-            latest_trade = pd.read_sql_query(latest_trade_query, conn)
-            
-            # 获取今日交易统计
-            today = datetime.now().date().isoformat()
-            today_trades_query = """
-                SELECT COUNT(*) as count, 
-                       SUM(pnl) as total_pnl,
-                       AVG(pnl) as avg_pnl
-                FROM trades 
-                WHERE DATE(timestamp) = ?
+            latest_trade = self._fetch_row(cursor, latest_trade_query)
+            
+            # 获取今日交易统计(读取trades触发器维护的日汇总行)
+            today_query = """
+                SELECT trades as count, total_pnl
+                FROM daily_stats 
+                WHERE date = ?
             """
-            today_stats = pd.read_sql_query(today_trades_query, conn, params=[today])
+            today_stats = self._fetch_row(cursor, today_query, (datetime.now().date().isoformat(),))
             
             # 获取最新信号
             latest_signal_query = """
@@ -77,7 +99,7 @@ class TradingMonitor:
                 ORDER BY timestamp DESC 
                 LIMIT 1
             """
-            latest_signal = pd.read_sql_query(latest_signal_query, conn)
+            latest_signal = self._fetch_row(cursor, latest_signal_query)
             
             # 获取性能统计
             performance_query = """
@@ -89,16 +111,21 @@ class TradingMonitor:
             
             conn.close()
             
+            # 时间戳转为本地时间字符串用于显示
+            for row in (latest_trade, latest_signal):
+                if row is not None and row.get('timestamp') is not None:
+                    row['timestamp'] = datetime.fromtimestamp(row['timestamp'] / 1000).strftime('%Y-%m-%d %H:%M:%S')
+            
             # 组装状态信息
             status = {
                 'timestamp': datetime.now().isoformat(),
-                'latest_trade': latest_trade.to_dict('records')[0] if not latest_trade.empty else None,
+                'latest_trade': latest_trade,
                 'today_stats': {
-                    'trades_count': int(today_stats['count'].iloc[0]) if not today_stats.empty else 0,
-                    'total_pnl': float(today_stats['total_pnl'].iloc[0]) if not today_stats.empty and today_stats['total_pnl'].iloc[0] else 0,
-                    'avg_pnl': float(today_stats['avg_pnl'].iloc[0]) if not today_stats.empty and today_stats['avg_pnl'].iloc[0] else 0
+                    'trades_count': int(today_stats['count']) if today_stats else 0,
+                    'total_pnl': float(today_stats['total_pnl']) if today_stats else 0,
+                    'avg_pnl': today_stats['total_pnl'] / today_stats['count'] if today_stats and today_stats['count'] else 0
                 },
-                'latest_signal': latest_signal.to_dict('records')[0] if not latest_signal.empty else None,
+                'latest_signal': latest_signal,
                 'recent_performance': recent_performance.to_dict('records') if not recent_performance.empty else []
             }
             
@@ -107,56 +134,78 @@ class TradingMonitor:
         except Exception as e:
             return {'error': f'获取状态失败: {e}'}
     
+    @staticmethod
+    def _fetch_row(cursor: sqlite3.Cursor, query: str, params: tuple = ()) -> Dict:
+        """执行查询并返回首行(列名 -> 值), 无结果时返回None"""
+        row = cursor.execute(query, params).fetchone()
+        if row is None:
+            return None
+        return dict(zip([d[0] for d in cursor.description], row))
+    
     def calculate_risk_metrics(self) -> Dict:
-        """计算风险指标"""
+        """计算风险指标(TTL内复用查询结果)"""
+        return self._risk_cached(self._cache_bucket())
+    
+    def _query_risk_metrics(self, bucket: int) -> Dict:
+        """查询并计算风险指标"""
         try:
             if not self.db_path.exists():
                 return {'error': '数据库文件不存在'}
             
             conn = sqlite3.connect(self.db_path)
             
-            # 获取最近30天的交易记录
-            thirty_days_ago = (datetime.now() - timedelta(days=30)).isoformat()
-            trades_query = """
-                SELECT * FROM trades 
-                WHERE timestamp >= ? 
-                ORDER BY timestamp
+            # 最近30天(按本地日期)的计数与求和直接取日汇总
+            start_day = datetime.now().date() - timedelta(days=30)
+            stats_query = """
+                SELECT COALESCE(SUM(trades), 0), COALESCE(SUM(total_pnl), 0), COALESCE(SUM(pnl_sq), 0),
+                       COALESCE(SUM(win_count), 0), COALESCE(SUM(loss_count), 0),
+                       COALESCE(SUM(win_pnl), 0), COALESCE(SUM(loss_pnl), 0)
+                FROM daily_stats 
+                WHERE date >= ?
             """
-            trades_df = pd.read_sql_query(trades_query, conn, params=[thirty_days_ago])
+            total_trades, total_pnl, pnl_sq, winning_trades, losing_trades, win_pnl, loss_pnl = conn.execute(
+                stats_query, (start_day.isoformat(),)
+            ).fetchone()
+            
+            # 回撤和连续亏损依赖交易顺序, 只取同一时间段的pnl列
+            pnl = np.array([], dtype=np.float64)
+            if total_trades:
+                pnl_query = """
+                    SELECT COALESCE(pnl, 0) FROM trades 
+                    WHERE timestamp >= ? 
+                    ORDER BY timestamp
+                """
+                start_ms = to_epoch_ms(datetime.combine(start_day, datetime.min.time()))
+                pnl = np.array([row[0] for row in conn.execute(pnl_query, (start_ms,))], dtype=np.float64)
             
             conn.close()
             
-            if trades_df.empty:
+            if total_trades == 0:
                 return {'message': '无交易记录'}
             
-            # 计算风险指标
-            trades_df['timestamp'] = pd.to_datetime(trades_df['timestamp'])
-            trades_df['cumulative_pnl'] = trades_df['pnl'].cumsum()
-            
             # 最大回撤
-            peak = trades_df['cumulative_pnl'].expanding().max()
-            drawdown = (peak - trades_df['cumulative_pnl']) / peak * 100
-            max_drawdown = drawdown.max() if not drawdown.empty else 0
+            cumulative_pnl = np.cumsum(pnl)
+            peak = np.maximum.accumulate(cumulative_pnl)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                drawdown = (peak - cumulative_pnl) / peak * 100
+            max_drawdown = np.nanmax(drawdown) if not np.isnan(drawdown).all() else 0
             
             # 胜率
-            winning_trades = len(trades_df[trades_df['pnl'] > 0])
-            total_trades = len(trades_df)
-            win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
+            win_rate = winning_trades / total_trades * 100
             
             # 盈亏比
-            avg_win = trades_df[trades_df['pnl'] > 0]['pnl'].mean() if winning_trades > 0 else 0
-            avg_loss = abs(trades_df[trades_df['pnl'] < 0]['pnl'].mean()) if (total_trades - winning_trades) > 0 else 0
+            avg_win = win_pnl / winning_trades if winning_trades > 0 else 0
+            avg_loss = abs(loss_pnl / losing_trades) if losing_trades > 0 else 0
             profit_loss_ratio = avg_win / avg_loss if avg_loss > 0 else 0
             
-            # 夏普比率(简化)
-            returns = trades_df['pnl']
-            sharpe_ratio = returns.mean() / returns.std() if returns.std() > 0 else 0
+            # 夏普比率(简化, 样本标准差由平方和推出)
+            avg_trade_pnl = total_pnl / total_trades
+            variance = (pnl_sq - total_trades * avg_trade_pnl ** 2) / (total_trades - 1) if total_trades > 1 else 0
+            pnl_std = np.sqrt(variance) if variance > 0 else 0
+            sharpe_ratio = avg_trade_pnl / pnl_std if pnl_std > 0 else 0
             
-            # 最大连续亏损
-            trades_df['is_loss'] = trades_df['pnl'] < 0
-            trades_df['loss_group'] = (trades_df['is_loss'] != trades_df['is_loss'].shift()).cumsum()
-            loss_streaks = trades_df[trades_df['is_loss']].groupby('loss_group').size()
-            max_consecutive_losses = loss_streaks.max() if not loss_streaks.empty else 0
+            # 最大连续亏损(单次线性扫描)
+            max_consecutive_losses = nba.max_streak(pnl, -1)
             
             risk_metrics = {
                 'max_drawdown': round(max_drawdown, 2),
@@ -166,8 +215,8 @@ class TradingMonitor:
                 'max_consecutive_losses': int(max_consecutive_losses),
                 'total_trades': total_trades,
                 'winning_trades': winning_trades,
-                'total_pnl': round(trades_df['pnl'].sum(), 4),
-                'avg_trade_pnl': round(trades_df['pnl'].mean(), 4)
+                'total_pnl': round(total_pnl, 4),
+                'avg_trade_pnl': round(avg_trade_pnl, 4)
             }
             
             return risk_metrics
@@ -175,7 +224,7 @@ class TradingMonitor:
         except Exception as e:
             return {'error': f'计算风险指标失败: {e}'}
     
-    def check_alerts(self, risk_metrics: Dict) -> List[str]:
+    def check_alerts(self, risk_metrics: Dict, status: Dict = None) -> List[str]:
         """检查警告条件"""
         alerts = []
         
@@ -188,8 +237,9 @@ class TradingMonitor:
             if risk_metrics.get('win_rate', 100) < self.alert_thresholds['win_rate']:
                 alerts.append(f"⚠️ 胜率过低: {risk_metrics['win_rate']:.2f}%")
             
-            # 检查今日盈亏
-            status = self.get_real_time_status()
+            # 检查今日盈亏(复用报告中已查询的状态)
+            if status is None:
+                status = self.get_real_time_status()
             today_pnl = status.get('today_stats', {}).get('total_pnl', 0)
             if today_pnl < self.alert_thresholds['daily_loss']:
                 alerts.append(f"⚠️ 今日亏损过大: {today_pnl:.4f}")
@@ -208,20 +258,20 @@ class TradingMonitor:
         try:
             status = self.get_real_time_status()
             risk_metrics = self.calculate_risk_metrics()
-            alerts = self.check_alerts(risk_metrics)
+            alerts = self.check_alerts(risk_metrics, status)
             
-            # 生成报告
-            report = f"""
+            # 生成报告(各段落收集到列表, 最后一次拼接)
+            sections = [f"""
 ╔══════════════════════════════════════════════════════════════╗
 ║                    交易机器人监控报告                          ║
-╠══════════════════════════════════════════════════════════════╣
+{REPORT_SEPARATOR}
 ║ 生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}                           ║
-╠══════════════════════════════════════════════════════════════╣
+{REPORT_SEPARATOR}
 ║ 今日交易统计                                                 ║
 ║ • 交易次数: {status.get('today_stats', {}).get('trades_count', 0):>3}                                          ║
 ║ • 总盈亏:   {status.get('today_stats', {}).get('total_pnl', 0):>8.4f}                                   ║
 ║ • 平均盈亏: {status.get('today_stats', {}).get('avg_pnl', 0):>8.4f}                                   ║
-╠══════════════════════════════════════════════════════════════╣
+{REPORT_SEPARATOR}
 ║ 风险指标 (最近30天)                                          ║
 ║ • 最大回撤: {risk_metrics.get('max_drawdown', 0):>6.2f}%                                    ║
 ║ • 胜率:     {risk_metrics.get('win_rate', 0):>6.2f}%                                    ║
@@ -229,40 +279,40 @@ class TradingMonitor:
 ║ • 夏普比率: {risk_metrics.get('sharpe_ratio', 0):>6.2f}                                      ║
 ║ • 总交易:   {risk_metrics.get('total_trades', 0):>6}                                        ║
 ║ • 盈利交易: {risk_metrics.get('winning_trades', 0):>6}                                        ║
-╠══════════════════════════════════════════════════════════════╣
-"""
+{REPORT_SEPARATOR}
+"""]
             
             # 添加最新交易信息
             latest_trade = status.get('latest_trade')
             if latest_trade:
-                report += f"""║ 最新交易                                                     ║
+                sections.append(f"""║ 最新交易                                                     ║
 ║ • 时间: {latest_trade.get('timestamp', '')[:19]}                           ║
 ║ • 方向: {latest_trade.get('side', '').upper():>4}                                          ║
 ║ • 数量: {latest_trade.get('amount', 0):>8.4f}                                   ║
 ║ • 价格: {latest_trade.get('price', 0):>8.4f}                                   ║
 ║ • 盈亏: {latest_trade.get('pnl', 0):>8.4f}                                   ║
-╠══════════════════════════════════════════════════════════════╣
-"""
+{REPORT_SEPARATOR}
+""")
             
             # 添加最新信号
             latest_signal = status.get('latest_signal')
             if latest_signal:
-                report += f"""║ 最新信号                                                     ║
+                sections.append(f"""║ 最新信号                                                     ║
 ║ • 时间: {latest_signal.get('timestamp', '')[:19]}                           ║
 ║ • 信号: {latest_signal.get('signal_type', ''):>8}                                    ║
 ║ • 价格: {latest_signal.get('price', 0):>8.4f}                                   ║
 ║ • 置信度: {latest_signal.get('confidence', 0):>6.2f}                                      ║
-╠══════════════════════════════════════════════════════════════╣
-"""
+{REPORT_SEPARATOR}
+""")
             
             # 添加警告信息
             if alerts:
-                report += "║ 警告信息                                                     ║\n"
-                for alert in alerts:
-                    report += f"║ {alert:<60} ║\n"
-                report += "╠══════════════════════════════════════════════════════════════╣\n"
+                sections.append("║ 警告信息                                                     ║\n")
+                sections.extend(f"║ {alert:<60} ║\n" for alert in alerts)
+                sections.append(f"{REPORT_SEPARATOR}\n")
             
-            report += "╚══════════════════════════════════════════════════════════════╝"
+            sections.append("╚══════════════════════════════════════════════════════════════╝")
+            report = "".join(sections)
             
             return report
             
@@ -286,23 +336,40 @@ class TradingMonitor:
         except Exception as e:
             print(f"保存报告失败: {e}")
     
+    def _db_version(self) -> tuple:
+        """数据库与WAL文件的(修改时间, 大小), WAL模式下提交只写-wal文件"""
+        version = []
+        for path in (self.db_path, self.db_path.with_name(self.db_path.name + '-wal')):
+            try:
+                stat = path.stat()
+                version.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                version.append(None)
+        return tuple(version)
+    
     def start_monitoring(self):
         """开始监控"""
         print("开始监控交易机器人...")
-        print(f"刷新间隔: {self.refresh_interval}秒")
+        print(f"检查间隔: {self.poll_interval}秒(数据库有写入或跨日时刷新)")
         print("按 Ctrl+C 停止监控\n")
         
         try:
+            last_version = None
             while True:
-                # 清屏
-                os.system('clear' if os.name == 'posix' else 'cls')
-                
-                # 生成并显示报告
-                report = self.generate_report()
-                print(report)
+                # 只在数据库文件变化或日期切换时重新查询, 空闲时每次只stat一下
+                version = (self._db_version(), datetime.now().date())
+                if version != last_version:
+                    last_version = version
+                    self._status_cached.cache_clear()
+                    self._risk_cached.cache_clear()
+                    
+                    # 清屏并显示报告(ANSI转义序列与报告一次写出, 不再启动子进程)
+                    report = self.generate_report()
+                    sys.stdout.write(CLEAR_SCREEN + report + "\n")
+                    sys.stdout.flush()
                 
-                # 等待下次刷新
-                time.sleep(self.refresh_interval)
+                # 等待下次检查
+                time.sleep(self.poll_interval)
                 
         except KeyboardInterrupt:
             print("\n监控已停止")
@@ -325,14 +392,16 @@ class TradingMonitor:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             
             # 导出交易记录
-            start_date = (datetime.now() - timedelta(days=days)).isoformat()
+            start_date = to_epoch_ms(datetime.now() - timedelta(days=days))
             trades_query = "SELECT * FROM trades WHERE timestamp >= ? ORDER BY timestamp"
             trades_df = pd.read_sql_query(trades_query, conn, params=[start_date])
+            trades_df['timestamp'] = from_epoch_ms(trades_df['timestamp'])
             trades_df.to_csv(export_dir / f'trades_{timestamp}.csv', index=False)
             
             # 导出信号记录
             signals_query = "SELECT * FROM signals WHERE timestamp >= ? ORDER BY timestamp"
             signals_df = pd.read_sql_query(signals_query, conn, params=[start_date])
+            signals_df['timestamp'] = from_epoch_ms(signals_df['timestamp'])
             signals_df.to_csv(export_dir / f'signals_{timestamp}.csv', index=False)
             
             # 导出性能记录
@@ -355,8 +424,8 @@ def main():
     parser = argparse.ArgumentParser(description='交易机器人监控工具')
     parser.add_argument('--mode', choices=['monitor', 'report', 'export'], 
                        default='monitor', help='运行模式')
-    parser.add_argument('--interval', type=int, default=30, 
-                       help='监控刷新间隔(秒)')
+    parser.add_argument('--interval', type=float, default=1, 
+                       help='检查数据库变化的间隔(秒)')
     parser.add_argument('--days', type=int, default=7, 
                        help='导出数据天数')
     
@@ -364,7 +433,7 @@ def main():
     
     # 创建监控器
     monitor = TradingMonitor()
-    monitor.refresh_interval = args.interval
+    monitor.poll_interval = args.interval
     
     if args.mode == 'monitor':
         # 实时监控模式